@@ -0,0 +1,119 @@
+"""/api/listings latency with a connection per request vs the shared pool.
+
+Loads src/database/schema.sql into a scratch schema of the database
+configured in .env (the same one bench_bulk_ingest uses), seeds it with
+synthetic listings and drives the Flask app from several threads with a
+mix of filtered, sorted and paginated /api/listings queries. The app's
+connections are pointed at the scratch schema through PGOPTIONS.
+
+"connect" is DB_POOL_MAX_SIZE=0, so every request opens and closes its
+own connection. "pooled" checks connections out of the shared pool. The
+gap grows with connection setup cost: a local socket connect is cheap,
+while a TLS connect to a hosted database is not.
+
+    python -m benchmarks.bench_api_latency --listings 20000 --requests 400 --threads 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.bench_bulk_ingest import SCHEMA, scratch_database
+from benchmarks.fixtures import synthetic_listings
+from src.database import db as db_module
+from src.scrapers.title_parser import parse_title
+
+QUERIES = [
+    '',
+    'search=honda',
+    'make=toyota&max_price=20000',
+    'min_year=2015&sort_by=price&sort_order=ASC',
+    'max_mileage=100000&sort_by=mileage',
+    'page=5&per_page=50',
+]
+
+
+def seed(db, count):
+    listings = synthetic_listings(count)
+    for listing in listings:
+        _, listing['make'], listing['model'] = parse_title(listing['title'])
+    for start in range(0, count, 1000):
+        db.bulk_upsert_listings(listings[start:start + 1000])
+
+
+def drive(app, requests, threads):
+    """Issue `requests` GETs spread over `threads`; returns latencies in ms"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index):
+        client = app.test_client()
+        mine = []
+        for i in range(index, requests, threads):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            response = client.get(f'/api/listings?{query}')
+            mine.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if errors:
+        raise SystemExit(f"{len(errors)} requests failed, e.g. HTTP {errors[0]}")
+    return latencies
+
+
+def summarize(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{label:<8} {statistics.median(latencies):>8.2f} {p99:>8.2f} "
+          f"{statistics.mean(latencies):>8.2f} {len(latencies) / elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--listings', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=10)
+    args = parser.parse_args()
+
+    db = scratch_database()
+    os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA},public'
+    from src.web.app import app
+
+    try:
+        seed(db, args.listings)
+        print(f"{args.listings} listings, {args.requests} requests over "
+              f"{args.threads} threads, pool size {args.pool_size}")
+        print(f"{'mode':<8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'req/s':>8}")
+        for label, pool_size in (('connect', 0), ('pooled', args.pool_size)):
+            os.environ['DB_POOL_MAX_SIZE'] = str(pool_size)
+            os.environ['DB_POOL_MIN_SIZE'] = str(pool_size)
+            db_module.close_pool()
+            # The views print per-request progress; keep the table readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                drive(app, len(QUERIES) * args.threads, args.threads)
+                start = time.perf_counter()
+                latencies = drive(app, args.requests, args.threads)
+                elapsed = time.perf_counter() - start
+            summarize(label, latencies, elapsed)
+    finally:
+        db_module.close_pool()
+        db.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        db.conn.commit()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Rows per second of the bulk upsert vs the per-listing ingest path.
+
+Creates a scratch schema in the database configured in .env, loads
+src/database/schema.sql into it and ingests N synthetic listings twice
+with each path: first as all-new listings, then again with a share of
+the prices changed. The per-row path is ScraperManager._process_listing
+with a commit per listing. The pipelined path is ScraperManager._ingest_rows
+(the bulk path's fallback): the same statements, prepared, in one
+pipelined transaction per batch with a savepoint per listing. The bulk
+path is ScraperManager._ingest_batch, which calls
+Database.bulk_upsert_listings once per batch. The scratch schema is
+dropped afterwards.
+
+    python -m benchmarks.bench_bulk_ingest --sizes 1000 10000 100000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import synthetic_listings, REPO_ROOT
+from src.database.db import Database
+
+SCHEMA = 'carwatch_bench'
+
+
+def scratch_database():
+    db = Database(pooled=False)
+    db.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    db.conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    db.conn.execute(f"SET search_path TO {SCHEMA}, public")
+    with open(os.path.join(REPO_ROOT, 'src', 'database', 'schema.sql')) as f:
+        db.conn.execute(f.read())
+    db.conn.commit()
+    return db
+
+
+def reset(db):
+    db.conn.execute("TRUNCATE listings, price_history RESTART IDENTITY CASCADE")
+    db.conn.commit()
+
+
+def new_stats():
+    return {'new': 0, 'updated': 0, 'unchanged': 0, 'changed': 0, 'price_increases': 0,
+            'price_decreases': 0, 'duplicates': 0, 'enriched': 0, 'errors': 0}
+
+
+def per_row(manager, listings):
+    stats = new_stats()
+    for listing in listings:
+        manager._process_listing_safely(listing, stats)
+    return stats
+
+
+def pipelined(manager, listings):
+    stats = new_stats()
+    for start in range(0, len(listings), manager.batch_size):
+        manager._ingest_rows(listings[start:start + manager.batch_size], stats, [])
+    return stats
+
+
+def bulk(manager, listings):
+    stats = new_stats()
+    for start in range(0, len(listings), manager.batch_size):
+        manager._ingest_batch(listings[start:start + manager.batch_size], stats, [])
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--reprice', type=float, default=0.1,
+                        help='Share of listings whose price changes in the second round')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.TemporaryDirectory()
+    os.environ['SCRAPE_CACHE_DIR'] = cache_dir.name
+    from src.scrapers.scraper_manager import ScraperManager
+
+    db = scratch_database()
+    manager = ScraperManager(db=db, batch_size=args.batch_size)
+    manager.logger.setLevel(logging.WARNING)
+
+    print(f"{'listings':>9} {'path':>8} {'round':>7} {'seconds':>8} {'rows/s':>9} "
+          f"{'new':>7} {'changed':>8} {'errors':>7}")
+    try:
+        for size in args.sizes:
+            rounds = [
+                ('insert', synthetic_listings(size)),
+                ('update', synthetic_listings(size, reprice=args.reprice)),
+            ]
+            for name, ingest in (('per-row', per_row), ('pipeline', pipelined), ('bulk', bulk)):
+                reset(db)
+                for round_name, listings in rounds:
+                    start = time.perf_counter()
+                    stats = ingest(manager, listings)
+                    elapsed = time.perf_counter() - start
+                    changed = stats['price_increases'] + stats['price_decreases']
+                    print(f"{size:>9} {name:>8} {round_name:>7} {elapsed:>8.2f} "
+                          f"{size / elapsed:>9,.0f} {stats['new']:>7} {changed:>8} "
+                          f"{stats['errors']:>7}")
+    finally:
+        db.conn.rollback()
+        db.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        db.conn.commit()
+        manager.close()
+        cache_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
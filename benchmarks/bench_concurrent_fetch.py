@@ -0,0 +1,71 @@
+"""Wall-clock time of sequential vs concurrent Craigslist page fetching.
+
+Serves recorded-style result pages from a local stand-in server with a
+simulated network latency, then scrapes N pages both ways and checks that
+the listing dicts come back identical.
+
+    python -m benchmarks.bench_concurrent_fetch --pages 1 5 10 20
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.fixtures import craigslist_page
+from benchmarks.stand_in_server import StandInServer
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.rate_limiter import RateLimiter
+
+
+def render(path, query):
+    if path != '/search/cta':
+        return None
+    offset = int(query.get('s', ['0'])[0])
+    return craigslist_page(offset)
+
+
+def timed_scrape(base_url, args, pages, concurrent):
+    # Fresh limiter per run so adaptive speed-up doesn't leak between modes
+    limiter = RateLimiter(
+        rate=args.rate, burst=args.burst, max_rate=args.rate,
+        max_in_flight=args.max_in_flight,
+    )
+    scraper = CraigslistScraper(
+        base_url=f"{base_url}/search/cta",
+        max_workers=args.workers,
+        rate_limiter=limiter,
+    )
+    start = time.perf_counter()
+    # The scrapers print per-page progress; keep the benchmark table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        listings = scraper.scrape_listings(max_pages=pages, concurrent=concurrent)
+    return time.perf_counter() - start, listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--latency', type=float, default=0.4,
+                        help='Simulated server latency per request (seconds)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=8.0,
+                        help='Per-host request budget (requests per second)')
+    parser.add_argument('--burst', type=int, default=1)
+    args = parser.parse_args()
+    
+    with StandInServer(render, latency=args.latency) as server:
+        print(f"Stand-in server at {server.base_url} "
+              f"(latency {args.latency * 1000:.0f} ms)")
+        print(f"{'pages':>6} {'sequential s':>13} {'concurrent s':>13} {'speedup':>8}")
+        
+        for pages in args.pages:
+            seq_time, seq_listings = timed_scrape(server.base_url, args, pages, False)
+            con_time, con_listings = timed_scrape(server.base_url, args, pages, True)
+            assert seq_listings == con_listings, "concurrent mode changed the output"
+            print(f"{pages:>6} {seq_time:>13.2f} {con_time:>13.2f} "
+                  f"{seq_time / con_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Parse throughput of ParsePool as worker processes are added.
+
+Parses a large set of recorded-style Craigslist result pages (or every
+search page in a cassette) in-process, then through ParsePool with each
+worker count, and checks the listings come back identical. Pool start-up
+is timed separately (a warm-up batch) so the table shows steady-state
+throughput. Speedup is bounded by the cores on the machine.
+
+Pages are parsed the way the scrape does it: --threads fetch threads each
+call ParsePool.parse with one page at a time, as BaseScraper._parse_html
+does, so every page is its own round trip to a worker.
+
+    python -m benchmarks.bench_parse_pool --pages 400 --workers 1 2 4 8 --threads 8
+    python -m benchmarks.bench_parse_pool --cassette cassettes/utah.json.gz
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import craigslist_page, CL_PER_PAGE
+from src.scrapers.cassette import Cassette
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.parse_pool import ParsePool
+
+
+def load_pages(args):
+    if not args.cassette:
+        return [craigslist_page((p % 50) * CL_PER_PAGE, seed=p) for p in range(args.pages)]
+    cassette = Cassette.load(args.cassette)
+    return [
+        interaction['body'] for interaction in cassette.interactions.values()
+        if interaction['status'] == 200
+        and urlsplit(interaction['url']).netloc.endswith('.craigslist.org')
+        and urlsplit(interaction['url']).path == '/search/cta'
+    ]
+
+
+def parse_per_page(pool, scraper, pages, threads):
+    """Parse each page with its own ParsePool.parse call from `threads`
+    threads, the way concurrent fetch threads do during a scrape"""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda html: pool.parse(scraper, html), pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--cassette', help='Parse the Craigslist search pages in a cassette')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, multiprocessing.cpu_count()}))
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Threads calling ParsePool.parse')
+    parser.add_argument('--parser', default=None, help='HTML parser backend')
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    scraper = CraigslistScraper(parser=args.parser)
+    print(f"{len(pages)} pages, {multiprocessing.cpu_count()} CPUs, "
+          f"{args.threads} threads, "
+          f"parser {args.parser or 'html.parser'}")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [scraper._parse_page(html) for html in pages]
+    baseline = time.perf_counter() - start
+    listings = sum(len(page) for page in expected)
+
+    print(f"{'workers':>8} {'startup s':>10} {'parse s':>8} {'pages/s':>8} "
+          f"{'listings/s':>11} {'speedup':>8}")
+    print(f"{'inline':>8} {'-':>10} {baseline:>8.2f} {len(pages) / baseline:>8.1f} "
+          f"{listings / baseline:>11,.0f} {1.0:>7.1f}x")
+
+    for workers in args.workers:
+        pool = ParsePool(workers=workers)
+        try:
+            start = time.perf_counter()
+            parse_per_page(pool, scraper, pages[:max(workers, args.threads)], args.threads)
+            startup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            parsed = parse_per_page(pool, scraper, pages, args.threads)
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.close()
+
+        if parsed != expected:
+            raise SystemExit(f"ParsePool with {workers} workers returned different listings")
+        print(f"{workers:>8} {startup:>10.2f} {elapsed:>8.2f} "
+              f"{len(pages) / elapsed:>8.1f} {listings / elapsed:>11,.0f} "
+              f"{baseline / elapsed:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
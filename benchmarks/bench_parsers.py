@@ -0,0 +1,69 @@
+"""Listings parsed per second for each HTML parser backend.
+
+Parses recorded-style Craigslist and KSL result pages with every installed
+backend, and checks each one returns exactly the listing dicts the default
+html.parser backend does. A corpus the default backend finds no listings
+in is an error, since matching an empty result proves nothing. (The
+checked-in ksl_page.html capture is a client-rendered shell with no
+listing cards, so the KSL corpus is the generated fixture.)
+
+    python -m benchmarks.bench_parsers --pages 20 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.fixtures import craigslist_page, ksl_page, CL_PER_PAGE
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.html_parsers import PARSER_BACKENDS, DEFAULT_PARSER
+from src.scrapers.ksl_scraper import KSLScraper
+
+
+def corpora(pages):
+    return {
+        'craigslist': (CraigslistScraper,
+                       [craigslist_page(p * CL_PER_PAGE) for p in range(pages)]),
+        'ksl': (KSLScraper, [ksl_page(p + 1) for p in range(pages)]),
+    }
+
+
+def run(scraper, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            listings = [scraper._parse_page(html) for html in pages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'corpus':<14} {'backend':<12} {'pages/s':>9} {'listings/s':>11} {'vs default':>11}")
+    for corpus, (scraper_cls, pages) in corpora(args.pages).items():
+        baseline_time, expected = run(scraper_cls(parser=DEFAULT_PARSER), pages, args.repeat)
+        if not all(expected):
+            raise SystemExit(f"{DEFAULT_PARSER} found no listings on a {corpus} page")
+        
+        for backend in PARSER_BACKENDS:
+            try:
+                scraper = scraper_cls(parser=backend)
+            except ImportError as e:
+                print(f"{corpus:<14} {backend:<12} skipped: {e}")
+                continue
+            
+            elapsed, listings = run(scraper, pages, args.repeat)
+            assert listings == expected, f"{backend} output differs on {corpus}"
+            count = sum(len(page) for page in listings)
+            print(f"{corpus:<14} {backend:<12} {len(pages) / elapsed:>9.1f} "
+                  f"{count / elapsed:>11.0f} {baseline_time / elapsed:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""End-to-end ScraperManager.run_scrape throughput replayed from a cassette.
+
+Serves a cassette (see benchmarks/record_cassette.py) from the local
+stand-in server with simulated latency and runs the whole scrape against
+it: fetch, parse, detail enrichment and database writes. With no
+--cassette a synthetic one is built from the fixtures. The first run
+inserts every listing; later runs see them again as updates with a warm
+page cache.
+
+--db postgres writes to the database configured in .env (point it at a
+scratch database); --db memory keeps listings in a dict, to time the
+scrape side on its own.
+
+    python -m benchmarks.bench_run_scrape --cassette cassettes/utah.json.gz --runs 2
+    python -m benchmarks.bench_run_scrape --db memory --latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import synthetic_cassette
+from benchmarks.stand_in_server import StandInServer
+from src.scrapers.cassette import Cassette, replay_through
+from src.scrapers.rate_limiter import RateLimiter
+
+
+class MemoryDatabase:
+    """The slice of Database that ScraperManager uses, kept in memory"""
+
+    def __init__(self):
+        self.listings = {}
+        self.price_history = {}
+
+    def insert_listing(self, listing):
+        row = self.listings.get(listing['external_id'])
+        inserted = row is None
+        if inserted:
+            row = dict(listing, id=len(self.listings) + 1, previous_price=None)
+            self.listings[listing['external_id']] = row
+        price_changed = not inserted and row['price'] != listing['price']
+        if price_changed:
+            row['previous_price'] = row['price']
+        row['price'] = listing['price']
+        if not inserted and not price_changed:
+            return []
+        return [{'id': row['id'], 'external_id': row['external_id'],
+                 'price': row['price'], 'previous_price': row['previous_price'],
+                 'inserted': inserted, 'price_changed': price_changed,
+                 'content_changed': False}]
+
+    def bulk_upsert_listings(self, listings):
+        result = {'new': 0, 'updated': 0, 'unchanged': 0, 'changed': 0,
+                  'price_increases': 0, 'price_decreases': 0, 'rows': []}
+        for listing in listings:
+            written = self.insert_listing(listing)
+            if not written:
+                result['updated'] += 1
+                result['unchanged'] += 1
+                continue
+            row = written[0]
+            if row['inserted']:
+                old_price = None
+            elif row['price_changed']:
+                old_price = row['previous_price']
+            else:
+                old_price = row['price']
+            if row['price'] is not None and (row['inserted'] or row['price_changed']):
+                self.insert_price_history(row['id'], row['price'])
+            if row['inserted']:
+                result['new'] += 1
+            else:
+                result['updated'] += 1
+                if old_price is not None and row['price'] is not None:
+                    if row['price'] > old_price:
+                        result['price_increases'] += 1
+                    elif row['price'] < old_price:
+                        result['price_decreases'] += 1
+            result['rows'].append(dict(row, old_price=old_price))
+        return result
+
+    def insert_price_history(self, listing_id, price):
+        self.price_history.setdefault(listing_id, []).append(price)
+
+    def update_listing_details(self, listing_id, details):
+        return 1
+
+    def get_all_active_external_ids(self):
+        return set(self.listings)
+
+    def start_scrape_run(self, incremental=False):
+        return 1
+
+    def finish_scrape_run(self, run_id, status, stats=None, targets=(), deactivated=0):
+        return True
+
+    def deactivate_unseen_listings(self, seen_ids, scopes):
+        return []
+
+    def refresh_stats_snapshot(self):
+        return 0
+
+    def execute_query(self, query, params=None, fetch=False):
+        return [] if fetch else 0
+
+    @contextlib.contextmanager
+    def transaction(self, pipeline=False):
+        yield self
+
+    def close(self):
+        pass
+
+
+def cassette_targets(cassette):
+    """Scrape targets for every site recorded in the cassette"""
+    targets = []
+    for interaction in cassette.interactions.values():
+        parts = urlsplit(interaction['url'])
+        host = parts.netloc
+        if host.endswith('.craigslist.org') and parts.path == '/search/cta':
+            target = {'source': 'craigslist', 'region': host.split('.')[0]}
+        elif host == 'cars.ksl.com' and parts.path.startswith('/search'):
+            target = {'source': 'ksl', 'region': None}
+        else:
+            continue
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cassette', help='Cassette to replay (default: synthetic)')
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='Simulated server latency per request (seconds)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help='Per-host request budget (requests per second)')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Fetch each target\'s pages concurrently')
+    parser.add_argument('--no-details', action='store_true',
+                        help='Skip detail page enrichment')
+    parser.add_argument('--db', choices=['postgres', 'memory'], default='postgres')
+    args = parser.parse_args()
+
+    if args.cassette:
+        cassette = Cassette.load(args.cassette)
+    else:
+        cassette = synthetic_cassette(
+            ('saltlakecity', 'provo', 'ogden', 'logan'), pages=args.pages, ksl_pages=args.pages
+        )
+    targets = cassette_targets(cassette)
+
+    cache_dir = tempfile.TemporaryDirectory()
+    os.environ['SCRAPE_CACHE_DIR'] = cache_dir.name
+
+    from src.scrapers.scraper_manager import ScraperManager
+
+    if args.db == 'memory':
+        db = MemoryDatabase()
+    else:
+        from src.database.db import Database
+        db = Database()
+
+    with StandInServer(cassette.render, latency=args.latency) as server:
+        limiter = RateLimiter(rate=args.rate, burst=max(1, int(args.rate)),
+                              max_rate=args.rate)
+        manager = ScraperManager(targets=targets, workers=args.workers,
+                                 db=db, rate_limiter=limiter)
+        manager.logger.setLevel(logging.WARNING)
+        replay_through(manager.session, server.base_url)
+
+        print(f"Replaying {len(cassette)} responses for {len(targets)} targets "
+              f"from {server.base_url} (latency {args.latency * 1000:.0f} ms, "
+              f"db {args.db})")
+        print(f"{'run':>4} {'seconds':>8} {'listings':>9} {'listings/s':>11} "
+              f"{'requests':>9} {'new':>6} {'updated':>8} {'enriched':>9}")
+        try:
+            for run in range(1, args.runs + 1):
+                requests_before = server.request_count
+                start = time.perf_counter()
+                # The scrapers print per-page progress; keep the table readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stats = manager.run_scrape(
+                        max_pages=args.pages, concurrent=args.concurrent,
+                        enrich_details=not args.no_details
+                    ) or {}
+                elapsed = time.perf_counter() - start
+                listings = stats.get('new', 0) + stats.get('updated', 0)
+                print(f"{run:>4} {elapsed:>8.2f} {listings:>9} "
+                      f"{listings / elapsed:>11.1f} "
+                      f"{server.request_count - requests_before:>9} "
+                      f"{stats.get('new', 0):>6} {stats.get('updated', 0):>8} "
+                      f"{stats.get('enriched', 0):>9}")
+        finally:
+            manager.close()
+            cache_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Per-request latency with and without a pooled keep-alive session.
+
+Runs against a local HTTPS stand-in server so every unpooled request pays
+for a fresh TCP connect and TLS handshake, just like bare requests.get did
+against the live sites.
+
+    python -m benchmarks.bench_session_pooling --requests 200
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from benchmarks.fixtures import craigslist_page
+from benchmarks.stand_in_server import StandInServer
+from src.scrapers.http_session import create_session
+
+
+def render(path, query):
+    if path != '/search/cta':
+        return None
+    return craigslist_page(int(query.get('s', ['0'])[0]))
+
+
+def measure(get, url, count, verify):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = get(url, params={'s': (i % 20) * 120}, timeout=10, verify=verify)
+        response.raise_for_status()
+        response.text
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(label, latencies, connections):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p90 = latencies[int(len(latencies) * 0.9) - 1]
+    print(f"{label:<16} {p50:>9.2f} {p90:>9.2f} "
+          f"{statistics.mean(latencies):>9.2f} {connections:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--pool-size', type=int, default=10)
+    args = parser.parse_args()
+    
+    with StandInServer(render, tls=True) as server:
+        url = f"{server.base_url}/search/cta"
+        print(f"HTTPS stand-in server at {server.base_url}, {args.requests} requests each")
+        print(f"{'mode':<16} {'p50 ms':>9} {'p90 ms':>9} {'mean ms':>9} {'connections':>12}")
+        
+        before = server.connection_count
+        latencies = measure(requests.get, url, args.requests, server.certfile)
+        summarize('requests.get', latencies, server.connection_count - before)
+        
+        before = server.connection_count
+        with create_session(pool_size=args.pool_size) as session:
+            latencies = measure(session.get, url, args.requests, server.certfile)
+        summarize('pooled session', latencies, server.connection_count - before)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Titles parsed per second: precompiled lexicon vs the old per-make loop.
+
+Builds a large synthetic corpus of listing titles (known makes and aliases,
+make-less titles, models written with loose separators such as
+"grand  cherokee" or "f - 150", and non-vehicle noise such as "computer
+program") and times the shared title parser against a copy of the loop the
+scrapers used before it, which recompiled a regex for every listing. Every
+multi-word model in the lexicon is also checked with loose separators.
+
+    python -m benchmarks.bench_title_parser --titles 200000
+"""
+import argparse
+import random
+import re
+import time
+
+from src.scrapers.title_parser import MAKE_ALIASES, MODEL_LEXICON, parse_title
+
+_NOISE = ['clean title', 'low miles', 'one owner', '4x4', 'AWD', 'runs great',
+          'must see', 'OBO', 'new tires', 'loaded', 'program', 'trade', 'cash']
+
+
+def legacy_parse_title(title):
+    """The duplicated _parse_title the scrapers shipped before title_parser"""
+    year = None
+    make = None
+    model = None
+
+    year_match = re.search(r'\b(19\d{2}|20\d{2})\b', title)
+    if year_match:
+        year = int(year_match.group(1))
+
+    makes = ['honda', 'toyota', 'ford', 'chevrolet', 'chevy', 'nissan',
+             'mazda', 'subaru', 'hyundai', 'kia', 'volkswagen', 'vw',
+             'bmw', 'mercedes', 'audi', 'lexus', 'acura', 'infiniti',
+             'dodge', 'jeep', 'ram', 'gmc', 'buick', 'cadillac',
+             'tesla', 'porsche', 'volvo', 'mitsubishi']
+
+    title_lower = title.lower()
+    for car_make in makes:
+        if car_make in title_lower:
+            make = car_make.title()
+            pattern = rf'{car_make}\s+(\w+)'
+            model_match = re.search(pattern, title_lower)
+            if model_match:
+                model = model_match.group(1).title()
+            break
+
+    return year, make, model
+
+
+SEPARATORS = re.compile(r'[-\s]+')
+
+
+def loose_spacing(model, rng):
+    """The model with each '-' or ' ' between its parts written sloppily"""
+    return SEPARATORS.sub(lambda _: rng.choice(['  ', ' - ', ' -', '- ']), model)
+
+
+def synthetic_titles(count, seed=462):
+    rng = random.Random(seed)
+    makes = list(MODEL_LEXICON)
+    titles = []
+    for _ in range(count):
+        make = rng.choice(makes)
+        alias = rng.choice(MAKE_ALIASES[make])
+        model = rng.choice(MODEL_LEXICON[make])
+        year = rng.randint(1990, 2025)
+        noise = ' '.join(rng.sample(_NOISE, rng.randint(0, 3)))
+        shape = rng.random()
+        if shape < 0.7:
+            title = f"{year} {alias} {model} {noise}"
+        elif shape < 0.85:
+            title = f"{year} {model} {noise}"
+        elif shape < 0.9:
+            title = f"{alias.upper()} {model.lower()} {year} - {noise}"
+        elif shape < 0.95:
+            title = f"{year} {alias} {loose_spacing(model, rng).lower()} {noise}"
+        else:
+            title = f"{noise} computer program {year}"
+        titles.append(title.strip())
+    return titles
+
+
+def timed(fn, titles):
+    start = time.perf_counter()
+    for title in titles:
+        fn(title)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=200_000)
+    args = parser.parse_args()
+
+    titles = synthetic_titles(args.titles)
+    legacy = timed(legacy_parse_title, titles)
+    current = timed(parse_title, titles)
+
+    print(f"{len(titles):,} synthetic titles")
+    print(f"{'parser':<20} {'titles/s':>12}")
+    print(f"{'legacy loop':<20} {len(titles) / legacy:>12,.0f}")
+    print(f"{'title_parser':<20} {len(titles) / current:>12,.0f}")
+    print(f"speedup: {legacy / current:.1f}x")
+
+    # Multi-part models written with loose separators must still resolve
+    # to the lexicon model, not just its first word
+    loose = [
+        (f"2015 {make} {SEPARATORS.sub(sep, model)}", make, model)
+        for make, models in MODEL_LEXICON.items()
+        for model in models if SEPARATORS.search(model)
+        for sep in ('  ', ' - ', ' -', '- ')
+    ]
+    missed = [t for t, make, model in loose if parse_title(t)[1:] != (make, model)]
+    print(f"loosely spaced models recognised: {len(loose) - len(missed):,} of {len(loose):,}")
+    if missed:
+        raise SystemExit(f"title_parser missed loosely spaced models, e.g. {missed[0]!r}")
+
+    noise = [t for t in titles if 'computer program' in t]
+    print(f"non-vehicle titles given a make: "
+          f"legacy {sum(1 for t in noise if legacy_parse_title(t)[1]):,}, "
+          f"title_parser {sum(1 for t in noise if parse_title(t)[1]):,} "
+          f"(of {len(noise):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""EXPLAIN regression check for the listings API queries.
+
+Loads src/database/schema.sql into the scratch schema bench_bulk_ingest
+uses, COPYs --rows synthetic listings (a share of them inactive, with one
+price_history row each, rolled up and the long-inactive ones archived
+like the maintenance job does) and ANALYZEs. Then it EXPLAINs every case
+below, built with src.database.listing_search so the SQL is exactly what
+/api/listings and /api/listing/<id> run (keyset pages included), and
+exits non-zero if any plan scans listings or price_history sequentially.
+--analyze also runs each query and prints its execution time.
+
+    python -m benchmarks.check_listing_plans --rows 1000000 --analyze
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_bulk_ingest import SCHEMA, scratch_database
+from benchmarks.fixtures import synthetic_listings
+from src.database.listing_search import (
+    count_query, keyset_segments, page_query, price_history_params,
+    LISTING_DETAIL_QUERY, PRICE_HISTORY_QUERY
+)
+from src.scrapers.title_parser import parse_title
+
+# (name, filters, sort_by, sort_order)
+PAGE_CASES = [
+    ('newest', {}, 'updated_at', 'DESC'),
+    ('cheapest', {}, 'price', 'ASC'),
+    ('newest year', {}, 'year', 'DESC'),
+    ('first seen', {}, 'first_seen', 'DESC'),
+    ('low miles', {'max_mileage': 60000}, 'mileage', 'ASC'),
+    ('price range', {'min_price': 8000, 'max_price': 12000}, 'price', 'DESC'),
+    ('make', {'make': 'subaru'}, 'price', 'ASC'),
+    ('model + years', {'model': 'civic', 'min_year': 2010, 'max_year': 2015}, 'year', 'ASC'),
+    ('search', {'search': 'wrx'}, 'updated_at', 'DESC'),
+    ('search + range', {'search': 'tacoma', 'min_year': 2015, 'max_price': 25000},
+     'price', 'DESC'),
+    ('fulltext', {'search': 'subaru wrx', 'search_mode': 'fulltext'}, 'relevance', 'DESC'),
+    ('fulltext all', {'search': 'jeep wrangler 4x4', 'search_mode': 'fulltext',
+                      'include_inactive': True}, 'relevance', 'DESC'),
+    ('fulltext common', {'search': 'toyota', 'search_mode': 'fulltext',
+                         'include_inactive': True}, 'relevance', 'DESC'),
+    ('archived fulltext', {'search': 'subaru wrx', 'search_mode': 'fulltext',
+                           'include_inactive': True, 'include_archived': True},
+     'relevance', 'DESC'),
+]
+
+# (name, filters, sort_by, sort_order, cursor value, cursor id): a page deep
+# into the results; each keyset segment is checked on its own
+KEYSET_CASES = [
+    ('after newest', {}, 'updated_at', 'DESC', '2026-01-01T00:00:00', 500000),
+    ('after cheapest', {}, 'price', 'ASC', '30000.00', 500000),
+    ('after null price', {}, 'price', 'DESC', None, 500000),
+    ('after low miles', {'max_mileage': 200000}, 'mileage', 'ASC', 150000, 500000),
+    ('after make', {'make': 'subaru'}, 'year', 'DESC', 2005, 500000),
+]
+
+# Counts only stay off a sequential scan when the filters are selective
+COUNT_CASES = [
+    ('count search', {'search': 'wrx'}),
+    ('count model', {'model': 'miata'}),
+    ('count fulltext', {'search': 'subaru wrx', 'search_mode': 'fulltext',
+                        'include_inactive': True}),
+]
+
+# Relation names starting with these; price_history scans are reported per
+# partition, and price_history_daily is covered too
+SCANNED_TABLES = ('listings', 'price_history')
+
+
+def load(db, rows, seed=462):
+    rng = random.Random(seed)
+    now = datetime.now()
+    db.ensure_price_history_partitions()
+    columns = ['external_id', 'source', 'url', 'title', 'price', 'year', 'make',
+               'model', 'mileage', 'location', 'description', 'is_active',
+               'deactivated_at', 'first_seen', 'updated_at']
+    with db.conn.cursor() as cur:
+        with cur.copy(f"COPY listings ({', '.join(columns)}) FROM STDIN") as copy:
+            for start in range(0, rows, 100_000):
+                batch = synthetic_listings(min(100_000, rows - start), seed=seed + start,
+                                           id_prefix=f"cl_plan_{start}")
+                for listing in batch:
+                    _, listing['make'], listing['model'] = parse_title(listing['title'])
+                    first_seen = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+                    listing['is_active'] = rng.random() < 0.8
+                    listing['first_seen'] = first_seen
+                    listing['updated_at'] = first_seen + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+                    listing['deactivated_at'] = None if listing['is_active'] else listing['updated_at']
+                    copy.write_row([listing[c] for c in columns])
+        cur.execute("INSERT INTO price_history (listing_id, price) "
+                    "SELECT id, price FROM listings WHERE price IS NOT NULL")
+    db.conn.commit()
+    db.archive_inactive_listings(180, batch_size=50_000)
+    db.conn.execute("ANALYZE listings")
+    db.conn.execute("ANALYZE listings_archive")
+    db.conn.execute("ANALYZE price_history")
+    db.conn.execute("ANALYZE price_history_daily")
+    db.conn.commit()
+
+
+def cases():
+    for name, filters, sort_by, sort_order in PAGE_CASES:
+        query, params = page_query(filters, sort_by, sort_order)
+        yield name, query, params + [20, 0]
+    for name, filters, sort_by, sort_order, value, listing_id in KEYSET_CASES:
+        segments = keyset_segments(filters, sort_by, sort_order, value, listing_id)
+        for number, extra in enumerate(segments, 1):
+            query, params = page_query(filters, sort_by, sort_order, extra)
+            yield f"{name} {number}", query, params + [21, 0]
+    for name, filters in COUNT_CASES:
+        query, params = count_query(filters)
+        yield name, query, params
+    yield 'listing detail', LISTING_DETAIL_QUERY, [12345]
+    yield 'price history', PRICE_HISTORY_QUERY, price_history_params(12345)
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(db, query, params, analyze):
+    options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+    result = db.conn.execute(f"EXPLAIN ({options}) {query}", params).fetchone()[0]
+    db.conn.rollback()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--analyze', action='store_true',
+                        help='Run the queries and print execution times')
+    args = parser.parse_args()
+
+    db = scratch_database()
+    failures = []
+    try:
+        start = time.perf_counter()
+        load(db, args.rows)
+        # Partitions created for the months ahead are empty and always
+        # scanned sequentially; only populated relations count
+        populated = {row[0] for row in db.conn.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples > 0"
+        )}
+        print(f"Loaded {args.rows:,} listings into {SCHEMA} in "
+              f"{time.perf_counter() - start:.1f}s")
+        print(f"{'case':<20} {'ms':>8}  plan")
+        for name, query, params in cases():
+            result = explain(db, query, params, args.analyze)
+            nodes = list(plan_nodes(result['Plan']))
+            seq_scans = [n['Relation Name'] for n in nodes
+                         if n['Node Type'] == 'Seq Scan'
+                         and n.get('Relation Name', '').startswith(SCANNED_TABLES)
+                         and n['Relation Name'] in populated]
+            scans = [f"{n['Node Type']} {n.get('Index Name', n.get('Relation Name', ''))}".strip()
+                     for n in nodes if 'Relation Name' in n or 'Index Name' in n]
+            ms = f"{result['Execution Time']:.2f}" if args.analyze else '-'
+            print(f"{name:<20} {ms:>8}  {', '.join(scans)}")
+            if seq_scans:
+                failures.append(f"{name}: sequential scan of {', '.join(seq_scans)}")
+    finally:
+        db.conn.rollback()
+        db.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        db.conn.commit()
+        db.close()
+
+    if failures:
+        print("\nPlan regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nNo sequential scans")
+
+
+if __name__ == '__main__':
+    main()
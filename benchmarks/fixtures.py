@@ -0,0 +1,201 @@
+"""Recorded-style search result pages for offline benchmarks.
+
+The pages mirror the static markup Craigslist serves for /search/cta
+(li.cl-static-search-result cards) and the KSL card layout the KSL scraper
+targets (div.listing-item), so the real scraper parsing code runs against
+them unchanged. Output is deterministic for a given offset/page.
+"""
+import os
+import random
+import re
+
+CL_PER_PAGE = 120
+KSL_PER_PAGE = 24
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_VEHICLES = [
+    ('Honda', ['Civic', 'Accord', 'CR-V', 'Pilot', 'Odyssey']),
+    ('Toyota', ['Camry', 'Corolla', 'Tacoma', 'Tundra', '4Runner', 'RAV4']),
+    ('Ford', ['F-150', 'Focus', 'Fusion', 'Explorer', 'Escape', 'Mustang']),
+    ('Chevy', ['Silverado', 'Malibu', 'Tahoe', 'Equinox', 'Cruze']),
+    ('Chevrolet', ['Impala', 'Colorado', 'Suburban', 'Traverse']),
+    ('Nissan', ['Altima', 'Sentra', 'Rogue', 'Frontier']),
+    ('Subaru', ['Outback', 'Forester', 'Impreza', 'Crosstrek', 'WRX']),
+    ('VW', ['Jetta', 'Passat', 'Golf', 'Tiguan']),
+    ('Jeep', ['Wrangler', 'Cherokee', 'Compass']),
+    ('Ram', ['1500', '2500', '3500']),
+    ('Mazda', ['Mazda3', 'CX-5', 'Miata']),
+    ('BMW', ['328i', 'X3', 'X5']),
+]
+
+_LOCATIONS = ['Salt Lake City', 'Provo', 'Ogden', 'Sandy', 'Orem', 'Lehi',
+              'West Jordan', 'Layton', 'Draper', 'Murray']
+
+_TRIMS = ['LX', 'EX', 'SE', 'XLT', 'Limited', 'Sport', 'Premium', '4x4',
+          'AWD', 'clean title', 'one owner', '']
+
+
+def _title(rng):
+    make, models = rng.choice(_VEHICLES)
+    model = rng.choice(models)
+    year = rng.randint(1998, 2024)
+    trim = rng.choice(_TRIMS)
+    return f"{year} {make} {model} {trim}".strip()
+
+
+def craigslist_card(listing_id, rng, city="saltlakecity"):
+    """Render a single search result card"""
+    title = _title(rng)
+    if rng.random() < 0.4:
+        title += f" {rng.randint(30, 220)}k miles"
+    price = rng.randint(15, 600) * 100
+    location = rng.choice(_LOCATIONS)
+    slug = title.lower().replace(' ', '-')
+    href = f"https://{city}.craigslist.org/cto/d/{slug}/{listing_id}.html"
+    return (
+        f'<li class="cl-static-search-result" title="{title}">\n'
+        f'  <a href="{href}">\n'
+        f'    <div class="title">{title}</div>\n'
+        f'    <div class="details">\n'
+        f'      <div class="price">${price:,}</div>\n'
+        f'      <div class="location">\n          {location}\n        </div>\n'
+        f'    </div>\n'
+        f'  </a>\n'
+        f'</li>\n'
+    )
+
+
+def craigslist_page(offset=0, per_page=CL_PER_PAGE, city="saltlakecity", seed=462,
+                    first_id=7_800_000_000):
+    """Render the search results page starting at result index `offset`"""
+    rng = random.Random(seed * 1_000_003 + offset)
+    cards = ''.join(
+        craigslist_card(first_id - offset - i, rng, city)
+        for i in range(per_page)
+    )
+    return (
+        '<!DOCTYPE html>\n<html><head><title>salt lake city cars & trucks - '
+        'by owner - craigslist</title></head>\n<body>\n'
+        '<div class="cl-content"><main>\n'
+        '<ol class="cl-static-search-results">\n'
+        f'{cards}'
+        '</ol>\n</main></div>\n</body></html>\n'
+    )
+
+
+def craigslist_detail(listing_id, seed=462):
+    """Render a listing detail page (posting body plus attribute rows)"""
+    rng = random.Random(seed * 1_000_003 + listing_id)
+    title = _title(rng)
+    mileage = rng.randint(5, 250) * 1000
+    vin = ''.join(rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ0123456789') for _ in range(17))
+    return (
+        '<!DOCTYPE html>\n<html><head><title>{0}</title></head>\n<body>\n'
+        '<section id="postingbody">\n'
+        '<div class="print-information print-qrcode-container">\n'
+        '<p class="print-qrcode-label">QR Code Link to This Post</p></div>\n'
+        '{0}. Runs great, {1:,} miles, clean title.\nVIN {2}. Cash only.\n'
+        '</section>\n'
+        '<div class="attrgroup">\n'
+        '<div class="attr auto_miles"><span class="labl">odometer:</span>'
+        '<span class="valu">{1:,}</span></div>\n'
+        '<div class="attr auto_vin"><span class="labl">VIN:</span>'
+        '<span class="valu">{2}</span></div>\n'
+        '<div class="attr auto_transmission"><span class="labl">transmission:</span>'
+        '<span class="valu">{3}</span></div>\n'
+        '</div>\n</body></html>\n'
+    ).format(title, mileage, vin, rng.choice(['automatic', 'manual']))
+
+
+def ksl_card(listing_id, rng):
+    """Render a single KSL search result card"""
+    title = _title(rng)
+    price = rng.randint(15, 600) * 100
+    mileage = rng.randint(5, 250) * 1000
+    location = rng.choice(_LOCATIONS)
+    return (
+        '<div class="listing-item" data-listing-id="{0}">\n'
+        '  <a href="/listing/{0}" class="listing-link">\n'
+        '    <img src="https://img.ksl.com/{0}.jpg" alt="">\n'
+        '    <h3 class="listing-title">{1}</h3>\n'
+        '  </a>\n'
+        '  <div class="listing-details">\n'
+        '    <span class="listing-price">${2:,}</span>\n'
+        '    <span class="listing-mileage">{3:,} miles</span>\n'
+        '    <div class="listing-location">{4}, UT</div>\n'
+        '  </div>\n'
+        '</div>\n'
+    ).format(listing_id, title, price, mileage, location)
+
+
+def ksl_page(page=1, per_page=KSL_PER_PAGE, seed=462):
+    """Render KSL search results page number `page` (1-based)"""
+    rng = random.Random(seed * 1_000_003 + page)
+    first_id = 9_000_000 - (page - 1) * per_page
+    cards = ''.join(ksl_card(first_id - i, rng) for i in range(per_page))
+    return (
+        '<!DOCTYPE html>\n<html><head><title>KSL Cars</title></head>\n<body>\n'
+        f'<div class="search-results">\n{cards}</div>\n'
+        '</body></html>\n'
+    )
+
+
+def synthetic_listings(count, seed=462, reprice=0.0, id_prefix="cl_bench"):
+    """`count` scraped-listing dicts, as the scrapers return them.
+
+    With `reprice` > 0 that fraction of listings gets a different price
+    than the same call with reprice=0, to exercise price-change paths.
+    """
+    rng = random.Random(seed)
+    # Separate stream, so repricing doesn't change the other fields
+    jitter = random.Random(seed + 1)
+    listings = []
+    for i in range(count):
+        title = _title(rng)
+        price = float(rng.randint(15, 600) * 100)
+        if reprice and jitter.random() < reprice:
+            price += jitter.choice([-500.0, -250.0, 250.0, 500.0])
+        listings.append({
+            'external_id': f"{id_prefix}_{i}",
+            'source': 'craigslist',
+            'url': f"https://saltlakecity.craigslist.org/cto/d/x/{i}.html",
+            'title': title,
+            'price': price,
+            'year': int(title[:4]),
+            'make': None,
+            'model': None,
+            'mileage': rng.randint(5, 250) * 1000,
+            'location': rng.choice(_LOCATIONS),
+            'description': '',
+        })
+    return listings
+
+
+def synthetic_cassette(regions=("saltlakecity",), pages=2, ksl_pages=0, details=True):
+    """Cassette of fixture pages laid out at the live sites' URLs.
+
+    Each Craigslist region gets its own block of listing IDs, so regions
+    don't overlap. With details=True every Craigslist listing's detail
+    page is included too.
+    """
+    from src.scrapers.cassette import Cassette
+    
+    cassette = Cassette()
+    for index, region in enumerate(regions):
+        first_id = 7_800_000_000 - index * 1_000_000
+        for page in range(pages):
+            offset = page * CL_PER_PAGE
+            html = craigslist_page(offset, city=region, first_id=first_id)
+            cassette.add(f"https://{region}.craigslist.org/search/cta?s={offset}", html)
+            if not details:
+                continue
+            for url, listing_id in re.findall(r'href="([^"]+/(\d+)\.html)"', html):
+                cassette.add(url, craigslist_detail(int(listing_id)))
+    for page in range(1, ksl_pages + 1):
+        cassette.add(
+            f"https://cars.ksl.com/search/newused?page={page}&perPage={KSL_PER_PAGE}",
+            ksl_page(page)
+        )
+    return cassette
+
@@ -0,0 +1,81 @@
+"""Record a cassette of search (and detail) pages for offline replay.
+
+Live mode scrapes the configured targets (SCRAPE_TARGETS_FILE, or
+--targets) through a recording session; --details N also fetches the
+detail pages of the first N listings per target. --synthetic writes a
+cassette of fixture pages instead, so a machine that has never been
+online can still run bench_run_scrape.
+
+    python -m benchmarks.record_cassette cassettes/utah.json.gz --pages 3 --details 20
+    python -m benchmarks.record_cassette cassettes/synthetic.json.gz --synthetic --regions 8
+"""
+import argparse
+import os
+
+from benchmarks.fixtures import synthetic_cassette
+from src.scrapers.cassette import Cassette
+from src.scrapers.http_session import create_session
+from src.scrapers.rate_limiter import get_shared_rate_limiter
+from src.scrapers.regions import load_targets, target_name
+from src.scrapers.registry import get_scraper_class
+
+SYNTHETIC_REGIONS = ['saltlakecity', 'provo', 'ogden', 'logan', 'stgeorge',
+                     'boise', 'lasvegas', 'denver', 'phoenix', 'reno',
+                     'twinfalls', 'pocatello', 'grandjunction', 'flagstaff',
+                     'albuquerque', 'missoula']
+
+
+def record_live(cassette, targets, pages, details):
+    session = create_session()
+    cassette.attach(session)
+    limiter = get_shared_rate_limiter()
+    for target in targets:
+        scraper = get_scraper_class(target['source']).from_target(
+            target, rate_limiter=limiter, session=session
+        )
+        listings = scraper.scrape_listings(max_pages=pages)
+        for listing in listings[:details]:
+            try:
+                limiter.get(listing['url'], session=session, timeout=10)
+            except Exception as e:
+                print(f"  ⚠️ {listing['url']}: {e}")
+        print(f"{target_name(target)}: {len(listings)} listings, "
+              f"{min(details, len(listings))} detail pages")
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='Cassette file to write (gzipped JSON)')
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--details', type=int, default=0,
+                        help='Detail pages to record per target (live mode)')
+    parser.add_argument('--targets', help='Scrape targets JSON file (live mode)')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='Write fixture pages instead of recording live')
+    parser.add_argument('--regions', type=int, default=4,
+                        help='Craigslist regions in a synthetic cassette')
+    parser.add_argument('--ksl-pages', type=int, default=2,
+                        help='KSL pages in a synthetic cassette')
+    args = parser.parse_args()
+
+    if os.path.dirname(args.path):
+        os.makedirs(os.path.dirname(args.path), exist_ok=True)
+
+    if args.synthetic:
+        cassette = synthetic_cassette(
+            SYNTHETIC_REGIONS[:args.regions], pages=args.pages,
+            ksl_pages=args.ksl_pages
+        )
+        cassette.path = args.path
+    else:
+        cassette = Cassette(args.path)
+        record_live(cassette, load_targets(args.targets), args.pages, args.details)
+
+    count = cassette.save()
+    print(f"Wrote {count} responses to {args.path} "
+          f"({os.path.getsize(args.path) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Local HTTP server that stands in for a listing site during benchmarks."""
+import gzip
+import hashlib
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def make_self_signed_cert(directory):
+    """Create a throwaway cert/key for 127.0.0.1 with the openssl CLI"""
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', keyfile, '-out', certfile, '-days', '1',
+         '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+
+class StandInServer:
+    """Serve pages from `render(path, query)` on 127.0.0.1 with added latency.
+
+    `render` returns the body as a string, or None for a 404. `latency` is
+    slept inside every request to approximate the round trip to the real
+    site. With `tls=True` the server speaks HTTPS using a throwaway
+    self-signed cert (clients should pass `verify=server.certfile`); bodies
+    are gzipped when the client sends Accept-Encoding: gzip. Every page
+    carries an ETag and a matching If-None-Match gets a 304. Use as a
+    context manager; `base_url` is valid once entered.
+    """
+    
+    def __init__(self, render, latency=0.0, tls=False):
+        self.render = render
+        self.latency = latency
+        self.tls = tls
+        self.certfile = None
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+        self._tmpdir = None
+    
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        scheme = 'https' if self.tls else 'http'
+        return f"{scheme}://{host}:{port}"
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                with server._lock:
+                    server.connection_count += 1
+                super().setup()
+            
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                
+                parsed = urlparse(self.path)
+                body = server.render(parsed.path, parse_qs(parsed.query))
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                
+                payload = body.encode('utf-8')
+                etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                
+                gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+                if gzipped:
+                    payload = gzip.compress(payload, compresslevel=5)
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', etag)
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def __enter__(self):
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        if self.tls:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.certfile, keyfile = make_self_signed_cert(self._tmpdir.name)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.certfile, keyfile)
+            self._httpd.socket = context.wrap_socket(
+                self._httpd.socket, server_side=True
+            )
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        if self._tmpdir:
+            self._tmpdir.cleanup()
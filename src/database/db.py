@@ -1,83 +1,676 @@
 import psycopg
 from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+from contextlib import contextmanager, ExitStack
+from decimal import Decimal
+import hashlib
+import json
 import os
+import threading
+import re
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import date
 
 load_dotenv()
 
+# Listing fields the scrape writes, in the order bulk_upsert_listings
+# COPYs them: the scraped fields plus their content_hash
+LISTING_COLUMN_TYPES = [
+    ('external_id', 'VARCHAR(255)'),
+    ('source', 'VARCHAR(50)'),
+    ('region', 'VARCHAR(100)'),
+    ('url', 'TEXT'),
+    ('title', 'TEXT'),
+    ('price', 'DECIMAL(10,2)'),
+    ('year', 'INTEGER'),
+    ('make', 'VARCHAR(100)'),
+    ('model', 'VARCHAR(100)'),
+    ('mileage', 'INTEGER'),
+    ('location', 'VARCHAR(255)'),
+    ('description', 'TEXT'),
+    ('content_hash', 'CHAR(32)'),
+]
+LISTING_COLUMNS = [name for name, _ in LISTING_COLUMN_TYPES]
+
+# What a results page says about a listing; content_hash fingerprints
+# these, and a changed fingerprint rewrites them all
+CONTENT_FIELDS = ['url', 'title', 'price', 'year', 'make', 'model',
+                  'mileage', 'location', 'description']
+
+# ON CONFLICT update shared by insert_listing and bulk_upsert_listings.
+# Right-hand `listings.*` references see the row as it was before the
+# update, so a price change keeps the old price in previous_price and
+# stamps price_changed_at; RETURNING can then report the change without
+# a price_history lookup (NOW() is fixed for the transaction, so
+# price_changed_at = NOW() means "changed in this transaction").
+# A listing that is still active with the same content is left alone: no
+# row version is written and RETURNING skips it. Once the detail page has
+# been fetched, its description and mileage win over the results page's
+# snippet.
+UPSERT_ON_CONFLICT = """
+    ON CONFLICT (external_id) DO UPDATE SET
+        previous_price = CASE
+            WHEN listings.price IS DISTINCT FROM EXCLUDED.price THEN listings.price
+            ELSE listings.previous_price
+        END,
+        price_changed_at = CASE
+            WHEN listings.price IS DISTINCT FROM EXCLUDED.price THEN NOW()
+            ELSE listings.price_changed_at
+        END,
+        price = EXCLUDED.price,
+        url = EXCLUDED.url,
+        title = EXCLUDED.title,
+        year = EXCLUDED.year,
+        make = EXCLUDED.make,
+        model = EXCLUDED.model,
+        location = EXCLUDED.location,
+        description = CASE
+            WHEN listings.details_fetched_at IS NULL THEN EXCLUDED.description
+            ELSE COALESCE(listings.description, EXCLUDED.description)
+        END,
+        mileage = CASE
+            WHEN listings.details_fetched_at IS NULL THEN EXCLUDED.mileage
+            ELSE COALESCE(listings.mileage, EXCLUDED.mileage)
+        END,
+        content_hash = EXCLUDED.content_hash,
+        is_active = TRUE,
+        deactivated_at = NULL,
+        last_seen = NOW(),
+        updated_at = NOW()
+    WHERE listings.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    OR NOT listings.is_active
+    RETURNING id, external_id, content_hash, url, title, price, previous_price,
+        year, make, model, mileage, location, description,
+        (xmax = 0) AS inserted,
+        COALESCE(price_changed_at = NOW(), FALSE) AS price_changed
+"""
+
+def content_hash(listing):
+    """Fingerprint of a listing's CONTENT_FIELDS
+    
+    Whitespace in text is collapsed and prices are compared to the cent,
+    so formatting noise between scrapes doesn't count as a change.
+    """
+    values = []
+    for field in CONTENT_FIELDS:
+        value = listing.get(field)
+        if isinstance(value, str):
+            value = ' '.join(value.split()) or None
+        elif field == 'price' and value is not None:
+            value = f"{Decimal(str(value)):.2f}"
+        values.append(value)
+    return hashlib.md5(json.dumps(values, default=str).encode()).hexdigest()
+
+def listing_values(listing):
+    """LISTING_COLUMNS values for a scraped listing dict"""
+    values = {column: listing.get(column) for column in LISTING_COLUMNS}
+    values['content_hash'] = content_hash(listing)
+    return values
+
+def restore_query(external_ids):
+    """Statement moving archived listings back into listings
+    
+    Restores the listings_archive rows whose external_id is in the
+    `external_ids` SELECT, with their ids, daily price points,
+    listing_changes and alert_matches rows (for alerts that still exist),
+    so a listing that reappears after archival is updated like any other
+    inactive listing: it keeps its history and doesn't alert again.
+    
+    Only external_ids missing from listings are looked up in the archive:
+    the ones the upsert that follows would otherwise insert (xmax = 0). A
+    batch of mostly known listings costs one listings_archive index probe
+    per new listing rather than per row. Restoring before the upsert rather
+    than after it lets the upsert update the restored row in place.
+    """
+    columns = ', '.join(ARCHIVE_COLUMNS)
+    stats = stats_delta_query("""
+        SELECT -1 AS n, TRUE AS archived, is_active,
+            previous_price IS NOT NULL AS has_changes, price, make
+        FROM restored
+        UNION ALL
+        SELECT 1, FALSE, is_active, previous_price IS NOT NULL, price, make
+        FROM restored
+    """)
+    return f"""
+    WITH restored AS (
+        DELETE FROM listings_archive
+        WHERE external_id IN (
+            SELECT candidate.external_id
+            FROM ({external_ids}) AS candidate (external_id)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM listings
+                WHERE listings.external_id = candidate.external_id
+            )
+        )
+        RETURNING *
+    ),
+    listing AS (
+        INSERT INTO listings ({columns})
+        SELECT {columns} FROM restored
+        RETURNING id
+    ),
+    daily AS (
+        INSERT INTO price_history_daily (
+            listing_id, day, min_price, max_price, last_price, samples, last_recorded_at
+        )
+        SELECT
+            restored.id,
+            (point->>'recorded_at')::timestamp::date,
+            (point->>'min_price')::numeric,
+            (point->>'max_price')::numeric,
+            (point->>'price')::numeric,
+            COALESCE((point->>'samples')::integer, 1),
+            (point->>'recorded_at')::timestamp
+        FROM restored, jsonb_array_elements(restored.price_history) point
+    ),
+    changes AS (
+        INSERT INTO listing_changes (listing_id, changes, changed_at)
+        SELECT restored.id, change->'changes', (change->>'changed_at')::timestamp
+        FROM restored, jsonb_array_elements(restored.changes) change
+    ),
+    matches AS (
+        INSERT INTO alert_matches (alert_id, listing_id, matched_at, notified)
+        SELECT alerts.id, restored.id, (match->>'matched_at')::timestamp,
+            (match->>'notified')::boolean
+        FROM restored, jsonb_array_elements(restored.alert_matches) match
+        JOIN alerts ON alerts.id = (match->>'alert_id')::integer
+    ),
+    {stats}
+    SELECT COUNT(*) AS restored FROM listing;
+    """
+
+def upsert_query(incoming, price_history=False):
+    """Statement upserting the rows of the `incoming` SELECT
+    
+    `incoming` selects LISTING_COLUMNS with unique external_ids. The
+    statement ends in a `written` CTE with one row per listing inserted or
+    updated, content_changed set when an existing listing's fingerprint
+    moved. Every CTE reads the table as it was before the statement, so
+    `previous` holds the rows being replaced; with LISTING_CHANGE_LOG on
+    (the default) the fields that moved are recorded in listing_changes.
+    With price_history=True new listings and changed prices also get a
+    price_history row. The stats snapshot counters move with the rows.
+    """
+    columns = ', '.join(LISTING_COLUMNS)
+    query = f"""
+        WITH incoming AS ({incoming}),
+        previous AS (
+            SELECT listings.id, listings.content_hash, listings.is_active,
+                listings.previous_price,
+                {', '.join(f'listings.{field}' for field in CONTENT_FIELDS)}
+            FROM listings
+            JOIN incoming ON incoming.external_id = listings.external_id
+        ),
+        upserted AS (
+            INSERT INTO listings ({columns})
+            SELECT {columns} FROM incoming
+            {UPSERT_ON_CONFLICT}
+        ),
+    """
+    if os.getenv('LISTING_CHANGE_LOG', '1') != '0':
+        moved = ',\n'.join(
+            f"'{field}', CASE WHEN p.{field} IS DISTINCT FROM u.{field} "
+            f"THEN jsonb_build_array(p.{field}, u.{field}) END"
+            for field in CONTENT_FIELDS
+        )
+        query += f"""
+        changes AS (
+            INSERT INTO listing_changes (listing_id, changes)
+            SELECT id, changes FROM (
+                SELECT u.id, jsonb_strip_nulls(jsonb_build_object({moved})) AS changes
+                FROM upserted u
+                JOIN previous p ON p.id = u.id
+                WHERE p.content_hash IS DISTINCT FROM u.content_hash
+            ) moved
+            WHERE changes <> '{{}}'::jsonb
+        ),
+        """
+    price_records = '0'
+    if price_history:
+        query += """
+        history AS (
+            INSERT INTO price_history (listing_id, price)
+            SELECT id, price FROM upserted
+            WHERE price IS NOT NULL
+            AND (inserted OR (price_changed AND previous_price IS DISTINCT FROM price))
+            RETURNING listing_id
+        ),
+        """
+        price_records = 'SELECT COUNT(*) FROM history'
+    # Written rows are active; an update also leaves its previous state
+    stats = stats_delta_query("""
+        SELECT 1 AS n, FALSE AS archived, TRUE AS is_active,
+            u.previous_price IS NOT NULL AS has_changes, u.price, u.make
+        FROM upserted u
+        UNION ALL
+        SELECT -1, FALSE, p.is_active, p.previous_price IS NOT NULL, p.price, p.make
+        FROM upserted u
+        JOIN previous p ON p.id = u.id
+    """, price_records)
+    return query + f"""
+        {stats},
+        written AS (
+            SELECT u.id, u.external_id, u.price, u.previous_price,
+                u.inserted, u.price_changed,
+                (NOT u.inserted AND p.content_hash IS DISTINCT FROM u.content_hash)
+                    AS content_changed
+            FROM upserted u
+            LEFT JOIN previous p ON p.id = u.id
+        )
+    """
+
+# Upper bounds of the stats page's price distribution buckets; the last
+# bucket is everything from the final edge up
+PRICE_BUCKET_EDGES = [5000, 10000, 15000, 20000, 30000, 50000]
+
+def price_bucket_conditions():
+    """SQL condition on price for each distribution bucket, lowest first"""
+    conditions = []
+    lower = None
+    for edge in PRICE_BUCKET_EDGES + [None]:
+        bounds = [f"price >= {lower}"] if lower is not None else []
+        if edge is not None:
+            bounds.append(f"price < {edge}")
+        conditions.append(' AND '.join(bounds))
+        lower = edge
+    return conditions
+
+def stats_delta_query(states, price_records='0'):
+    """CTEs moving the stats_snapshot counters along with a write
+    
+    `states` selects (n, archived, is_active, has_changes, price, make)
+    rows for the listings the statement touched: n = -1 for the state a
+    listing left and 1 for the state it is in now (a new listing only has
+    the latter). Their sums are added to the snapshot's counters and to
+    stats_make_counts in the same statement, so the counters commit or
+    roll back with the write. `price_records` selects how many
+    price_history rows the statement added.
+    """
+    conditions = price_bucket_conditions()
+    bucket_sums = ''.join(
+        f",\n                COALESCE(SUM(n) FILTER (WHERE is_active AND {condition}), 0)"
+        f" AS bucket_{i}"
+        for i, condition in enumerate(conditions, 1)
+    )
+    buckets = ', '.join(
+        f"COALESCE(stats_snapshot.price_buckets[{i}], 0) + d.bucket_{i}"
+        for i in range(1, len(conditions) + 1)
+    )
+    return f"""
+        stat_states AS ({states}),
+        stats_delta AS (
+            UPDATE stats_snapshot SET
+                total_listings = stats_snapshot.total_listings + d.total,
+                active_listings = stats_snapshot.active_listings + d.active,
+                archived_listings = stats_snapshot.archived_listings + d.archived,
+                listings_with_changes = stats_snapshot.listings_with_changes + d.with_changes,
+                price_records = stats_snapshot.price_records + ({price_records}),
+                priced_listings = stats_snapshot.priced_listings + d.priced,
+                price_sum = stats_snapshot.price_sum + d.price_sum,
+                price_buckets = ARRAY[{buckets}]
+            FROM (
+                SELECT
+                    COALESCE(SUM(n), 0) AS total,
+                    COALESCE(SUM(n) FILTER (WHERE is_active), 0) AS active,
+                    COALESCE(SUM(n) FILTER (WHERE archived), 0) AS archived,
+                    COALESCE(SUM(n) FILTER (WHERE has_changes AND NOT archived), 0)
+                        AS with_changes,
+                    COALESCE(SUM(n) FILTER (WHERE is_active AND price IS NOT NULL), 0)
+                        AS priced,
+                    COALESCE(SUM(n * price) FILTER (WHERE is_active), 0) AS price_sum{bucket_sums}
+                FROM stat_states
+            ) d
+            WHERE stats_snapshot.id = 1
+            -- Nothing moved: don't write a new row version
+            AND EXISTS (SELECT 1 FROM stat_states)
+            RETURNING stats_snapshot.id
+        ),
+        make_delta AS (
+            -- After stats_delta, so concurrent writers queue on the
+            -- snapshot row rather than deadlock on the make rows
+            INSERT INTO stats_make_counts (make, listings)
+            SELECT make, SUM(n) FROM stat_states
+            WHERE is_active AND make IS NOT NULL
+            AND EXISTS (SELECT 1 FROM stats_delta)
+            GROUP BY make
+            HAVING SUM(n) <> 0
+            ON CONFLICT (make) DO UPDATE SET
+                listings = stats_make_counts.listings + EXCLUDED.listings
+        )
+    """
+
+RECENT_PRICE_DROPS_QUERY = """
+    SELECT id, title, url, price, previous_price, price_changed_at,
+        previous_price - price AS drop_amount
+    FROM listings
+    WHERE price < previous_price
+    AND price_changed_at > NOW() - make_interval(days => %(days)s)
+    AND is_active = TRUE
+    ORDER BY price_changed_at DESC
+    LIMIT %(limit)s
+"""
+
+# Monthly price_history partitions are named for the month they hold
+PARTITION_NAME = re.compile(r'^price_history_y(\d{4})m(\d{2})$')
+
+def partition_name(month):
+    return f"price_history_y{month.year}m{month.month:02d}"
+
+def add_months(month, months):
+    """First day of the month `months` after (or before) `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+# Columns listings and listings_archive share; search_vector is generated
+# in both
+ARCHIVE_COLUMNS = ['id', 'external_id', 'source', 'region', 'url', 'title', 'price',
+                   'previous_price', 'price_changed_at', 'year', 'make', 'model',
+                   'mileage', 'location', 'description', 'vin', 'attributes',
+                   'details_fetched_at', 'content_hash', 'first_seen', 'last_seen',
+                   'is_active', 'deactivated_at', 'created_at', 'updated_at']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_conninfo():
+    """Connection string for PostgreSQL"""
+    # Check if we're on Render (uses DATABASE_URL)
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        # Production (Render)
+        return database_url
+    
+    # Local development
+    return f"host={os.getenv('DB_HOST', 'localhost')} " \
+           f"dbname={os.getenv('DB_NAME', 'carwatch')} " \
+           f"user={os.getenv('DB_USER', os.getenv('USER'))} " \
+           f"password={os.getenv('DB_PASSWORD', '')} " \
+           f"port={os.getenv('DB_PORT', '5432')}"
+
+def get_pool():
+    """The process-wide connection pool, opened on first use
+    
+    Sized and tuned by DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT
+    (seconds to wait for a free connection), DB_POOL_MAX_IDLE and
+    DB_POOL_MAX_LIFETIME (seconds) and DB_CONNECT_TIMEOUT. Connections are
+    health-checked on checkout unless DB_POOL_CHECK=0. DB_POOL_MAX_SIZE=0
+    turns pooling off, and get_pool() returns None.
+    
+    The pool is created lazily so each gunicorn worker gets its own after
+    the fork.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            max_size = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+            if max_size <= 0:
+                return None
+            check = os.getenv('DB_POOL_CHECK', '1') != '0'
+            _pool = ConnectionPool(
+                get_conninfo(),
+                min_size=min(int(os.getenv('DB_POOL_MIN_SIZE', '1')), max_size),
+                max_size=max_size,
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                max_idle=float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+                max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+                check=ConnectionPool.check_connection if check else None,
+                kwargs={'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10'))},
+                name='carwatch',
+                open=True,
+            )
+        return _pool
+
+def close_pool():
+    """Close the shared pool; the next get_pool() opens a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
 class Database:
-    def __init__(self):
+    def __init__(self, pooled=True):
         self.conn = None
+        self._transaction_depth = 0
+        self.pool = get_pool() if pooled else None
         self.connect()
     
     def connect(self):
-        """Connect to PostgreSQL database"""
+        """Connect to PostgreSQL database
+        
+        Checks a connection out of the shared pool when there is one;
+        close() hands it back.
+        """
         try:
-            # Check if we're on Render (uses DATABASE_URL)
-            database_url = os.getenv('DATABASE_URL')
-            
-            if database_url:
-                # Production (Render)
-                self.conn = psycopg.connect(database_url)
+            if self.pool is not None:
+                self.conn = self.pool.getconn()
             else:
-                # Local development
-                conninfo = f"host={os.getenv('DB_HOST', 'localhost')} " \
-                          f"dbname={os.getenv('DB_NAME', 'carwatch')} " \
-                          f"user={os.getenv('DB_USER', os.getenv('USER'))} " \
-                          f"password={os.getenv('DB_PASSWORD', '')} " \
-                          f"port={os.getenv('DB_PORT', '5432')}"
-                
-                self.conn = psycopg.connect(conninfo)
+                self.conn = psycopg.connect(
+                    get_conninfo(),
+                    connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+                )
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             raise
     
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a SQL query"""
+    def execute_query(self, query, params=None, fetch=False, prepare=None):
+        """Execute a SQL query
+        
+        Commits straight away unless called inside transaction(). With
+        prepare=True the statement is prepared on the server the first time
+        this connection runs it (psycopg otherwise waits for the fifth run).
+        """
         try:
             with self.conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(query, params)
+                cur.execute(query, params, prepare=prepare)
                 if fetch:
                     result = cur.fetchall()
-                    self.conn.commit()  # ✅ COMMIT BEFORE RETURNING!
+                    self._commit()  # ✅ COMMIT BEFORE RETURNING!
                     return result
-                self.conn.commit()
+                self._commit()
                 return cur.rowcount
         except Exception as e:
-            self.conn.rollback()
+            if not self._transaction_depth:
+                self.conn.rollback()
             raise
     
+    def execute_many(self, query, params_seq):
+        """Execute one statement for each params in `params_seq`
+        
+        psycopg sends the whole batch as a pipeline of prepared executions,
+        so it costs one round trip rather than one per row.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.executemany(query, params_seq)
+                self._commit()
+                return cur.rowcount
+        except Exception:
+            if not self._transaction_depth:
+                self.conn.rollback()
+            raise
+    
+    def fetch_many(self, queries):
+        """Run several (query, params) SELECTs in one pipelined round trip
+        
+        Returns one list of rows per query, in order.
+        """
+        with self.transaction(pipeline=True):
+            cursors = []
+            try:
+                for query, params in queries:
+                    cur = self.conn.cursor(row_factory=dict_row)
+                    cursors.append(cur)
+                    cur.execute(query, params)
+                return [cur.fetchall() for cur in cursors]
+            finally:
+                for cur in cursors:
+                    cur.close()
+    
+    @contextmanager
+    def transaction(self, pipeline=False):
+        """Group execute_query calls into one transaction with one commit
+        
+        Rolls back everything if the block raises. Nested blocks become
+        savepoints, so an inner failure only undoes the inner block. With
+        pipeline=True statements are sent without waiting for each result
+        (psycopg pipeline mode): writes whose results are not fetched cost
+        no round trip of their own, and their rowcount is not available.
+        """
+        with ExitStack() as stack:
+            if pipeline:
+                stack.enter_context(self.conn.pipeline())
+            stack.enter_context(self.conn.transaction())
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+    
+    def _commit(self):
+        if not self._transaction_depth:
+            self.conn.commit()
+    
     def close(self):
-        """Close database connection"""
-        if self.conn:
+        """Return the connection to the pool, or close it if not pooled"""
+        if self.conn is None:
+            return
+        if self.pool is not None:
+            self.pool.putconn(self.conn)
+        else:
             self.conn.close()
+        self.conn = None
 
     def insert_listing(self, listing_data):
-        """Insert or update a listing"""
-        query = """
-        INSERT INTO listings (
-            external_id, source, url, title, price, year, 
-            make, model, mileage, location, description
-        ) VALUES (
-            %(external_id)s, %(source)s, %(url)s, %(title)s, %(price)s, %(year)s,
-            %(make)s, %(model)s, %(mileage)s, %(location)s, %(description)s
+        """Insert or update a listing
+        
+        Returns id, price, previous_price, inserted, price_changed and
+        content_changed, so callers can tell new listings and changes apart
+        without reading price_history. Returns no row for a listing that is
+        already stored, active and unchanged. An archived listing with the
+        same external_id is restored first.
+        """
+        values = listing_values(listing_data)
+        self.execute_query(
+            restore_query("SELECT %(external_id)s::VARCHAR(255)"), values, prepare=True
         )
-        ON CONFLICT (external_id) DO UPDATE SET
-            price = EXCLUDED.price,
-            last_seen = NOW(),
+        incoming = "SELECT " + ", ".join(
+            f"%({column})s::{column_type} AS {column}"
+            for column, column_type in LISTING_COLUMN_TYPES
+        )
+        query = upsert_query(incoming) + "SELECT * FROM written;"
+        return self.execute_query(query, values, fetch=True, prepare=True)
+    
+    def bulk_upsert_listings(self, listings):
+        """Upsert a batch of listings and their price history in one transaction
+        
+        The batch is COPYed into a temp staging table and merged with a
+        single INSERT ... ON CONFLICT, after archived listings among them
+        are restored. Price history rows are written only for new listings
+        and changed prices. Inside transaction() the batch is a savepoint of
+        the caller's transaction and commits nothing itself. Returns counts
+        plus one row per listing written (id, external_id, price, old_price,
+        inserted, content_changed) for the caller to log from; unchanged
+        listings are only counted.
+        """
+        columns = ', '.join(LISTING_COLUMNS)
+        with self.transaction():
+            with self.conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(f"""
+                    CREATE TEMP TABLE listing_staging (
+                        ord INTEGER,
+                        {', '.join(f'{c} {t}' for c, t in LISTING_COLUMN_TYPES)}
+                    ) ON COMMIT DROP;
+                """)
+                with cur.copy(f"COPY listing_staging (ord, {columns}) FROM STDIN") as copy:
+                    for i, listing in enumerate(listings):
+                        values = listing_values(listing)
+                        copy.write_row([i] + [values[c] for c in LISTING_COLUMNS])
+                
+                cur.execute(restore_query("SELECT external_id FROM listing_staging"))
+                
+                # A listing repeated in the batch: the last copy wins
+                incoming = """
+                    SELECT DISTINCT ON (external_id) *
+                    FROM listing_staging
+                    ORDER BY external_id, ord DESC
+                """
+                cur.execute(upsert_query(incoming, price_history=True) + """,
+                    diff AS (
+                        SELECT id, external_id, price, inserted, content_changed,
+                            CASE
+                                WHEN inserted THEN NULL
+                                WHEN price_changed THEN previous_price
+                                ELSE price
+                            END AS old_price
+                        FROM written
+                    )
+                    SELECT * FROM diff;
+                """)
+                rows = cur.fetchall()
+                # Dropped here too, so a caller's transaction can stage
+                # several batches
+                cur.execute("DROP TABLE listing_staging;")
+        
+        result = {
+            'new': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'changed': 0,
+            'price_increases': 0,
+            'price_decreases': 0,
+            'rows': rows
+        }
+        distinct = len({listing['external_id'] for listing in listings})
+        for row in rows:
+            if row['inserted']:
+                result['new'] += 1
+                continue
+            if row['content_changed']:
+                result['changed'] += 1
+            if row['old_price'] is not None and row['price'] is not None:
+                if row['price'] > row['old_price']:
+                    result['price_increases'] += 1
+                elif row['price'] < row['old_price']:
+                    result['price_decreases'] += 1
+        result['updated'] = distinct - result['new']
+        result['unchanged'] = distinct - len(rows)
+        return result
+    
+    def update_listing_details(self, listing_id, details):
+        """Fill in description, mileage, VIN and attributes from a detail page"""
+        query = """
+        UPDATE listings SET
+            description = COALESCE(%(description)s, description),
+            mileage = COALESCE(%(mileage)s, mileage),
+            vin = COALESCE(%(vin)s, vin),
+            attributes = COALESCE(%(attributes)s, attributes),
+            details_fetched_at = NOW(),
             updated_at = NOW()
-        RETURNING id, price;
+        WHERE id = %(id)s;
         """
-        return self.execute_query(query, listing_data, fetch=True)
+        params = {
+            'id': listing_id,
+            'description': details.get('description'),
+            'mileage': details.get('mileage'),
+            'vin': details.get('vin'),
+            'attributes': Jsonb(details['attributes']) if details.get('attributes') else None,
+        }
+        return self.execute_query(query, params)
     
     def insert_price_history(self, listing_id, price):
-        """Insert price history record"""
+        """Insert price history record, counting it in the stats snapshot"""
         query = """
-        INSERT INTO price_history (listing_id, price)
-        VALUES (%s, %s);
+        WITH added AS (
+            INSERT INTO price_history (listing_id, price)
+            VALUES (%s, %s)
+            RETURNING id
+        )
+        UPDATE stats_snapshot SET price_records = price_records + (SELECT COUNT(*) FROM added)
+        WHERE id = 1;
         """
-        return self.execute_query(query, (listing_id, price))
+        return self.execute_query(query, (listing_id, price), prepare=True)
     
     def get_listing_current_price(self, listing_id):
         """Get current price of a listing"""
@@ -102,16 +695,103 @@ class Database:
         result = self.execute_query(query, (listing_id,), fetch=True)
         return result[0]['count'] > 0
     
-    def mark_stale_listings_inactive(self, days=7):
-        """Mark listings as inactive if not seen in X days"""
-        query = """
-        UPDATE listings 
-        SET is_active = FALSE 
-        WHERE last_seen < NOW() - INTERVAL '%s days' 
-        AND is_active = TRUE
-        RETURNING id, title;
+    def get_recent_price_drops(self, days=7, limit=20):
+        """Active listings whose price went down in the last `days` days"""
+        return self.execute_query(
+            RECENT_PRICE_DROPS_QUERY, {'days': days, 'limit': limit}, fetch=True
+        )
+    
+    def start_scrape_run(self, incremental=False):
+        """Record the start of a scrape run and return its id"""
+        query = "INSERT INTO scrape_runs (incremental) VALUES (%s) RETURNING id;"
+        return self.execute_query(query, (incremental,), fetch=True)[0]['id']
+    
+    def finish_scrape_run(self, run_id, status, stats=None, targets=(), deactivated=0):
+        """Record how a scrape run ended and what each of its targets covered
+        
+        `targets` holds one dict per target: source, region, pages,
+        listings, swept and error. Only a running run is updated, so a step
+        failing after the run was recorded as completed can't downgrade it.
+        Returns whether the run was updated.
         """
-        return self.execute_query(query, (days,), fetch=True)
+        stats = stats or {}
+        with self.transaction():
+            updated = self.execute_query("""
+            UPDATE scrape_runs SET
+                status = %s,
+                finished_at = NOW(),
+                listings_seen = %s,
+                new_listings = %s,
+                updated_listings = %s,
+                deactivated_listings = %s
+            WHERE id = %s AND status = 'running';
+            """, (status, stats.get('new', 0) + stats.get('updated', 0),
+                  stats.get('new', 0), stats.get('updated', 0), deactivated, run_id))
+            if updated and targets:
+                self.execute_many("""
+                INSERT INTO scrape_run_targets
+                    (run_id, source, region, pages, listings, swept, error)
+                VALUES (%s, %s, %s, %s, %s, %s, %s);
+                """, [(run_id, t['source'], t['region'], t['pages'], t['listings'],
+                       t['swept'], t['error']) for t in targets])
+        return bool(updated)
+    
+    def deactivate_unseen_listings(self, seen_ids, scopes):
+        """Mark active listings in `scopes` that are not in `seen_ids` inactive
+        
+        `scopes` are the (source, region) pairs a run swept completely and
+        `seen_ids` every external_id the run saw, in any region. The seen
+        IDs are COPYed into a temp table and anti-joined against the
+        active listings of those scopes, so nothing outside them is read
+        and only the listings that disappeared are written.
+        """
+        if not scopes:
+            return []
+        stats = stats_delta_query("""
+            SELECT -1 AS n, FALSE AS archived, TRUE AS is_active,
+                previous_price IS NOT NULL AS has_changes, price, make
+            FROM gone
+            UNION ALL
+            SELECT 1, FALSE, FALSE, previous_price IS NOT NULL, price, make
+            FROM gone
+        """)
+        try:
+            with self.conn.cursor(row_factory=dict_row) as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE seen_listings (
+                        external_id VARCHAR(255) PRIMARY KEY
+                    ) ON COMMIT DROP;
+                """)
+                with cur.copy("COPY seen_listings (external_id) FROM STDIN") as copy:
+                    for external_id in seen_ids:
+                        copy.write_row([external_id])
+                cur.execute("ANALYZE seen_listings;")
+                cur.execute(f"""
+                    WITH gone AS (
+                        UPDATE listings
+                        SET is_active = FALSE, deactivated_at = NOW()
+                        FROM unnest(%s::text[], %s::text[]) AS scope(source, region)
+                        WHERE listings.is_active = TRUE
+                        AND listings.source = scope.source
+                        AND listings.region IS NOT DISTINCT FROM scope.region
+                        AND NOT EXISTS (
+                            SELECT 1 FROM seen_listings
+                            WHERE seen_listings.external_id = listings.external_id
+                        )
+                        RETURNING listings.id, listings.title, listings.price,
+                            listings.previous_price, listings.make
+                    ),
+                    {stats}
+                    SELECT id, title FROM gone;
+                """, ([source for source, _ in scopes], [region for _, region in scopes]))
+                rows = cur.fetchall()
+                cur.execute("DROP TABLE seen_listings;")
+            self._commit()
+        except Exception:
+            if not self._transaction_depth:
+                self.conn.rollback()
+            raise
+        return rows
     
     def get_all_active_external_ids(self):
         """Get all external IDs of currently active listings"""
@@ -119,35 +799,370 @@ class Database:
         results = self.execute_query(query, fetch=True)
         return {row['external_id'] for row in results}
     
-    def get_stats(self):
-        """Get database statistics"""
-        stats = {}
+    def ensure_price_history_partitions(self, months_ahead=2):
+        """Create the monthly price_history partitions from this month to
+        `months_ahead` months out, returning the names of those created
         
-        # Total listings
-        result = self.execute_query("SELECT COUNT(*) as count FROM listings;", fetch=True)
-        stats['total_listings'] = result[0]['count']
+        Rows that already landed in price_history_default for a month are
+        moved into its partition before it is attached.
+        """
+        created = []
+        month = date.today().replace(day=1)
+        for _ in range(months_ahead + 1):
+            start, end = month, add_months(month, 1)
+            name = partition_name(start)
+            exists = self.execute_query(
+                "SELECT to_regclass(%s) IS NOT NULL AS exists;", (name,), fetch=True
+            )[0]['exists']
+            if not exists:
+                with self.transaction():
+                    self.execute_query(f"""
+                    CREATE TABLE {name}
+                    (LIKE price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS);
+                    """)
+                    self.execute_query(f"""
+                    WITH moved AS (
+                        DELETE FROM price_history_default
+                        WHERE recorded_at >= %s AND recorded_at < %s
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved;
+                    """, (start, end))
+                    self.execute_query(f"""
+                    ALTER TABLE price_history ATTACH PARTITION {name}
+                    FOR VALUES FROM ('{start}') TO ('{end}');
+                    """)
+                created.append(name)
+            month = end
+        return created
+    
+    def rollup_price_history(self, since=None, until=None):
+        """Recompute price_history_daily for the days from `since` up to
+        `until` (dates, `until` exclusive) and return the rows written
         
-        # Active listings
-        result = self.execute_query(
-            "SELECT COUNT(*) as count FROM listings WHERE is_active = TRUE;",
-            fetch=True
+        Without `since` it starts from the last day already rolled up, so a
+        regular run only reads the newest partition. Days are recomputed
+        whole, so running it again is harmless.
+        """
+        if since is None:
+            since = self.execute_query(
+                "SELECT MAX(day) AS day FROM price_history_daily;", fetch=True
+            )[0]['day']
+        query = """
+        INSERT INTO price_history_daily (
+            listing_id, day, min_price, max_price, last_price, samples, last_recorded_at
         )
-        stats['active_listings'] = result[0]['count']
+        SELECT
+            listing_id,
+            recorded_at::date,
+            MIN(price),
+            MAX(price),
+            (array_agg(price ORDER BY recorded_at DESC, id DESC))[1],
+            COUNT(*),
+            MAX(recorded_at)
+        FROM price_history
+        WHERE (%(since)s::date IS NULL OR recorded_at >= %(since)s::date)
+        AND (%(until)s::date IS NULL OR recorded_at < %(until)s::date)
+        GROUP BY listing_id, recorded_at::date
+        ON CONFLICT (listing_id, day) DO UPDATE SET
+            min_price = EXCLUDED.min_price,
+            max_price = EXCLUDED.max_price,
+            last_price = EXCLUDED.last_price,
+            samples = EXCLUDED.samples,
+            last_recorded_at = EXCLUDED.last_recorded_at;
+        """
+        return self.execute_query(query, {'since': since, 'until': until})
+    
+    def drop_expired_price_history(self, months):
+        """Drop raw price history older than `months` whole months
         
-        # Inactive listings
-        stats['inactive_listings'] = stats['total_listings'] - stats['active_listings']
+        Monthly partitions that ended before the cutoff are dropped whole
+        and older rows in the default partition are deleted, each after
+        their days are rolled up. The stats snapshot's price_records is
+        reduced to match. Returns the names of the partitions dropped.
+        """
+        cutoff = add_months(date.today().replace(day=1), -months)
+        partitions = self.execute_query("""
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'price_history'::regclass
+        ORDER BY c.relname;
+        """, fetch=True)
         
-        # Price history records
-        result = self.execute_query("SELECT COUNT(*) as count FROM price_history;", fetch=True)
-        stats['price_records'] = result[0]['count']
+        dropped = []
+        for partition in partitions:
+            match = PARTITION_NAME.match(partition['name'])
+            if not match:
+                continue
+            start = date(int(match.group(1)), int(match.group(2)), 1)
+            end = add_months(start, 1)
+            if end > cutoff:
+                continue
+            with self.transaction():
+                self.rollup_price_history(start, end)
+                removed = self.execute_query(
+                    f"SELECT COUNT(*) AS count FROM {partition['name']};", fetch=True
+                )[0]['count']
+                self.execute_query(f"DROP TABLE {partition['name']};")
+                self._uncount_price_records(removed)
+            dropped.append(partition['name'])
         
-        # Listings with price changes
-        result = self.execute_query("""
-            SELECT COUNT(DISTINCT listing_id) as count 
-            FROM price_history 
-            GROUP BY listing_id 
-            HAVING COUNT(*) > 1;
-        """, fetch=True)
-        stats['listings_with_changes'] = result[0]['count'] if result else 0
+        with self.transaction():
+            oldest = self.execute_query(
+                "SELECT MIN(recorded_at)::date AS day FROM price_history_default;", fetch=True
+            )[0]['day']
+            if oldest is not None and oldest < cutoff:
+                self.rollup_price_history(oldest, cutoff)
+                removed = self.execute_query(
+                    "DELETE FROM price_history_default WHERE recorded_at < %s;", (cutoff,)
+                )
+                self._uncount_price_records(removed)
+        return dropped
+    
+    def _uncount_price_records(self, removed):
+        """Take deleted price_history rows out of the stats snapshot's count"""
+        if removed:
+            self.execute_query(
+                "UPDATE stats_snapshot SET price_records = GREATEST(price_records - %s, 0);",
+                (removed,)
+            )
+    
+    def archive_inactive_listings(self, days, batch_size=5000):
+        """Move listings inactive for more than `days` days to listings_archive
         
+        Each batch is one statement: the listings are deleted and inserted
+        into the archive with their daily price points, listing_changes and
+        alert_matches folded in as JSONB; the delete cascades to their price
+        history, changes and alert matches, and the stats snapshot counters
+        move with them. restore_query undoes this. Price history is rolled
+        up first so the daily points are complete. Returns the number of
+        listings archived.
+        """
+        self.rollup_price_history()
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        # Their raw price history goes with them (the delete cascades)
+        stats = stats_delta_query("""
+            SELECT -1 AS n, FALSE AS archived, is_active,
+                previous_price IS NOT NULL AS has_changes, price, make
+            FROM moved
+            UNION ALL
+            SELECT 1, TRUE, is_active, previous_price IS NOT NULL, price, make
+            FROM moved
+        """, "SELECT -count FROM raw")
+        query = f"""
+        WITH expired AS (
+            SELECT id FROM listings
+            WHERE is_active = FALSE
+            AND deactivated_at < NOW() - make_interval(days => %(days)s)
+            ORDER BY deactivated_at
+            LIMIT %(batch_size)s
+            FOR UPDATE
+        ),
+        history AS (
+            SELECT d.listing_id, jsonb_agg(jsonb_build_object(
+                'price', d.last_price,
+                'recorded_at', d.last_recorded_at,
+                'min_price', d.min_price,
+                'max_price', d.max_price,
+                'samples', d.samples
+            ) ORDER BY d.day) AS points
+            FROM price_history_daily d
+            JOIN expired e ON e.id = d.listing_id
+            GROUP BY d.listing_id
+        ),
+        changes AS (
+            SELECT c.listing_id, jsonb_agg(jsonb_build_object(
+                'changes', c.changes,
+                'changed_at', c.changed_at
+            ) ORDER BY c.changed_at, c.id) AS changes
+            FROM listing_changes c
+            JOIN expired e ON e.id = c.listing_id
+            GROUP BY c.listing_id
+        ),
+        matches AS (
+            SELECT m.listing_id, jsonb_agg(jsonb_build_object(
+                'alert_id', m.alert_id,
+                'matched_at', m.matched_at,
+                'notified', m.notified
+            ) ORDER BY m.id) AS matches
+            FROM alert_matches m
+            JOIN expired e ON e.id = m.listing_id
+            GROUP BY m.listing_id
+        ),
+        raw AS (
+            SELECT COUNT(*) AS count
+            FROM price_history ph
+            JOIN expired e ON e.id = ph.listing_id
+        ),
+        moved AS (
+            DELETE FROM listings USING expired
+            WHERE listings.id = expired.id
+            RETURNING listings.*
+        ),
+        archived AS (
+            INSERT INTO listings_archive ({columns}, price_history, changes, alert_matches)
+            SELECT {', '.join(f'moved.{column}' for column in ARCHIVE_COLUMNS)},
+                COALESCE(history.points, '[]'), COALESCE(changes.changes, '[]'),
+                COALESCE(matches.matches, '[]')
+            FROM moved
+            LEFT JOIN history ON history.listing_id = moved.id
+            LEFT JOIN changes ON changes.listing_id = moved.id
+            LEFT JOIN matches ON matches.listing_id = moved.id
+            RETURNING id
+        ),
+        {stats}
+        SELECT COUNT(*) AS archived FROM archived;
+        """
+        params = {'days': days, 'batch_size': batch_size}
+        
+        total = 0
+        while True:
+            result = self.execute_query(query, params, fetch=True)[0]
+            total += result['archived']
+            if result['archived'] < batch_size:
+                return total
+    
+    def refresh_stats_snapshot(self):
+        """Fill in the parts of stats_snapshot that aren't running totals
+        
+        The counters (listing totals, price_records, the price distribution,
+        the price sum behind avg_price and the per-make counts) are moved by
+        every statement that writes listings or price history, in the same
+        transaction; see stats_delta_query. This only reads index ends and
+        small tables: min and max price from idx_listings_active_price, the
+        median from the price bucket that holds it, the top makes from
+        stats_make_counts and the recent drops from idx_listings_price_drops.
+        Its cost doesn't grow with the number of listings.
+        """
+        with self.transaction():
+            snapshot = self.execute_query(
+                "SELECT price_buckets FROM stats_snapshot WHERE id = 1 FOR UPDATE;",
+                fetch=True
+            )
+            if not snapshot:
+                return self.rebuild_stats_snapshot()
+            median = self._median_price(snapshot[0]['price_buckets'])
+            return self.execute_query(f"""
+            UPDATE stats_snapshot SET
+                min_price = (SELECT MIN(price) FROM listings WHERE is_active),
+                max_price = (SELECT MAX(price) FROM listings WHERE is_active),
+                avg_price = CASE WHEN priced_listings > 0 THEN price_sum / priced_listings END,
+                median_price = %(median)s,
+                top_makes = (
+                    SELECT COALESCE(jsonb_agg(m ORDER BY m.count DESC, m.make), '[]')
+                    FROM (
+                        SELECT make, listings AS count
+                        FROM stats_make_counts
+                        WHERE listings > 0
+                        ORDER BY listings DESC, make
+                        LIMIT 10
+                    ) m
+                ),
+                recent_price_drops = (
+                    SELECT COALESCE(jsonb_agg(d ORDER BY d.price_changed_at DESC), '[]')
+                    FROM ({RECENT_PRICE_DROPS_QUERY}) d
+                ),
+                refreshed_at = NOW()
+            WHERE id = 1;
+            """, {'median': median, 'days': 7, 'limit': 10})
+    
+    def _median_price(self, buckets):
+        """Median active price (PERCENTILE_CONT(0.5)), found by offsetting
+        into the price bucket that holds each middle rank"""
+        count = sum(buckets)
+        if not count:
+            return None
+        prices = []
+        for rank in sorted({(count - 1) // 2, count // 2}):
+            before = 0
+            for bucket, condition in zip(buckets, price_bucket_conditions()):
+                if rank < before + bucket:
+                    break
+                before += bucket
+            row = self.execute_query(f"""
+            SELECT price FROM listings
+            WHERE is_active AND {condition}
+            ORDER BY price
+            OFFSET %s LIMIT 1;
+            """, (rank - before,), fetch=True)
+            if not row:
+                # The counters disagree with the table; rebuild_stats_snapshot fixes them
+                return None
+            prices.append(row[0]['price'])
+        return sum(prices) / len(prices)
+    
+    def rebuild_stats_snapshot(self):
+        """Recount the stats_snapshot counters and stats_make_counts from
+        the tables, then refresh the rest
+        
+        A full pass over listings, listings_archive and price_history, for
+        a new database or counters that have drifted (say after listings
+        were edited by hand). The snapshot row is locked first, so writes
+        that commit meanwhile are counted exactly once.
+        """
+        buckets = ', '.join(
+            f"COUNT(*) FILTER (WHERE is_active AND {condition})"
+            for condition in price_bucket_conditions()
+        )
+        with self.transaction():
+            self.execute_query("""
+            INSERT INTO stats_snapshot (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+            SELECT 1 FROM stats_snapshot WHERE id = 1 FOR UPDATE;
+            """)
+            self.execute_query(f"""
+            WITH totals AS (
+                SELECT
+                    COUNT(*) AS total_listings,
+                    COUNT(*) FILTER (WHERE is_active) AS active_listings,
+                    COUNT(*) FILTER (WHERE previous_price IS NOT NULL) AS listings_with_changes,
+                    COUNT(*) FILTER (WHERE is_active AND price IS NOT NULL) AS priced_listings,
+                    COALESCE(SUM(price) FILTER (WHERE is_active), 0) AS price_sum,
+                    ARRAY[{buckets}] AS price_buckets
+                FROM listings
+            ),
+            archive AS (
+                SELECT COUNT(*) AS archived_listings FROM listings_archive
+            )
+            UPDATE stats_snapshot SET
+                total_listings = totals.total_listings + archive.archived_listings,
+                active_listings = totals.active_listings,
+                archived_listings = archive.archived_listings,
+                listings_with_changes = totals.listings_with_changes,
+                price_records = (SELECT COUNT(*) FROM price_history),
+                priced_listings = totals.priced_listings,
+                price_sum = totals.price_sum,
+                price_buckets = totals.price_buckets
+            FROM totals, archive
+            WHERE id = 1;
+            """)
+            self.execute_query("""
+            DELETE FROM stats_make_counts;
+            INSERT INTO stats_make_counts (make, listings)
+            SELECT make, COUNT(*)
+            FROM listings
+            WHERE is_active = TRUE AND make IS NOT NULL
+            GROUP BY make;
+            """)
+            return self.refresh_stats_snapshot()
+    
+    def get_stats(self):
+        """Get database statistics from the latest snapshot
+        
+        One primary-key read. The counts are current as of the last
+        committed write; prices, top makes and recent drops as of the last
+        refresh_stats_snapshot, at the end of each scrape. snapshot_at says
+        when that was. listings_with_changes is the number of listings whose
+        price has changed at least once (previous_price is set).
+        """
+        query = "SELECT * FROM stats_snapshot WHERE id = 1;"
+        result = self.execute_query(query, fetch=True)
+        if not result:
+            self.rebuild_stats_snapshot()
+            result = self.execute_query(query, fetch=True)
+        
+        stats = result[0]
+        del stats['id'], stats['priced_listings'], stats['price_sum']
+        stats['inactive_listings'] = stats['total_listings'] - stats['active_listings']
+        stats['snapshot_at'] = stats.pop('refreshed_at')
         return stats
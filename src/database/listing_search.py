@@ -0,0 +1,405 @@
+"""SQL for the listings API: search filters, sort order, paging, history.
+
+Kept out of the Flask views so benchmarks/check_listing_plans.py can
+EXPLAIN exactly the queries the API runs. By default queries filter on
+is_active = TRUE, so the sort columns use partial indexes on active rows
+(see schema.sql), and the substring filters use trigram GIN indexes.
+
+search_mode=fulltext matches `search` against the search_vector column
+instead (stemmed words over title, make, model, description and location,
+GIN indexed) and allows sort_by=relevance. include_inactive=1 searches
+listings that are no longer active too, for historical queries.
+include_archived=1 goes further and adds listings_archive (long-inactive
+listings moved out of listings by the maintenance job); the archive is
+never read otherwise.
+
+Pages after the first are fetched by keyset: an opaque cursor carries the
+last row's sort value and id, and the next page starts strictly after it,
+so deep pages cost the same as the first. Totals are estimated from the
+planner unless small, and exact counts are cached per filter set.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+SORT_FIELDS = ['price', 'year', 'mileage', 'updated_at', 'first_seen']
+
+# SQL type of each sort key, for casting cursor values back
+SORT_TYPES = {
+    'price': 'numeric',
+    'year': 'integer',
+    'mileage': 'integer',
+    'updated_at': 'timestamp',
+    'first_seen': 'timestamp',
+    'relevance': 'real',
+}
+
+# page=N (OFFSET paging) is accepted up to here; deeper pages need a cursor
+MAX_OFFSET_PAGE = 20
+
+# Below this planner estimate a count is cheap enough to run exactly
+EXACT_COUNT_BELOW = 1000
+COUNT_CACHE_SECONDS = int(os.getenv('COUNT_CACHE_SECONDS', '60'))
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+# websearch_to_tsquery accepts any user input: quoted phrases, "or" and
+# -excluded words, and never raises a syntax error
+TSQUERY = "websearch_to_tsquery('english', %s)"
+
+LISTING_FIELDS = """
+    id, external_id, source, url, title, price, previous_price,
+    price_changed_at, year, make, model, mileage, location,
+    first_seen, last_seen, updated_at, is_active
+"""
+
+# listings and listings_archive as one relation for include_archived;
+# filters are pushed down into both branches, each with its own indexes
+ARCHIVE_SOURCE = f"""(
+        SELECT {LISTING_FIELDS}, search_vector, FALSE AS archived FROM listings
+        UNION ALL
+        SELECT {LISTING_FIELDS}, search_vector, TRUE AS archived FROM listings_archive
+    ) listings"""
+
+# An archived listing with its price history and changes, for the detail
+# page when include_archived is set
+ARCHIVED_LISTING_QUERY = "SELECT * FROM listings_archive WHERE id = %s"
+
+# Unchanged listings aren't rewritten by the scrape, so an active
+# listing's last_seen is at least the end of the latest run that swept
+# its source and region (it would have been deactivated otherwise)
+LISTING_DETAIL_QUERY = """
+    SELECT l.*, GREATEST(l.last_seen, (
+        SELECT MAX(r.finished_at)
+        FROM scrape_run_targets t
+        JOIN scrape_runs r ON r.id = t.run_id
+        WHERE l.is_active
+        AND t.swept
+        AND t.source = l.source
+        AND t.region IS NOT DISTINCT FROM l.region
+        AND r.status = 'completed'
+    )) AS last_swept_seen
+    FROM listings l
+    WHERE l.id = %s
+"""
+
+# Days of raw price history a listing's chart shows; before that it gets
+# one point per day from price_history_daily
+PRICE_HISTORY_RAW_DAYS = int(os.getenv('PRICE_HISTORY_RAW_DAYS', '30'))
+
+# Days before the split come from the daily rollup (the day's closing
+# price, with its range), the rest from the raw rows. The split is the
+# raw window's start, or the last day rolled up if the rollup is behind
+# (days before that one are complete in the rollup). The raw part is
+# served by each partition's (listing_id, recorded_at) index, and
+# partitions wholly before the split are pruned at run time.
+PRICE_HISTORY_QUERY = """
+    WITH split AS (
+        SELECT LEAST(
+            CURRENT_DATE - %(raw_days)s::integer,
+            COALESCE((SELECT MAX(day) FROM price_history_daily), '-infinity'::date)
+        ) AS day
+    )
+    SELECT last_price AS price, last_recorded_at AS recorded_at, min_price, max_price
+    FROM price_history_daily
+    WHERE listing_id = %(listing_id)s
+    AND day < (SELECT day FROM split)
+    UNION ALL
+    SELECT price, recorded_at, price AS min_price, price AS max_price
+    FROM price_history
+    WHERE listing_id = %(listing_id)s
+    AND recorded_at >= (SELECT day FROM split)
+    ORDER BY recorded_at ASC
+"""
+
+
+def price_history_params(listing_id):
+    """Params for PRICE_HISTORY_QUERY"""
+    return {'listing_id': listing_id, 'raw_days': PRICE_HISTORY_RAW_DAYS}
+
+
+def like_pattern(text):
+    """ILIKE pattern matching `text` anywhere, with its own wildcards escaped"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def include_archived(args):
+    """Whether the request args ask for archived listings too"""
+    return args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def listing_source(filters):
+    """FROM target for the filters: listings, plus the archive on request"""
+    return ARCHIVE_SOURCE if filters.get('include_archived') else "listings"
+
+
+def parse_filters(args):
+    """Search filters from the request args, skipping empty ones"""
+    filters = {
+        'search': args.get('search', '').strip(),
+        'make': args.get('make', '').strip(),
+        'model': args.get('model', '').strip(),
+        'min_year': args.get('min_year', type=int),
+        'max_year': args.get('max_year', type=int),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'max_mileage': args.get('max_mileage', type=int),
+        'include_inactive': args.get('include_inactive', '').lower() in ('1', 'true', 'yes'),
+        'include_archived': include_archived(args),
+    }
+    if filters['include_archived']:
+        # Archived listings are all inactive
+        filters['include_inactive'] = True
+    if args.get('search_mode') == 'fulltext' or args.get('sort_by') == 'relevance':
+        filters['search_mode'] = 'fulltext'
+    return {key: value for key, value in filters.items() if value}
+
+
+def is_fulltext(filters):
+    return bool(filters.get('search')) and filters.get('search_mode') == 'fulltext'
+
+
+def sort_spec(filters, sort_by, sort_order):
+    """(sort_by, sort_order) with anything unsupported replaced by the default"""
+    if sort_by == 'relevance':
+        if is_fulltext(filters):
+            return 'relevance', 'DESC'
+        sort_by = 'updated_at'
+    if sort_by not in SORT_FIELDS:
+        sort_by = 'updated_at'
+    sort_order = sort_order.upper()
+    if sort_order not in ['ASC', 'DESC']:
+        sort_order = 'DESC'
+    return sort_by, sort_order
+
+
+def sort_key(sort_by):
+    """Result column holding the sort value"""
+    return 'rank' if sort_by == 'relevance' else sort_by
+
+
+def encode_cursor(sort_by, sort_order, value, listing_id):
+    """Opaque cursor for the row (value, listing_id) in this sort order"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([sort_by, sort_order, value, listing_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """(value, listing_id) from a cursor; ValueError if it is malformed or
+    was issued for a different sort order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, listing_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort_by, sort_order) or not isinstance(listing_id, int):
+        raise ValueError("Cursor does not match the sort order")
+    return value, listing_id
+
+
+def build_where(filters, extra=None):
+    """WHERE clause and params for a dict of search filters
+
+    `extra` is one more (condition, params) to AND on, such as a keyset
+    condition.
+    """
+    conditions = []
+    params = []
+
+    if not filters.get('include_inactive'):
+        conditions.append("is_active = TRUE")
+
+    if is_fulltext(filters):
+        conditions.append(f"search_vector @@ {TSQUERY}")
+        params.append(filters['search'])
+    elif filters.get('search'):
+        # One trigram index per column; the planner ORs the bitmaps
+        conditions.append("(title ILIKE %s OR make ILIKE %s OR model ILIKE %s)")
+        pattern = like_pattern(filters['search'])
+        params.extend([pattern, pattern, pattern])
+
+    if filters.get('make'):
+        conditions.append("make ILIKE %s")
+        params.append(like_pattern(filters['make']))
+
+    if filters.get('model'):
+        conditions.append("model ILIKE %s")
+        params.append(like_pattern(filters['model']))
+
+    for key, condition in (
+        ('min_year', "year >= %s"),
+        ('max_year', "year <= %s"),
+        ('min_price', "price >= %s"),
+        ('max_price', "price <= %s"),
+        ('max_mileage', "mileage <= %s"),
+    ):
+        if filters.get(key):
+            conditions.append(condition)
+            params.append(filters[key])
+
+    if extra:
+        conditions.append(extra[0])
+        params.extend(extra[1])
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where_clause, params
+
+
+def order_by(sort_by, sort_order):
+    """ORDER BY clause for a sort_spec() result, with id as tie-breaker
+
+    The tie-breaker makes the order stable between pages, and matches the
+    (column, id) partial indexes so the sort is an index scan. Relevance
+    sorts on the `rank` column page_query selects, best match first.
+    """
+    if sort_by == 'relevance':
+        return "ORDER BY rank DESC, id DESC"
+    return f"ORDER BY {sort_by} {sort_order}, id {sort_order}"
+
+
+def keyset_segments(filters, sort_by, sort_order, value, listing_id):
+    """(condition, params) pairs that together continue after the cursor row
+
+    Postgres sorts NULLs first in DESC order and last in ASC order. A row
+    comparison can't step over the NULL block, and ORing an IS NULL test
+    into it turns the index range scan into a filter, so each block is
+    its own condition, in result order. A page that runs off the end of
+    one block is topped up from the next.
+    """
+    op = '<' if sort_order == 'DESC' else '>'
+    if sort_by == 'relevance':
+        # ts_rank is never NULL
+        return [(f"(ts_rank(search_vector, {TSQUERY}), id) < (%s::real, %s)",
+                 [filters['search'], value, listing_id])]
+
+    cast = SORT_TYPES[sort_by]
+    after_value = (f"({sort_by}, id) {op} (%s::{cast}, %s)", [value, listing_id])
+    after_null = (f"{sort_by} IS NULL AND id {op} %s", [listing_id])
+    if sort_order == 'DESC':
+        if value is None:
+            return [after_null, (f"{sort_by} IS NOT NULL", [])]
+        return [after_value]
+    if value is None:
+        return [after_null]
+    return [after_value, (f"{sort_by} IS NULL", [])]
+
+
+def page_query(filters, sort_by='updated_at', sort_order='DESC', extra=None):
+    """SELECT for one page of listings; params end with LIMIT and OFFSET
+
+    Full-text searches also select `rank` (ts_rank against the query), and
+    include_archived ones `archived`.
+    Rank depends only on the listing and the query, so with the id
+    tie-breaker a relevance-sorted result pages stably.
+    """
+    sort_by, sort_order = sort_spec(filters, sort_by, sort_order)
+    where_clause, params = build_where(filters, extra)
+    rank = ""
+    if is_fulltext(filters):
+        rank = f", ts_rank(search_vector, {TSQUERY}) AS rank"
+        params = [filters['search']] + params
+    archived = ", archived" if filters.get('include_archived') else ""
+    query = f"""
+        SELECT {LISTING_FIELDS}{archived}{rank}
+        FROM {listing_source(filters)}
+        {where_clause}
+        {order_by(sort_by, sort_order)}
+        LIMIT %s OFFSET %s
+    """
+    return query, params
+
+
+def fetch_page(db, filters, sort_by='updated_at', sort_order='DESC', per_page=20,
+               page=1, cursor=None):
+    """One page of listings and the cursor for the next (None on the last page)
+
+    Without a cursor, `page` selects an OFFSET page, up to MAX_OFFSET_PAGE.
+    Raises ValueError for a bad cursor or a page past that limit.
+    """
+    sort_by, sort_order = sort_spec(filters, sort_by, sort_order)
+    limit = per_page + 1  # one extra row tells us whether there is a next page
+
+    if cursor:
+        value, listing_id = decode_cursor(cursor, sort_by, sort_order)
+        rows = []
+        for extra in keyset_segments(filters, sort_by, sort_order, value, listing_id):
+            query, params = page_query(filters, sort_by, sort_order, extra)
+            rows += db.execute_query(query, tuple(params + [limit - len(rows), 0]), fetch=True)
+            if len(rows) >= limit:
+                break
+    else:
+        if page > MAX_OFFSET_PAGE:
+            raise ValueError(f"page is limited to {MAX_OFFSET_PAGE}; use the cursor to go further")
+        query, params = page_query(filters, sort_by, sort_order)
+        offset = (max(page, 1) - 1) * per_page
+        rows = db.execute_query(query, tuple(params + [limit, offset]), fetch=True)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, last[sort_key(sort_by)], last['id'])
+    return rows, next_cursor
+
+
+def count_query(filters):
+    """SELECT COUNT(*) for the same filters as page_query"""
+    where_clause, params = build_where(filters)
+    return f"SELECT COUNT(*) as count FROM {listing_source(filters)} {where_clause}", params
+
+
+def estimate_count(db, filters):
+    """Planner's row estimate for the filters, without running the query"""
+    where_clause, params = build_where(filters)
+    result = db.execute_query(
+        f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {listing_source(filters)} {where_clause}",
+        tuple(params), fetch=True
+    )
+    plan = result[0]['QUERY PLAN']
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_listings(db, filters, mode='estimate'):
+    """(total, is_estimate) for the filters
+
+    mode 'exact' always counts; 'estimate' counts only when the planner
+    expects fewer than EXACT_COUNT_BELOW rows and otherwise returns its
+    estimate; 'none' skips the count. Exact counts are cached for
+    COUNT_CACHE_SECONDS per filter set.
+    """
+    if mode == 'none':
+        return None, False
+
+    query, params = count_query(filters)
+    key = (query, tuple(params))
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0], False
+
+    if mode != 'exact':
+        estimate = estimate_count(db, filters)
+        if estimate >= EXACT_COUNT_BELOW:
+            return estimate, True
+
+    count = db.execute_query(query, tuple(params), fetch=True)[0]['count']
+    with _count_lock:
+        # Drop expired entries so the cache stays bounded by live filter sets
+        for stale in [k for k, (_, expires) in _count_cache.items() if expires <= now]:
+            del _count_cache[stale]
+        _count_cache[key] = (count, now + COUNT_CACHE_SECONDS)
+    return count, False
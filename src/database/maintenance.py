@@ -0,0 +1,59 @@
+"""Scheduled database upkeep for price_history and listings.
+
+Creates the monthly partitions ahead of time, rolls raw price history up
+into price_history_daily, drops raw partitions past the retention
+window (their days live on in the rollup) and moves long-inactive
+listings to listings_archive. Run from the scheduler, or by hand:
+
+    python -m src.database.maintenance
+"""
+import os
+
+from src.database.db import Database
+from src.utils.logger import setup_logger
+
+logger = setup_logger('maintenance')
+
+# Whole months of raw price_history kept; at least one, since the listing
+# page reads raw rows for its last PRICE_HISTORY_RAW_DAYS
+RETENTION_MONTHS = max(1, int(os.getenv('PRICE_HISTORY_RETENTION_MONTHS', '12')))
+
+# Monthly partitions created ahead of the current one
+PARTITIONS_AHEAD = int(os.getenv('PRICE_HISTORY_PARTITIONS_AHEAD', '2'))
+
+# Days a listing stays inactive in listings before it is archived
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+
+def run_maintenance(db=None):
+    """Run every maintenance step and return what each one did"""
+    own_db = db is None
+    db = db or Database()
+    try:
+        created = db.ensure_price_history_partitions(PARTITIONS_AHEAD)
+        if created:
+            logger.info(f"Created price_history partitions: {', '.join(created)}")
+        
+        rolled_up = db.rollup_price_history()
+        logger.info(f"Rolled up {rolled_up} listing days into price_history_daily")
+        
+        dropped = db.drop_expired_price_history(RETENTION_MONTHS)
+        if dropped:
+            logger.info(f"Dropped price_history partitions older than "
+                        f"{RETENTION_MONTHS} months: {', '.join(dropped)}")
+        
+        archived = db.archive_inactive_listings(ARCHIVE_AFTER_DAYS)
+        if archived:
+            logger.info(f"Archived {archived} listings inactive for more than "
+                        f"{ARCHIVE_AFTER_DAYS} days")
+            db.refresh_stats_snapshot()
+        
+        return {'created': created, 'rolled_up': rolled_up, 'dropped': dropped,
+                'archived': archived}
+    finally:
+        if own_db:
+            db.close()
+
+
+if __name__ == '__main__':
+    run_maintenance()
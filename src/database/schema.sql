@@ -1,36 +1,142 @@
+-- Trigram indexes for substring (ILIKE '%x%') search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Drop tables if they exist (for development)
+DROP TABLE IF EXISTS stats_snapshot CASCADE;
+DROP TABLE IF EXISTS stats_make_counts CASCADE;
+DROP TABLE IF EXISTS scrape_run_targets CASCADE;
+DROP TABLE IF EXISTS scrape_runs CASCADE;
+DROP TABLE IF EXISTS listing_changes CASCADE;
 DROP TABLE IF EXISTS alert_matches CASCADE;
 DROP TABLE IF EXISTS alerts CASCADE;
+DROP TABLE IF EXISTS price_history_daily CASCADE;
 DROP TABLE IF EXISTS price_history CASCADE;
 DROP TABLE IF EXISTS listings CASCADE;
+DROP TABLE IF EXISTS listings_archive CASCADE;
 
 -- Listings table
 CREATE TABLE listings (
     id SERIAL PRIMARY KEY,
     external_id VARCHAR(255) UNIQUE NOT NULL,
     source VARCHAR(50) NOT NULL,
+    -- Scrape target region the listing was first found in (NULL for
+    -- sources without regions)
+    region VARCHAR(100),
     url TEXT NOT NULL,
     title TEXT,
     price DECIMAL(10,2),
+    previous_price DECIMAL(10,2),
+    price_changed_at TIMESTAMP,
     year INTEGER,
     make VARCHAR(100),
     model VARCHAR(100),
     mileage INTEGER,
     location VARCHAR(255),
     description TEXT,
+    vin VARCHAR(17),
+    attributes JSONB,
+    details_fetched_at TIMESTAMP,
+    -- Fingerprint of the scraped fields (see CONTENT_FIELDS in db.py); the
+    -- upsert only writes the row when it changes
+    content_hash CHAR(32),
+    -- Full-text search document; regenerated whenever these columns change
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(make, '') || ' ' || coalesce(model, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(location, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'D')
+    ) STORED,
     first_seen TIMESTAMP DEFAULT NOW(),
+    -- Last time the scrape wrote the row (new, re-priced or reactivated);
+    -- unchanged listings are not rewritten, see scrape_run_targets
     last_seen TIMESTAMP DEFAULT NOW(),
     is_active BOOLEAN DEFAULT TRUE,
+    -- When the listing was last marked inactive; archived after a while
+    deactivated_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
--- Price history table
+-- Listings inactive for longer than ARCHIVE_AFTER_DAYS, moved out of
+-- listings by src/database/maintenance.py so the hot table only holds the
+-- live market. Same columns and ids, plus the listing's price history
+-- (daily points), listing_changes and alert_matches rows as JSONB. Only
+-- read when a request asks for include_archived, or by the upsert, which
+-- moves a listing back into listings (same id and history) when it
+-- reappears.
+CREATE TABLE listings_archive (
+    id INTEGER PRIMARY KEY,
+    external_id VARCHAR(255) UNIQUE NOT NULL,
+    source VARCHAR(50) NOT NULL,
+    region VARCHAR(100),
+    url TEXT NOT NULL,
+    title TEXT,
+    price DECIMAL(10,2),
+    previous_price DECIMAL(10,2),
+    price_changed_at TIMESTAMP,
+    year INTEGER,
+    make VARCHAR(100),
+    model VARCHAR(100),
+    mileage INTEGER,
+    location VARCHAR(255),
+    description TEXT,
+    vin VARCHAR(17),
+    attributes JSONB,
+    details_fetched_at TIMESTAMP,
+    content_hash CHAR(32),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(make, '') || ' ' || coalesce(model, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(location, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'D')
+    ) STORED,
+    first_seen TIMESTAMP,
+    last_seen TIMESTAMP,
+    is_active BOOLEAN DEFAULT FALSE,
+    deactivated_at TIMESTAMP,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    price_history JSONB NOT NULL DEFAULT '[]',
+    changes JSONB NOT NULL DEFAULT '[]',
+    -- alert_matches rows, so a restored listing doesn't alert again
+    alert_matches JSONB NOT NULL DEFAULT '[]',
+    archived_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Price history table, partitioned by month on recorded_at. Monthly
+-- partitions (price_history_yYYYYmMM) are created ahead of time and dropped
+-- after the retention window by src/database/maintenance.py; the default
+-- partition catches anything outside them
 CREATE TABLE price_history (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     listing_id INTEGER REFERENCES listings(id) ON DELETE CASCADE,
     price DECIMAL(10,2) NOT NULL,
-    recorded_at TIMESTAMP DEFAULT NOW()
+    recorded_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+CREATE TABLE price_history_default PARTITION OF price_history DEFAULT;
+
+-- One row per listing per day with price history, rolled up from
+-- price_history by the maintenance job; outlives the raw partitions
+CREATE TABLE price_history_daily (
+    listing_id INTEGER REFERENCES listings(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    min_price DECIMAL(10,2) NOT NULL,
+    max_price DECIMAL(10,2) NOT NULL,
+    last_price DECIMAL(10,2) NOT NULL,
+    samples INTEGER NOT NULL,
+    last_recorded_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (listing_id, day)
+);
+
+-- Scraped fields that changed on an existing listing, as
+-- {"field": [old, new], ...}; off with LISTING_CHANGE_LOG=0
+CREATE TABLE listing_changes (
+    id SERIAL PRIMARY KEY,
+    listing_id INTEGER REFERENCES listings(id) ON DELETE CASCADE,
+    changes JSONB NOT NULL,
+    changed_at TIMESTAMP DEFAULT NOW()
 );
 
 -- Alerts table
@@ -56,9 +162,102 @@ CREATE TABLE alert_matches (
     notified BOOLEAN DEFAULT FALSE
 );
 
+-- One row per ScraperManager.run_scrape
+CREATE TABLE scrape_runs (
+    id SERIAL PRIMARY KEY,
+    incremental BOOLEAN NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    started_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP,
+    listings_seen INTEGER,
+    new_listings INTEGER,
+    updated_listings INTEGER,
+    deactivated_listings INTEGER
+);
+
+-- Each target a run scraped. swept means every page was fetched down to a
+-- short or empty last page, so any active listing of that source and region
+-- the run did not see is gone
+CREATE TABLE scrape_run_targets (
+    run_id INTEGER REFERENCES scrape_runs(id) ON DELETE CASCADE,
+    source VARCHAR(50) NOT NULL,
+    region VARCHAR(100),
+    pages INTEGER NOT NULL,
+    listings INTEGER NOT NULL,
+    swept BOOLEAN NOT NULL,
+    error TEXT
+);
+
+-- Precomputed statistics for /api/stats, one row. The counters are moved
+-- by every statement that writes listings or price history (see
+-- stats_delta_query in src/database/db.py); the prices, top makes and
+-- recent drops are filled in after each scrape by
+-- Database.refresh_stats_snapshot
+CREATE TABLE stats_snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_listings INTEGER NOT NULL DEFAULT 0,
+    active_listings INTEGER NOT NULL DEFAULT 0,
+    archived_listings INTEGER NOT NULL DEFAULT 0,
+    listings_with_changes INTEGER NOT NULL DEFAULT 0,
+    price_records BIGINT NOT NULL DEFAULT 0,
+    -- Active listings with a price and the sum of their prices, for avg_price
+    priced_listings INTEGER NOT NULL DEFAULT 0,
+    price_sum NUMERIC NOT NULL DEFAULT 0,
+    min_price DECIMAL(10,2),
+    max_price DECIMAL(10,2),
+    avg_price DECIMAL(10,2),
+    median_price DECIMAL(10,2),
+    -- Active listings per PRICE_BUCKET_EDGES bucket
+    price_buckets INTEGER[] NOT NULL DEFAULT '{}',
+    top_makes JSONB NOT NULL DEFAULT '[]',
+    recent_price_drops JSONB NOT NULL DEFAULT '[]',
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+INSERT INTO stats_snapshot (id) VALUES (1);
+
+-- Active listings per make, moved along with the stats_snapshot counters
+CREATE TABLE stats_make_counts (
+    make VARCHAR(100) PRIMARY KEY,
+    listings INTEGER NOT NULL
+);
+
 -- Create indexes for performance
-CREATE INDEX idx_listings_external_id ON listings(external_id);
-CREATE INDEX idx_listings_is_active ON listings(is_active);
+-- (external_id is already indexed by its UNIQUE constraint)
 CREATE INDEX idx_listings_make_model ON listings(make, model);
-CREATE INDEX idx_price_history_listing_id ON price_history(listing_id);
+CREATE INDEX idx_price_history_listing_recorded ON price_history(listing_id, recorded_at);
+-- Rollup watermark: the last day already rolled up
+CREATE INDEX idx_price_history_daily_day ON price_history_daily(day);
+CREATE INDEX idx_listing_changes_listing ON listing_changes(listing_id, changed_at);
+
+-- /api/listings: substring search on title, make and model
+CREATE INDEX idx_listings_title_trgm ON listings USING gin (title gin_trgm_ops);
+CREATE INDEX idx_listings_make_trgm ON listings USING gin (make gin_trgm_ops);
+CREATE INDEX idx_listings_model_trgm ON listings USING gin (model gin_trgm_ops);
+
+-- /api/listings: full-text search, active and inactive listings alike
+CREATE INDEX idx_listings_search ON listings USING gin (search_vector);
+
+-- /api/listings: one partial index per sort column over active listings,
+-- with id as the tie-breaker the ORDER BY uses
+CREATE INDEX idx_listings_active_price ON listings(price, id) WHERE is_active = TRUE;
+CREATE INDEX idx_listings_active_year ON listings(year, id) WHERE is_active = TRUE;
+CREATE INDEX idx_listings_active_mileage ON listings(mileage, id) WHERE is_active = TRUE;
+CREATE INDEX idx_listings_active_updated ON listings(updated_at, id) WHERE is_active = TRUE;
+CREATE INDEX idx_listings_active_first_seen ON listings(first_seen, id) WHERE is_active = TRUE;
+CREATE INDEX idx_listings_price_drops ON listings(price_changed_at DESC)
+    WHERE price < previous_price;
 CREATE INDEX idx_alerts_active ON alerts(is_active);
+
+-- Archival: inactive listings by when they went inactive
+CREATE INDEX idx_listings_inactive_since ON listings(deactivated_at) WHERE is_active = FALSE;
+
+-- include_archived searches
+CREATE INDEX idx_listings_archive_search ON listings_archive USING gin (search_vector);
+CREATE INDEX idx_listings_archive_title_trgm ON listings_archive USING gin (title gin_trgm_ops);
+CREATE INDEX idx_listings_archive_make_trgm ON listings_archive USING gin (make gin_trgm_ops);
+CREATE INDEX idx_listings_archive_model_trgm ON listings_archive USING gin (model gin_trgm_ops);
+CREATE INDEX idx_listings_archive_updated ON listings_archive(updated_at, id);
+
+-- Stale detection: the active listings of the swept sources and regions
+CREATE INDEX idx_listings_active_scope ON listings(source, region) WHERE is_active = TRUE;
+CREATE INDEX idx_scrape_run_targets_scope ON scrape_run_targets(source, region) WHERE swept;
@@ -1,28 +1,46 @@
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from src.database.maintenance import run_maintenance
 from src.scrapers.scraper_manager import ScraperManager
 from src.utils.logger import setup_logger
 from datetime import datetime
+import os
 import sys
 
 logger = setup_logger('scheduler')
 
-def run_daily_scrape():
+# Day of the week (0 = Monday) when the daily job does a full sweep instead
+# of an incremental scrape, to pick up price changes on older listings and
+# mark listings that disappeared as inactive
+FULL_SWEEP_WEEKDAY = int(os.getenv('FULL_SWEEP_WEEKDAY', '6'))
+
+def run_daily_scrape(full_sweep=None):
     """Run the daily scrape job"""
     logger.info("*" * 70)
     logger.info(f"SCHEDULED JOB TRIGGERED - {datetime.now()}")
     logger.info("*" * 70)
     
+    if full_sweep is None:
+        full_sweep = datetime.now().weekday() == FULL_SWEEP_WEEKDAY
+    
     manager = ScraperManager()
     try:
         # Run scrape with 2 pages (adjust as needed)
-        manager.run_scrape(max_pages=2)
+        manager.run_scrape(max_pages=2, incremental=not full_sweep)
         manager.get_stats()
     except Exception as e:
         logger.error(f"Scheduled job failed: {e}", exc_info=True)
     finally:
         manager.close()
 
+def run_daily_maintenance():
+    """Run the price_history partition, rollup and retention job"""
+    logger.info(f"MAINTENANCE JOB TRIGGERED - {datetime.now()}")
+    try:
+        run_maintenance()
+    except Exception as e:
+        logger.error(f"Maintenance job failed: {e}", exc_info=True)
+
 def start_scheduler(test_mode=False):
     """Start the scheduler"""
     scheduler = BlockingScheduler()
@@ -47,10 +65,21 @@ def start_scheduler(test_mode=False):
             name='Daily Car Scrape',
             replace_existing=True
         )
+        # After the scrape has written the day's price history
+        scheduler.add_job(
+            run_daily_maintenance,
+            CronTrigger(hour=4, minute=0),  # 4:00 AM daily
+            id='daily_maintenance',
+            name='Daily Database Maintenance',
+            replace_existing=True
+        )
+    
+    # Make sure this month's price_history partition exists before writing
+    run_daily_maintenance()
     
-    # Run immediately on startup
+    # Run immediately on startup (full sweep, so we start from a complete picture)
     logger.info("🚀 Running initial scrape now...")
-    run_daily_scrape()
+    run_daily_scrape(full_sweep=True)
     
     # Start scheduler
     logger.info("⏰ Scheduler started. Press Ctrl+C to exit.")
@@ -0,0 +1,233 @@
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.scrapers.html_parsers import get_parser_backend
+from src.scrapers.http_session import DEFAULT_USER_AGENT, create_session
+from src.scrapers.rate_limiter import get_shared_rate_limiter
+from src.scrapers.response_cache import ResponseCache
+
+
+class BaseScraper:
+    """Fetch/parse loop shared by every listing source.
+
+    A subclass sets `source` (the listings.source value and registry key),
+    `display_name`, `id_prefix` and `id_pattern` (external IDs look like
+    "<prefix>_<first group of id_pattern in the URL>"), and implements
+    `page_url`, `_result_cards`, `_parse_listing` and `parse_detail`.
+    Register it with @register_scraper (src/scrapers/registry.py) and add
+    targets for it to the scrape targets file; ScraperManager needs no
+    changes.
+    """
+
+    source = None
+    display_name = None
+    id_prefix = None
+    id_pattern = None
+    # Whether scrape targets for this source must name a region
+    needs_region = False
+    # Listings on a full results page. A shorter page is the last one, which
+    # is how ScraperManager knows a target was swept to the end; None means
+    # the source can't tell, and its targets are never treated as swept.
+    page_size = None
+
+    def __init__(self, rate_limiter=None, session=None, cache=None, parser=None,
+                 max_workers=4, parse_pool=None):
+        self.headers = {'User-Agent': DEFAULT_USER_AGENT}
+        # Worker threads for concurrent mode; the rate limiter enforces the
+        # per-host budget in both modes
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        # Pooled keep-alive session; ScraperManager passes its own so one
+        # pool spans the whole scrape
+        self.session = session or create_session(pool_size=max(max_workers, 1))
+        # Optional ResponseCache: conditional requests + skip re-parsing
+        self.cache = cache
+        # HTML parser backend name, see src/scrapers/html_parsers.py
+        self.parser_name = parser
+        self.parser = get_parser_backend(parser)
+        # Optional ParsePool: parse pages in worker processes instead of
+        # on the calling thread
+        self.parse_pool = parse_pool
+        # Pages that failed to fetch or parse during the last iter_pages run
+        self.page_errors = 0
+
+    @classmethod
+    def from_target(cls, target, **kwargs):
+        """Build a scraper for a {'source', 'region'} scrape target"""
+        return cls(**kwargs)
+
+    def parse_options(self):
+        """Constructor arguments a worker process needs to parse like this scraper"""
+        return {'parser': self.parser_name}
+
+    def page_url(self, page):
+        """URL of search results page `page` (0-based)"""
+        raise NotImplementedError
+
+    def _result_cards(self, doc):
+        """Nodes for the individual listings on a parsed results page"""
+        raise NotImplementedError
+
+    def _parse_listing(self, result):
+        """Listing dict for one result card, or None to skip it"""
+        raise NotImplementedError
+
+    def parse_detail(self, html):
+        """Parse a listing detail page: full description, mileage, VIN, attributes"""
+        raise NotImplementedError
+
+    def scrape_listings(self, max_pages=2, concurrent=False):
+        """Scrape every listing on the first `max_pages` result pages"""
+        all_listings = []
+
+        for listings in self.iter_pages(max_pages=max_pages, concurrent=concurrent):
+            all_listings.extend(listings)
+
+        print(f"\n🎉 Total {self.display_name} listings scraped: {len(all_listings)}")
+        return all_listings
+
+    def iter_pages(self, max_pages=2, concurrent=False):
+        """Yield each page's listings as soon as that page is fetched and parsed"""
+        self.page_errors = 0
+        if concurrent:
+            yield from self._iter_pages_concurrent(max_pages)
+            return
+
+        for page in range(max_pages):
+            print(f"📄 Scraping {self.display_name} page {page + 1}...")
+
+            try:
+                fetched = self._fetch_page(page)
+
+                listings = self._page_listings(*fetched)
+
+                print(f"  ✅ Found {len(listings)} listings on page {page + 1}")
+
+            except Exception as e:
+                self.page_errors += 1
+                print(f"  ❌ Error scraping {self.display_name} page {page + 1}: {e}")
+                continue
+
+            yield listings
+
+    def _iter_pages_concurrent(self, max_pages):
+        """Fetch pages in parallel within the host budget, yield in page order
+
+        At most `max_workers` pages are fetched ahead of the consumer, so a
+        consumer that stops early (incremental mode) wastes few requests.
+        Each page is parsed on the thread that fetched it, so with a
+        parse_pool several pages are parsed at once.
+        """
+        workers = max(1, min(self.max_workers, max_pages))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        pending = deque()
+        next_page = 0
+        try:
+            while next_page < max_pages and len(pending) < workers:
+                pending.append((next_page, pool.submit(self._fetch_and_parse, next_page)))
+                next_page += 1
+
+            while pending:
+                page, future = pending.popleft()
+                if next_page < max_pages:
+                    pending.append((next_page, pool.submit(self._fetch_and_parse, next_page)))
+                    next_page += 1
+
+                try:
+                    listings = future.result()
+                    print(f"  ✅ Found {len(listings)} listings on page {page + 1}")
+                except Exception as e:
+                    self.page_errors += 1
+                    print(f"  ❌ Error scraping {self.display_name} page {page + 1}: {e}")
+                    continue
+
+                yield listings
+        finally:
+            # If the consumer stops early, don't fetch pages nobody will read
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch_page(self, page):
+        """Download one search results page, returning (url, response, cache entry)"""
+        url = self.page_url(page)
+
+        entry = self.cache.lookup(url) if self.cache else None
+        headers = dict(self.headers)
+        headers.update(ResponseCache.conditional_headers(entry))
+
+        response = self.rate_limiter.get(
+            url,
+            session=self.session,
+            headers=headers,
+            timeout=10
+        )
+        response.raise_for_status()
+        return url, response, entry
+
+    def _fetch_and_parse(self, page):
+        return self._page_listings(*self._fetch_page(page))
+
+    def _page_listings(self, url, response, entry):
+        """Parse a fetched page, or reuse cached listings if it hasn't changed"""
+        if self.cache:
+            return self.cache.resolve(url, response, self._parse_html, entry)
+        return self._parse_html(response.text)
+
+    def _parse_html(self, html):
+        if self.parse_pool:
+            return self.parse_pool.parse(self, html)
+        return self._parse_page(html)
+
+    def _parse_page(self, html):
+        """Parse a search results page into listing dicts"""
+        doc = self.parser.parse(html)
+        listings = []
+
+        for result in self._result_cards(doc):
+            try:
+                listing = self._parse_listing(result)
+                if listing:
+                    listings.append(listing)
+            except Exception as e:
+                print(f"    ⚠️ Error parsing {self.display_name} listing: {e}")
+                continue
+
+        return listings
+
+    def _extract_id_from_url(self, url):
+        """External ID from a listing URL, e.g. cl_1234567890"""
+        match = re.search(self.id_pattern, url)
+        if match:
+            return f"{self.id_prefix}_{match.group(1)}"
+        return f"{self.id_prefix}_{hash(url)}"
+
+    def _parse_price(self, price_text):
+        """Extract numeric price from text like '$15,500'"""
+        if not price_text:
+            return None
+
+        # Remove $ and commas, extract number
+        match = re.search(r'\$?([\d,]+)', price_text)
+        if match:
+            return float(match.group(1).replace(',', ''))
+        return None
+
+    def _parse_mileage(self, text):
+        """Extract mileage from text like '65,000 miles' or '65k mi'"""
+        if not text:
+            return None
+
+        match = re.search(r'([\d,]+)k?\s*(miles?|mi)', str(text).lower())
+        if match:
+            mileage_str = match.group(1).replace(',', '')
+            mileage = float(mileage_str)
+            # If it says "65k", multiply by 1000
+            if 'k' in match.group(0).lower():
+                mileage *= 1000
+            return int(mileage)
+        return None
+
+    def _parse_odometer(self, value):
+        """Mileage from an attribute value like '142,000'"""
+        digits = re.sub(r'[^\d]', '', value or '')
+        return int(digits) if digits else None
@@ -0,0 +1,142 @@
+"""Record scraper HTTP traffic into a cassette and replay it offline.
+
+Record: attach a Cassette to the session the scrapers use (ScraperManager
+does this when SCRAPE_RECORD_CASSETTE names a file, scraping into an empty
+page and detail cache so nothing is answered with a 304 or skipped) and
+every response that comes back through it is captured; save() writes them
+to a gzipped JSON archive.
+
+Replay: serve `cassette.render` from a local HTTP server (the benchmarks
+use benchmarks/stand_in_server.py, which adds configurable latency) and
+call replay_through(session, server_url). Requests for
+https://saltlakecity.craigslist.org/search/cta?s=0 are then sent to
+<server_url>/saltlakecity.craigslist.org/search/cta?s=0, so the rate
+limiter, connection pool, cache and parsers all run exactly as they do
+against the live sites.
+"""
+
+import gzip
+import json
+import threading
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+CASSETTE_VERSION = 1
+
+
+def _key(host, path, query_pairs):
+    """Lookup key shared by recorded URLs and replayed requests"""
+    query = urlencode(sorted(query_pairs))
+    return f"/{host}{path}?{query}" if query else f"/{host}{path}"
+
+
+def url_key(url):
+    parts = urlsplit(url)
+    return _key(parts.netloc, parts.path or '/', parse_qsl(parts.query, keep_blank_values=True))
+
+
+class Cassette:
+    """Recorded responses keyed by host, path and (order-insensitive) query"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.interactions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {path}")
+        cassette = cls(path)
+        for interaction in data['interactions']:
+            cassette.interactions[url_key(interaction['url'])] = interaction
+        return cassette
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            interactions = list(self.interactions.values())
+        data = {
+            'version': CASSETTE_VERSION,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'interactions': interactions,
+        }
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=9) as f:
+            json.dump(data, f)
+        return len(interactions)
+
+    def add(self, url, body, status=200, content_type='text/html; charset=utf-8'):
+        """Store one response; a later recording of the same URL replaces it"""
+        with self._lock:
+            self.interactions[url_key(url)] = {
+                'url': url,
+                'status': status,
+                'content_type': content_type,
+                'body': body,
+            }
+
+    def attach(self, session):
+        """Record every response `session` receives from now on"""
+        session.hooks['response'].append(self._record)
+
+    def _record(self, response, *args, **kwargs):
+        # 304s carry no body to replay. Recording through a warm cache leaves
+        # those URLs out, which is why ScraperManager records with an empty one.
+        if response.status_code == 304:
+            return
+        self.add(
+            response.url, response.text, status=response.status_code,
+            content_type=response.headers.get('Content-Type', 'text/html')
+        )
+
+    def render(self, path, query):
+        """Recorded body for a replayed request, or None (404) if never recorded.
+
+        Matches the StandInServer render(path, query) signature, where
+        `path` is /<original host><original path>.
+        """
+        host, _, rest = path.lstrip('/').partition('/')
+        pairs = [(k, v) for k, values in query.items() for v in values]
+        interaction = self.interactions.get(_key(host, '/' + rest, pairs))
+        if not interaction or interaction['status'] != 200:
+            return None
+        return interaction['body']
+
+    def __len__(self):
+        return len(self.interactions)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to a replay server instead"""
+
+    def __init__(self, server_url, **kwargs):
+        self.server_url = server_url.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parts = urlsplit(original_url)
+        request.url = f"{self.server_url}/{parts.netloc}{parts.path or '/'}"
+        if parts.query:
+            request.url += f"?{parts.query}"
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            request.url = original_url
+        # Callers (and the response cache) keep seeing the live URL
+        response.url = original_url
+        return response
+
+
+def replay_through(session, server_url, pool_size=10):
+    """Route all of `session`'s requests to the replay server at `server_url`"""
+    adapter = ReplayAdapter(
+        server_url, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
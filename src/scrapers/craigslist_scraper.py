@@ -1,74 +1,51 @@
 import requests
-from bs4 import BeautifulSoup
-import re
-import time
-from datetime import datetime
 
-class CraigslistScraper:
-    def __init__(self, city="saltlakecity"):
+from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.detail_enricher import VIN_PATTERN
+from src.scrapers.registry import register_scraper
+from src.scrapers.title_parser import parse_title
+
+
+@register_scraper
+class CraigslistScraper(BaseScraper):
+    source = 'craigslist'
+    display_name = 'Craigslist'
+    id_prefix = 'cl'
+    # URL format: https://saltlakecity.craigslist.org/cto/d/title/1234567890.html
+    id_pattern = r'/(\d+)\.html'
+    needs_region = True
+    page_size = 120
+    
+    def __init__(self, city="saltlakecity", max_workers=4, rate_limiter=None,
+                 session=None, cache=None, parser=None, base_url=None,
+                 parse_pool=None):
+        super().__init__(rate_limiter=rate_limiter, session=session, cache=cache,
+                         parser=parser, max_workers=max_workers,
+                         parse_pool=parse_pool)
         self.city = city
-        self.base_url = f"https://{city}.craigslist.org/search/cta"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        self.base_url = base_url or f"https://{city}.craigslist.org/search/cta"
     
-    def scrape_listings(self, max_pages=2):
-        """Scrape car listings from Craigslist"""
-        all_listings = []
-        
-        for page in range(max_pages):
-            print(f"📄 Scraping page {page + 1}...")
-            
-            # Craigslist pagination: ?s=0, ?s=120, ?s=240, etc.
-            params = {'s': page * 120}
-            
-            try:
-                response = requests.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=10
-                )
-                response.raise_for_status()
-                
-                listings = self._parse_page(response.text)
-                all_listings.extend(listings)
-                
-                print(f"  ✅ Found {len(listings)} listings on page {page + 1}")
-                
-                # Be respectful - don't hammer the server
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"  ❌ Error scraping page {page + 1}: {e}")
-                continue
-        
-        print(f"\n🎉 Total listings scraped: {len(all_listings)}")
-        return all_listings
+    @classmethod
+    def from_target(cls, target, **kwargs):
+        """Build a scraper for one Craigslist region (the subdomain)"""
+        return cls(city=target['region'], **kwargs)
+    
+    def parse_options(self):
+        # Relative listing links are resolved against the city subdomain
+        return dict(super().parse_options(), city=self.city)
     
-    def _parse_page(self, html):
-        """Parse a Craigslist search results page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        listings = []
-        
-        # Find all listing cards
-        results = soup.find_all('li', class_='cl-static-search-result')
-        
-        for result in results:
-            try:
-                listing = self._parse_listing(result)
-                if listing:
-                    listings.append(listing)
-            except Exception as e:
-                print(f"    ⚠️ Error parsing listing: {e}")
-                continue
-        
-        return listings
+    def page_url(self, page):
+        """Craigslist pagination: ?s=0, ?s=120, ?s=240, etc."""
+        params = {'s': page * self.page_size}
+        return requests.Request('GET', self.base_url, params=params).prepare().url
+    
+    def _result_cards(self, doc):
+        return doc.select('li.cl-static-search-result')
     
     def _parse_listing(self, result):
         """Parse a single listing"""
         # Get the link - it's the direct child <a> tag
-        link = result.find('a')
+        link = result.select_one('a')
         if not link:
             return None
         
@@ -83,23 +60,23 @@ class CraigslistScraper:
         external_id = self._extract_id_from_url(url)
         
         # Get title
-        title_elem = result.find('div', class_='title')
-        title = title_elem.get_text(strip=True) if title_elem else "No title"
+        title_elem = result.select_one('div.title')
+        title = title_elem.text() if title_elem else "No title"
         
         # Get price
-        price_elem = result.find('div', class_='price')
-        price = self._parse_price(price_elem.get_text(strip=True) if price_elem else "")
+        price_elem = result.select_one('div.price')
+        price = self._parse_price(price_elem.text() if price_elem else "")
         
         # Get location
-        location_elem = result.find('div', class_='location')
-        location = location_elem.get_text(strip=True) if location_elem else ""
+        location_elem = result.select_one('div.location')
+        location = location_elem.text() if location_elem else ""
         
         # Get details div for any meta info
-        details_elem = result.find('div', class_='details')
-        meta_text = details_elem.get_text(strip=True) if details_elem else ""
+        details_elem = result.select_one('div.details')
+        meta_text = details_elem.text() if details_elem else ""
         
         # Parse year, make, model from title
-        year, make, model = self._parse_title(title)
+        year, make, model = parse_title(title)
         
         # Parse mileage from meta or title
         mileage = self._parse_mileage(meta_text + " " + title)
@@ -120,68 +97,51 @@ class CraigslistScraper:
         
         return listing
     
-    def _extract_id_from_url(self, url):
-        """Extract listing ID from URL"""
-        # URL format: https://saltlakecity.craigslist.org/cto/d/title/1234567890.html
-        match = re.search(r'/(\d+)\.html', url)
-        if match:
-            return f"cl_{match.group(1)}"
-        return f"cl_{hash(url)}"
-    
-    def _parse_price(self, price_text):
-        """Extract numeric price from text like '$15,500'"""
-        if not price_text:
-            return None
-        
-        # Remove $ and commas, extract number
-        match = re.search(r'\$?([\d,]+)', price_text)
-        if match:
-            return float(match.group(1).replace(',', ''))
-        return None
-    
-    def _parse_title(self, title):
-        """Extract year, make, model from title"""
-        # Common pattern: "2018 Honda Civic LX"
-        year = None
-        make = None
-        model = None
-        
-        # Extract year (4 digits)
-        year_match = re.search(r'\b(19\d{2}|20\d{2})\b', title)
-        if year_match:
-            year = int(year_match.group(1))
-        
-        # Common car makes
-        makes = ['honda', 'toyota', 'ford', 'chevrolet', 'chevy', 'nissan', 
-                 'mazda', 'subaru', 'hyundai', 'kia', 'volkswagen', 'vw',
-                 'bmw', 'mercedes', 'audi', 'lexus', 'acura', 'infiniti',
-                 'dodge', 'jeep', 'ram', 'gmc', 'buick', 'cadillac']
-        
-        title_lower = title.lower()
-        for car_make in makes:
-            if car_make in title_lower:
-                make = car_make.title()
-                # Try to extract model (word after make)
-                pattern = rf'{car_make}\s+(\w+)'
-                model_match = re.search(pattern, title_lower)
-                if model_match:
-                    model = model_match.group(1).title()
-                break
-        
-        return year, make, model
-    
-    def _parse_mileage(self, text):
-        """Extract mileage from text"""
-        # Look for patterns like "65000 miles" or "65k"
-        match = re.search(r'([\d,]+)k?\s*(miles?|mi)', text.lower())
-        if match:
-            mileage_str = match.group(1).replace(',', '')
-            mileage = float(mileage_str)
-            # If it says "65k", multiply by 1000
-            if 'k' in match.group(0).lower():
-                mileage *= 1000
-            return int(mileage)
-        return None
+    def parse_detail(self, html):
+        """Parse a listing detail page: full description, mileage, VIN, attributes"""
+        doc = self.parser.parse(html)
+        
+        # Attribute rows, e.g. <div class="attr auto_miles">
+        #   <span class="labl">odometer:</span><span class="valu">150,000</span>
+        attributes = {}
+        for attr in doc.select('div.attrgroup div.attr'):
+            label = attr.select_one('span.labl')
+            value = attr.select_one('span.valu')
+            if label and value:
+                attributes[label.text().rstrip(':').lower()] = value.text()
+        
+        # Older layout: <p class="attrgroup"><span>odometer: <b>150000</b></span>
+        for span in doc.select('p.attrgroup span'):
+            label, sep, value = span.text().partition(':')
+            if sep and value:
+                attributes.setdefault(label.lower(), value)
+        
+        body = doc.select_one('section#postingbody')
+        description = None
+        if body:
+            lines = [s.strip() for s in body.strings() if s.strip()]
+            # Skip the "QR Code Link to This Post" print-only header
+            description = '\n'.join(
+                line for line in lines if line != 'QR Code Link to This Post'
+            ) or None
+        
+        mileage = None
+        if attributes.get('odometer'):
+            mileage = self._parse_odometer(attributes['odometer'])
+        if mileage is None and description:
+            mileage = self._parse_mileage(description)
+        
+        vin = attributes.get('vin')
+        if not vin and description:
+            match = VIN_PATTERN.search(description.upper())
+            vin = match.group(0) if match else None
+        
+        return {
+            'description': description,
+            'mileage': mileage,
+            'vin': vin.upper() if vin else None,
+            'attributes': attributes,
+        }
 
 
 # Test the scraper
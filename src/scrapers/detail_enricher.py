@@ -0,0 +1,130 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 17 characters, no I, O or Q (ISO 3779)
+VIN_PATTERN = re.compile(r'\b[A-HJ-NPR-Z0-9]{17}\b')
+
+
+class DetailEnricher:
+    """Fetch listing detail pages for listings the search cards undersell.
+
+    `parsers` maps a listing's source to a callable that turns a detail page
+    into {'description', 'mileage', 'vin', 'attributes'}. Parsed details are
+    cached by external_id together with the price they were fetched at, so a
+    listing's page is only fetched again once its price moves. At most
+    `max_workers` detail pages are in flight at a time.
+    """
+
+    def __init__(self, parsers, rate_limiter, session, directory='cache',
+                 max_workers=4):
+        os.makedirs(directory, exist_ok=True)
+        self.parsers = parsers
+        self.rate_limiter = rate_limiter
+        self.session = session
+        self.max_workers = max_workers
+        self.path = os.path.join(directory, 'details.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                external_id TEXT PRIMARY KEY,
+                price REAL,
+                details TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._stats = {'cached': 0, 'fetched': 0, 'failed': 0}
+
+    def enrich(self, listings):
+        """Yield (listing, details) for every listing whose details are available.
+
+        Listings with a cached entry at the same price are answered from the
+        cache; the rest are fetched on the worker pool.
+        """
+        to_fetch = []
+        for listing in listings:
+            details = self._cached(listing)
+            if details is not None:
+                self._count('cached')
+                yield listing, details
+            elif listing.get('source') in self.parsers:
+                to_fetch.append(listing)
+
+        if not to_fetch:
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                  thread_name_prefix='details')
+        try:
+            for listing, details in pool.map(self._fetch, to_fetch):
+                if details is not None:
+                    yield listing, details
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _cached(self, listing):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT price, details FROM details WHERE external_id = ?",
+                (listing['external_id'],)
+            ).fetchone()
+        if not row or not _same_price(row[0], listing.get('price')):
+            return None
+        return json.loads(row[1])
+
+    def _fetch(self, listing):
+        """Download and parse one detail page; errors are counted, not raised"""
+        try:
+            response = self.rate_limiter.get(
+                listing['url'],
+                session=self.session,
+                timeout=10
+            )
+            response.raise_for_status()
+            details = self.parsers[listing['source']](response.text)
+        except Exception as e:
+            self._count('failed')
+            print(f"    ⚠️ Error fetching details for {listing['external_id']}: {e}")
+            return listing, None
+
+        self._store(listing, details)
+        self._count('fetched')
+        return listing, details
+
+    def _store(self, listing, details):
+        price = listing.get('price')
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO details (external_id, price, details, fetched_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (listing['external_id'], float(price) if price is not None else None,
+                 json.dumps(details), time.time())
+            )
+            self._conn.commit()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Cached / fetched / failed counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _same_price(cached, current):
+    if cached is None or current is None:
+        return cached is None and current is None
+    return float(cached) == float(current)
@@ -0,0 +1,164 @@
+"""Interchangeable HTML parser backends for the scrapers.
+
+Every backend turns a page into a node that supports the handful of
+operations the scrapers need: CSS `select`/`select_one`, attribute `get`,
+`text()` (all descendant strings stripped and joined, like BeautifulSoup's
+get_text(strip=True)) and `strings()` (raw text nodes in document order).
+
+    html.parser  BeautifulSoup + stdlib parser (default, no extra deps)
+    bs4-lxml     BeautifulSoup tree built by lxml
+    lxml         lxml.html + cssselect
+    selectolax   selectolax's lexbor engine
+
+Backends other than html.parser need their package installed; asking for
+one that isn't raises ImportError naming the package.
+"""
+
+from functools import lru_cache
+
+_NON_CONTENT_TAGS = ('script', 'style', 'template')
+
+
+class BS4Node:
+    def __init__(self, element):
+        self._el = element
+
+    def select(self, css):
+        return [BS4Node(el) for el in self._el.select(css)]
+
+    def select_one(self, css):
+        el = self._el.select_one(css)
+        return BS4Node(el) if el is not None else None
+
+    def get(self, attr, default=None):
+        return self._el.get(attr, default)
+
+    def text(self):
+        return self._el.get_text(strip=True)
+
+    def strings(self):
+        return list(self._el.strings)
+
+
+class BS4Backend:
+    def __init__(self, features):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self.features = features
+        if features == 'lxml':
+            _require('lxml', 'lxml')
+
+    def parse(self, html):
+        return BS4Node(self._soup(html, self.features))
+
+
+@lru_cache(maxsize=None)
+def _css_to_xpath(css):
+    """Translating CSS to XPath is costly, so compile each selector once"""
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(css, translator='html')
+
+
+class LxmlNode:
+    def __init__(self, element):
+        self._el = element
+
+    def select(self, css):
+        return [LxmlNode(el) for el in _css_to_xpath(css)(self._el)]
+
+    def select_one(self, css):
+        matches = _css_to_xpath(css)(self._el)
+        return LxmlNode(matches[0]) if matches else None
+
+    def get(self, attr, default=None):
+        return self._el.get(attr, default)
+
+    def text(self):
+        return ''.join(s.strip() for s in self.strings())
+
+    def strings(self):
+        return [str(s) for s in self._el.xpath(
+            './/text()[not(ancestor::script or ancestor::style or ancestor::template)]'
+        )]
+
+
+class LxmlBackend:
+    def __init__(self):
+        _require('lxml', 'lxml')
+        _require('cssselect', 'cssselect')
+        import lxml.html
+        self._fromstring = lxml.html.document_fromstring
+
+    def parse(self, html):
+        return LxmlNode(self._fromstring(html))
+
+
+class SelectolaxNode:
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [SelectolaxNode(n) for n in self._node.css(css)]
+
+    def select_one(self, css):
+        node = self._node.css_first(css)
+        return SelectolaxNode(node) if node is not None else None
+
+    def get(self, attr, default=None):
+        value = self._node.attributes.get(attr, default)
+        return default if value is None else value
+
+    def text(self):
+        return ''.join(s.strip() for s in self.strings())
+
+    def strings(self):
+        strings = []
+        for node in self._node.traverse(include_text=True):
+            if node.tag != '-text':
+                continue
+            parent = node.parent
+            if parent is not None and parent.tag in _NON_CONTENT_TAGS:
+                continue
+            strings.append(node.text_content)
+        return strings
+
+
+class SelectolaxBackend:
+    def __init__(self):
+        _require('selectolax', 'selectolax')
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def parse(self, html):
+        return SelectolaxNode(self._parser(html).root)
+
+
+def _require(module, package):
+    try:
+        __import__(module)
+    except ImportError as e:
+        raise ImportError(
+            f"This parser backend needs the '{package}' package "
+            f"(pip install {package})"
+        ) from e
+
+
+PARSER_BACKENDS = {
+    'html.parser': lambda: BS4Backend('html.parser'),
+    'bs4-lxml': lambda: BS4Backend('lxml'),
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend,
+}
+
+DEFAULT_PARSER = 'html.parser'
+
+
+def get_parser_backend(name=None):
+    """Instantiate the backend registered under `name`"""
+    name = name or DEFAULT_PARSER
+    if name not in PARSER_BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend '{name}' "
+            f"(choose from {', '.join(PARSER_BACKENDS)})"
+        )
+    return PARSER_BACKENDS[name]()
@@ -0,0 +1,45 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def create_session(pool_size=10, max_retries=3, backoff_factor=0.5):
+    """Build a keep-alive session with a connection pool and retry adapter.
+
+    `pool_size` is the number of connections kept open per host; size it to
+    at least the number of worker threads sharing the session. Connection
+    errors and 5xx gateway errors are retried by urllib3 with exponential
+    backoff. 429/503 are left to the RateLimiter so throttling is tracked
+    in one place.
+    """
+    session = requests.Session()
+
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=backoff_factor,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    # urllib3 only advertises encodings it can decode, so "br" is offered
+    # when the brotli (or brotlicffi) package is installed
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive',
+    })
+    return session
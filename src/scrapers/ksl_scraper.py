@@ -1,86 +1,67 @@
 import requests
-from bs4 import BeautifulSoup
 import re
-import time
-from datetime import datetime
 
-class KSLScraper:
-    def __init__(self):
-        self.base_url = "https://cars.ksl.com/search/newused"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.detail_enricher import VIN_PATTERN
+from src.scrapers.registry import register_scraper
+from src.scrapers.title_parser import parse_title
+
+# Class-substring matches, e.g. "listing-price" or "ListingLocation"
+PRICE_SELECTOR = ('div[class*="price"], span[class*="price"], '
+                  'div[class*="Price"], span[class*="Price"]')
+LOCATION_SELECTOR = ('div[class*="location"], span[class*="location"], '
+                     'div[class*="Location"], span[class*="Location"]')
+MILEAGE_TEXT = re.compile(r'\d+,?\d*\s*(miles?|mi)', re.I)
+# "pecification" catches both "specifications" and "listingSpecifications"
+SPEC_SELECTOR = ('ul[class*="pecification"] li, div[class*="pecification"] li, '
+                 'dl[class*="pecification"] div')
+DESCRIPTION_SELECTOR = 'div[class*="description"], div[class*="Description"]'
+
+@register_scraper
+class KSLScraper(BaseScraper):
+    source = 'ksl'
+    display_name = 'KSL'
+    id_prefix = 'ksl'
+    # KSL URLs: https://cars.ksl.com/listing/1234567
+    id_pattern = r'/listing/(\d+)'
+    # KSL's default perPage
+    page_size = 24
     
-    def scrape_listings(self, max_pages=2):
-        """Scrape car listings from KSL Cars"""
-        all_listings = []
-        
-        for page in range(1, max_pages + 1):
-            print(f"🔍 Scraping KSL page {page}...")
-            
-            params = {
-                'page': page,
-                'perPage': 24  # KSL default
-            }
-            
-            try:
-                response = requests.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=10
-                )
-                response.raise_for_status()
-                
-                listings = self._parse_page(response.text)
-                all_listings.extend(listings)
-                
-                print(f"  ✅ Found {len(listings)} listings on page {page}")
-                
-                # Be respectful
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"  ❌ Error scraping KSL page {page}: {e}")
-                continue
-        
-        print(f"\n🎉 Total KSL listings scraped: {len(all_listings)}")
-        return all_listings
+    def __init__(self, rate_limiter=None, session=None, cache=None, parser=None,
+                 max_workers=4, base_url=None, parse_pool=None):
+        super().__init__(rate_limiter=rate_limiter, session=session, cache=cache,
+                         parser=parser, max_workers=max_workers,
+                         parse_pool=parse_pool)
+        self.base_url = base_url or "https://cars.ksl.com/search/newused"
     
-    def _parse_page(self, html):
-        """Parse a KSL search results page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        listings = []
-        
+    def page_url(self, page):
+        """KSL pages are numbered from 1"""
+        params = {
+            'page': page + 1,
+            'perPage': self.page_size
+        }
+        return requests.Request('GET', self.base_url, params=params).prepare().url
+    
+    def _result_cards(self, doc):
         # KSL uses <div class="listing-item"> or similar
         # You'll need to inspect the actual HTML structure
-        results = soup.find_all('div', class_='listing-item')
+        results = doc.select('div.listing-item')
         
         # If that doesn't work, try these alternatives:
         if not results:
-            results = soup.find_all('article', class_='listing')
+            results = doc.select('article.listing')
         if not results:
-            results = soup.find_all('div', {'data-role': 'listing'})
-        
-        for result in results:
-            try:
-                listing = self._parse_listing(result)
-                if listing:
-                    listings.append(listing)
-            except Exception as e:
-                print(f"    ⚠️ Error parsing KSL listing: {e}")
-                continue
-        
-        return listings
+            results = doc.select('div[data-role="listing"]')
+        return results
     
     def _parse_listing(self, result):
         """Parse a single KSL listing"""
         # Find the link
-        link = result.find('a', href=True)
+        link = result.select_one('a[href]')
         if not link:
             return None
         
-        url = link['href']
+        url = link.get('href')
         if not url.startswith('http'):
             url = f"https://cars.ksl.com{url}"
         
@@ -89,26 +70,28 @@ class KSLScraper:
         external_id = self._extract_id_from_url(url)
         
         # Get title - usually in <h3> or <h4>
-        title_elem = result.find(['h3', 'h4', 'h2'])
-        title = title_elem.get_text(strip=True) if title_elem else "No title"
+        title_elem = result.select_one('h3, h4, h2')
+        title = title_elem.text() if title_elem else "No title"
         
         # Get price - usually has class 'price' or data-role='price'
-        price_elem = result.find(['div', 'span'], class_=lambda x: x and 'price' in x.lower() if x else False)
+        price_elem = result.select_one(PRICE_SELECTOR)
         if not price_elem:
-            price_elem = result.find(['div', 'span'], attrs={'data-role': 'price'})
+            price_elem = result.select_one('div[data-role="price"], span[data-role="price"]')
         
-        price = self._parse_price(price_elem.get_text(strip=True) if price_elem else "")
+        price = self._parse_price(price_elem.text() if price_elem else "")
         
-        # Get mileage - usually labeled
-        mileage_elem = result.find(text=re.compile(r'\d+,?\d*\s*(miles?|mi)', re.I))
-        mileage = self._parse_mileage(mileage_elem) if mileage_elem else None
+        # Get mileage - first text node that looks like "65,000 miles"
+        mileage_text = next(
+            (s for s in result.strings() if MILEAGE_TEXT.search(s)), None
+        )
+        mileage = self._parse_mileage(mileage_text) if mileage_text else None
         
         # Get location
-        location_elem = result.find(['div', 'span'], class_=lambda x: x and 'location' in x.lower() if x else False)
-        location = location_elem.get_text(strip=True) if location_elem else ""
+        location_elem = result.select_one(LOCATION_SELECTOR)
+        location = location_elem.text() if location_elem else ""
         
         # Parse year, make, model from title
-        year, make, model = self._parse_title(title)
+        year, make, model = parse_title(title)
         
         listing = {
             'external_id': external_id,
@@ -126,69 +109,40 @@ class KSLScraper:
         
         return listing
     
-    def _extract_id_from_url(self, url):
-        """Extract listing ID from URL"""
-        # KSL: https://cars.ksl.com/listing/1234567
-        match = re.search(r'/listing/(\d+)', url)
-        if match:
-            return f"ksl_{match.group(1)}"
-        return f"ksl_{hash(url)}"
-    
-    def _parse_price(self, price_text):
-        """Extract numeric price from text"""
-        if not price_text:
-            return None
-        
-        # Remove $, commas, extract number
-        match = re.search(r'\$?([\d,]+)', price_text)
-        if match:
-            return float(match.group(1).replace(',', ''))
-        return None
-    
-    def _parse_title(self, title):
-        """Extract year, make, model from title"""
-        year = None
-        make = None
-        model = None
-        
-        # Extract year
-        year_match = re.search(r'\b(19\d{2}|20\d{2})\b', title)
-        if year_match:
-            year = int(year_match.group(1))
-        
-        # Common car makes
-        makes = ['honda', 'toyota', 'ford', 'chevrolet', 'chevy', 'nissan', 
-                 'mazda', 'subaru', 'hyundai', 'kia', 'volkswagen', 'vw',
-                 'bmw', 'mercedes', 'audi', 'lexus', 'acura', 'infiniti',
-                 'dodge', 'jeep', 'ram', 'gmc', 'buick', 'cadillac', 
-                 'tesla', 'porsche', 'volvo', 'mitsubishi']
-        
-        title_lower = title.lower()
-        for car_make in makes:
-            if car_make in title_lower:
-                make = car_make.title()
-                # Try to extract model (word after make)
-                pattern = rf'{car_make}\s+(\w+)'
-                model_match = re.search(pattern, title_lower)
-                if model_match:
-                    model = model_match.group(1).title()
-                break
-        
-        return year, make, model
-    
-    def _parse_mileage(self, text):
-        """Extract mileage from text"""
-        if not text:
-            return None
-        
-        match = re.search(r'([\d,]+)k?\s*(miles?|mi)', str(text).lower())
-        if match:
-            mileage_str = match.group(1).replace(',', '')
-            mileage = float(mileage_str)
-            if 'k' in match.group(0).lower():
-                mileage *= 1000
-            return int(mileage)
-        return None
+    def parse_detail(self, html):
+        """Parse a listing detail page: full description, mileage, VIN, attributes"""
+        doc = self.parser.parse(html)
+        
+        # Specification rows read like "Mileage: 65,000" or "VIN: 1FT..."
+        attributes = {}
+        for row in doc.select(SPEC_SELECTOR):
+            label, sep, value = row.text().partition(':')
+            if sep and value:
+                attributes[label.strip().lower()] = value.strip()
+        
+        description_elem = doc.select_one(DESCRIPTION_SELECTOR)
+        description = None
+        if description_elem:
+            lines = [s.strip() for s in description_elem.strings() if s.strip()]
+            description = '\n'.join(lines) or None
+        
+        mileage = None
+        if attributes.get('mileage'):
+            mileage = self._parse_odometer(attributes['mileage'])
+        if mileage is None and description:
+            mileage = self._parse_mileage(description)
+        
+        vin = attributes.get('vin')
+        if not vin and description:
+            match = VIN_PATTERN.search(description.upper())
+            vin = match.group(0) if match else None
+        
+        return {
+            'description': description,
+            'mileage': mileage,
+            'vin': vin.upper() if vin else None,
+            'attributes': attributes,
+        }
 
 
 # Test the scraper
@@ -0,0 +1,66 @@
+"""Parse result pages on a pool of worker processes.
+
+HTML parsing is CPU-bound and holds the GIL, so once pages are fetched
+concurrently a single core becomes the limit. ParsePool hands raw page
+bodies to a ProcessPoolExecutor and gets listings back as compact tuples
+(LISTING_FIELDS order) rather than dicts, which keeps pickling cheap.
+
+Each worker process builds one scraper per (source, options) and reuses it,
+so the parser backend and compiled selectors are set up once per process.
+Workers are started with the "spawn" method: the scrape runs thread pools,
+and forking a process that has threads running is unsafe.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from src.scrapers.registry import get_scraper_class
+
+LISTING_FIELDS = ('external_id', 'source', 'url', 'title', 'price', 'year',
+                  'make', 'model', 'mileage', 'location', 'description')
+
+# Per-process scrapers, keyed by (source, sorted options)
+_worker_scrapers = {}
+
+
+def _worker_scraper(source, options):
+    key = (source, tuple(sorted(options.items())))
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = get_scraper_class(source)(**options)
+        _worker_scrapers[key] = scraper
+    return scraper
+
+
+def _parse_compact(job):
+    """Runs in a worker: parse one page into listing tuples"""
+    source, options, html = job
+    listings = _worker_scraper(source, options)._parse_page(html)
+    return [tuple(listing.get(field) for field in LISTING_FIELDS) for listing in listings]
+
+
+def _expand(rows):
+    return [dict(zip(LISTING_FIELDS, row)) for row in rows]
+
+
+class ParsePool:
+    """Process pool that turns page HTML into listing dicts"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    def parse(self, scraper, html):
+        """Parse one page for `scraper` in a worker; blocks until done.
+
+        Each fetch thread parses its page as soon as it arrives, so callers
+        on different threads parse in parallel, one page per worker process.
+        """
+        job = (scraper.source, scraper.parse_options(), html)
+        return _expand(self._executor.submit(_parse_compact, job).result())
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,186 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+# Responses that mean "slow down" rather than "this request is broken"
+THROTTLE_STATUSES = {429, 503}
+
+
+class _HostState:
+    """Token bucket and adaptive-rate bookkeeping for a single host"""
+
+    def __init__(self, rate, burst, max_in_flight):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+
+        # Counters
+        self.requests = 0
+        self.throttle_responses = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+
+class RateLimiter:
+    """Per-host token bucket that backs off on 429/503 and recovers on success.
+
+    Each host gets `rate` requests per second (bursting up to `burst`) and at
+    most `max_in_flight` concurrent requests. A throttling response halves the
+    host's rate and pauses it for `Retry-After` or an exponential backoff with
+    jitter; every healthy response adds `recovery_step` back, up to `max_rate`.
+    """
+
+    def __init__(self, rate=0.5, burst=1, min_rate=0.05, max_rate=2.0,
+                 recovery_step=0.1, max_in_flight=4, base_backoff=2.0,
+                 max_backoff=120.0):
+        self.initial_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.recovery_step = recovery_step
+        self.max_in_flight = max_in_flight
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = _HostState(self.initial_rate, self.burst, self.max_in_flight)
+                self._hosts[host] = state
+            return state
+
+    def acquire(self, host):
+        """Block until `host` may receive another request"""
+        state = self._state(host)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                state.tokens = min(
+                    state.burst, state.tokens + (now - state.updated) * state.rate
+                )
+                state.updated = now
+
+                if now < state.backoff_until:
+                    delay = state.backoff_until - now
+                elif state.tokens >= 1:
+                    state.tokens -= 1
+                    state.requests += 1
+                    state.throttled_seconds += waited
+                    return
+                else:
+                    delay = (1 - state.tokens) / state.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def record_response(self, host, status_code, retry_after=None):
+        """Adapt the host's rate to the status of a finished request"""
+        state = self._state(host)
+
+        with self._lock:
+            if status_code in THROTTLE_STATUSES:
+                state.failures += 1
+                state.throttle_responses += 1
+                state.rate = max(self.min_rate, state.rate / 2)
+
+                delay = _parse_retry_after(retry_after)
+                if delay is None:
+                    delay = min(
+                        self.max_backoff,
+                        self.base_backoff * 2 ** (state.failures - 1)
+                    )
+                    delay *= random.uniform(0.5, 1.5)
+
+                state.backoff_until = max(
+                    state.backoff_until, time.monotonic() + delay
+                )
+                state.backoff_seconds += delay
+                # Don't let tokens saved up before the backoff fire all at once
+                state.tokens = 0
+            else:
+                state.failures = 0
+                state.rate = min(self.max_rate, state.rate + self.recovery_step)
+
+    def get(self, url, session=None, max_retries=3, **kwargs):
+        """GET `url` within the host budget, retrying throttled responses"""
+        host = urlparse(url).netloc
+        state = self._state(host)
+        http = session or requests
+
+        for attempt in range(max_retries + 1):
+            self.acquire(host)
+            with state.slots:
+                response = http.get(url, **kwargs)
+
+            self.record_response(
+                host, response.status_code, response.headers.get('Retry-After')
+            )
+            if response.status_code not in THROTTLE_STATUSES or attempt == max_retries:
+                break
+            print(f"  ⏳ {host} returned {response.status_code}, backing off "
+                  f"(retry {attempt + 1}/{max_retries})")
+
+        return response
+
+    def stats(self):
+        """Per-host request and throttling counters"""
+        with self._lock:
+            return {
+                host: {
+                    'requests': state.requests,
+                    'throttle_responses': state.throttle_responses,
+                    'throttled_seconds': round(state.throttled_seconds, 3),
+                    'backoff_seconds': round(state.backoff_seconds, 3),
+                    'current_rate': round(state.rate, 3),
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def total_throttled_seconds(self):
+        """Total time callers spent waiting on this limiter, across hosts"""
+        with self._lock:
+            return sum(state.throttled_seconds for state in self._hosts.values())
+
+
+def _parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    """Process-wide limiter so every scraper shares the same per-host budget"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
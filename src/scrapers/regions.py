@@ -0,0 +1,46 @@
+import json
+import os
+
+from src.scrapers.registry import get_scraper_class
+
+# What ScraperManager scrapes when no targets file is configured
+DEFAULT_TARGETS = [
+    {'source': 'craigslist', 'region': 'saltlakecity'},
+    {'source': 'ksl', 'region': None},
+]
+
+
+def load_targets(path=None):
+    """Load the list of (source, region) scrape targets.
+    
+    Reads the JSON file at `path` (or $SCRAPE_TARGETS_FILE), a list of
+    objects like {"source": "craigslist", "region": "provo"}. Entries with
+    "enabled": false are skipped. Falls back to DEFAULT_TARGETS.
+    """
+    path = path or os.getenv('SCRAPE_TARGETS_FILE')
+    if not path:
+        return [dict(target) for target in DEFAULT_TARGETS]
+    
+    with open(path, 'r') as f:
+        raw_targets = json.load(f)
+    
+    targets = []
+    for raw in raw_targets:
+        if not raw.get('enabled', True):
+            continue
+        source = raw.get('source')
+        try:
+            scraper_class = get_scraper_class(source)
+        except ValueError as e:
+            raise ValueError(f"{e} in {path}") from None
+        if scraper_class.needs_region and not raw.get('region'):
+            raise ValueError(f"{source} target without a region in {path}")
+        targets.append({'source': source, 'region': raw.get('region')})
+    return targets
+
+
+def target_name(target):
+    """Label used in logs, e.g. craigslist/provo"""
+    if target.get('region'):
+        return f"{target['source']}/{target['region']}"
+    return target['source']
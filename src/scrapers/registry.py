@@ -0,0 +1,38 @@
+"""Registry of the listing sources ScraperManager knows how to scrape.
+
+A BaseScraper subclass registers itself with @register_scraper under its
+`source` name; entries in the scrape targets file refer to that name.
+"""
+
+_SCRAPERS = {}
+
+
+def register_scraper(cls):
+    """Class decorator adding a BaseScraper subclass to the registry"""
+    if not cls.source:
+        raise ValueError(f"{cls.__name__} has no `source` name to register under")
+    _SCRAPERS[cls.source] = cls
+    return cls
+
+
+def _load_builtin_scrapers():
+    # Importing the modules runs their @register_scraper decorators
+    import src.scrapers.craigslist_scraper  # noqa: F401
+    import src.scrapers.ksl_scraper  # noqa: F401
+
+
+def get_scraper_class(source):
+    """Scraper class registered under `source`"""
+    _load_builtin_scrapers()
+    if source not in _SCRAPERS:
+        raise ValueError(
+            f"Unknown scrape source '{source}' "
+            f"(choose from {', '.join(_SCRAPERS)})"
+        )
+    return _SCRAPERS[source]
+
+
+def available_sources():
+    """Names of every registered source"""
+    _load_builtin_scrapers()
+    return tuple(_SCRAPERS)
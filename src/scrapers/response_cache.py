@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+    """On-disk cache of search result pages keyed by full URL.
+
+    Each entry keeps the compressed body, the ETag/Last-Modified validators,
+    a SHA-256 of the body and the listings parsed from it. The next fetch of
+    the URL is sent as a conditional request; on a 304 or a byte-identical
+    body the cached listings are returned and the page is not parsed again.
+    Entries are evicted least-recently-used once the stored bodies exceed
+    `max_bytes`.
+    """
+
+    def __init__(self, directory='cache', max_bytes=50 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'responses.sqlite3')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                body BLOB NOT NULL,
+                listings TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access "
+            "ON responses(last_access)"
+        )
+        self._conn.commit()
+        self._stats = {
+            'not_modified': 0,
+            'unchanged': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def lookup(self, url):
+        """Cached entry for `url` (validators, hash, listings) or None"""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT etag, last_modified, content_hash, listings
+                FROM responses WHERE url = ?
+                """,
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'content_hash': row[2],
+            'listings': row[3],
+        }
+
+    @staticmethod
+    def conditional_headers(entry):
+        """If-None-Match / If-Modified-Since headers for a looked-up entry"""
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def resolve(self, url, response, parse, entry):
+        """Return listings for `response`, calling `parse(html)` only on a real change.
+
+        `entry` is what lookup() returned before the request was sent, so a
+        304 can still be answered if the row was evicted in the meantime.
+        """
+        if response.status_code == 304 and entry:
+            self._touch(url, response)
+            self._count('not_modified')
+            return json.loads(entry['listings'])
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if entry and entry['content_hash'] == content_hash:
+            self._touch(url, response)
+            self._count('unchanged')
+            return json.loads(entry['listings'])
+
+        self._count('misses')
+        listings = parse(response.text)
+        self._store(url, response, content_hash, listings)
+        return listings
+
+    def _touch(self, url, response):
+        """Refresh recency (and validators, if the server sent new ones)"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE responses SET
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified),
+                    last_access = ?
+                WHERE url = ?
+                """,
+                (response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 time.time(), url)
+            )
+            self._conn.commit()
+
+    def _store(self, url, response, content_hash, listings):
+        body = zlib.compress(response.content)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses (
+                    url, etag, last_modified, content_hash, body, listings,
+                    size, last_access
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (url, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), content_hash, body,
+                 json.dumps(listings), len(body), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes (lock held)"""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT url, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            self._stats['evictions'] += 1
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Hit/miss counters plus current cache size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            stats = dict(self._stats)
+
+        stats['hits'] = stats['not_modified'] + stats['unchanged']
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = entries
+        stats['size_bytes'] = size
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
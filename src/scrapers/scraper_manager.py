@@ -1,55 +1,195 @@
-from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.cassette import Cassette
+from src.scrapers.detail_enricher import DetailEnricher
+from src.scrapers.http_session import create_session
+from src.scrapers.parse_pool import ParsePool
+from src.scrapers.rate_limiter import get_shared_rate_limiter
+from src.scrapers.regions import load_targets, target_name
+from src.scrapers.registry import available_sources, get_scraper_class
+from src.scrapers.response_cache import ResponseCache
 from src.database.db import Database
 from src.utils.logger import setup_logger
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+# Marks the end of the scraped page stream in the ingest queue
+_END_OF_PAGES = object()
 
 class ScraperManager:
-    def __init__(self):
+    def __init__(self, pool_size=10, queue_size=4, targets=None, workers=None,
+                 db=None, rate_limiter=None, batch_size=500):
         self.logger = setup_logger('scraper_manager')
-        self.db = Database()
-        self.cl_scraper = CraigslistScraper(city="saltlakecity")
-        self.logger.info("ScraperManager initialized")
+        self.db = db or Database()
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        # (source, region) pairs to scrape, see src/scrapers/regions.py
+        self.targets = targets or load_targets()
+        # Targets of one source scraped at the same time. Every source gets
+        # its own pool of this size, so a slow source can't hold up the
+        # others; each region is its own host, so the rate limiter still
+        # paces every region separately
+        self.workers = workers or int(os.getenv('SCRAPE_WORKERS', '4'))
+        # One pooled HTTP session shared by every scraper for the manager's
+        # lifetime, with a connection pool kept per region host
+        self.session = create_session(pool_size=max(pool_size, len(self.targets)))
+        # On-disk cache of result pages so unchanged pages aren't re-parsed
+        cache_dir = os.getenv('SCRAPE_CACHE_DIR', 'cache')
+        # Capture every response for offline replay, see src/scrapers/cassette.py
+        self.cassette = None
+        self.scratch_cache_dir = None
+        if os.getenv('SCRAPE_RECORD_CASSETTE'):
+            self.cassette = Cassette(os.getenv('SCRAPE_RECORD_CASSETTE'))
+            self.cassette.attach(self.session)
+            # A warm cache would answer pages with 304s and details without
+            # fetching them, leaving both out of the cassette. Record into an
+            # empty cache so every page and detail comes back as a full 200.
+            self.scratch_cache_dir = tempfile.mkdtemp(prefix='carwatch-record-')
+            cache_dir = self.scratch_cache_dir
+        self.cache = ResponseCache(
+            directory=cache_dir,
+            max_bytes=int(os.getenv('SCRAPE_CACHE_MAX_MB', '50')) * 1024 * 1024
+        )
+        self.parser = os.getenv('SCRAPER_PARSER')
+        # Worker processes for HTML parsing; 0 parses on the scraping threads
+        parse_workers = int(os.getenv('SCRAPE_PARSE_WORKERS', '0'))
+        self.parse_pool = ParsePool(workers=parse_workers) if parse_workers else None
+        # Detail pages for new and re-priced listings (full description,
+        # mileage, VIN), cached by external_id
+        self.enricher = DetailEnricher(
+            parsers={
+                source: get_scraper_class(source)(
+                    session=self.session, parser=self.parser
+                ).parse_detail
+                for source in available_sources()
+            },
+            rate_limiter=self.rate_limiter, session=self.session,
+            directory=cache_dir,
+            max_workers=int(os.getenv('SCRAPE_DETAIL_WORKERS', '4'))
+        )
+        # Max scraped pages waiting for the database stage before the
+        # scrapers block (streaming mode backpressure)
+        self.queue_size = queue_size
+        # Listings written per bulk upsert transaction
+        self.batch_size = batch_size
+        self.logger.info(
+            f"ScraperManager initialized with {len(self.targets)} targets, "
+            f"{self.workers} workers"
+        )
+    
+    def _build_scraper(self, target):
+        """Scraper for one target, sharing the manager's limiter, session and cache"""
+        return get_scraper_class(target['source']).from_target(
+            target, rate_limiter=self.rate_limiter, session=self.session,
+            cache=self.cache, parser=self.parser, parse_pool=self.parse_pool
+        )
     
-    def run_scrape(self, max_pages=2):
-        """Run full scrape and store in database"""
+    def run_scrape(self, max_pages=2, concurrent=False, stream=True,
+                   incremental=False, known_page_cutoff=1, enrich_details=True):
+        """Run full scrape and store in database
+        
+        Every configured target is scraped at once, each source on its own
+        pool of `self.workers` threads, and all pages feed one database
+        stage. A listing seen in more
+        than one region is stored once (by external_id). A target that fails
+        is logged and skipped; the rest of the run carries on.
+        
+        With stream=True pages are written to the database as they arrive
+        instead of after the whole scrape; the resulting stats are the same.
+        
+        With incremental=True pagination stops once `known_page_cutoff`
+        pages in a row contain only listings already in the database
+        (results are newest-first, so everything older is known too). Stale
+        listings are only marked inactive on full sweeps, since an
+        incremental run doesn't see the whole result set.
+        
+        Each run is recorded in scrape_runs, with one scrape_run_targets
+        row per target. A full run marks a listing inactive when its source
+        and region were swept (pagination ran out before `max_pages`, on a
+        short or empty last page) and the run did not see it anywhere;
+        listings of targets that failed, came back empty or still had pages
+        left are left as they are. Listings seen unchanged are
+        not rewritten.
+        
+        With enrich_details=True the detail page of every new or re-priced
+        listing is fetched once the scrape is done, before alerts are
+        checked, so alerts see the full description and mileage.
+        """
         start_time = datetime.now()
         self.logger.info("="*60)
-        self.logger.info(f"Starting scrape job at {start_time}")
+        self.logger.info(f"Starting {'incremental' if incremental else 'full'} "
+                         f"scrape job at {start_time}")
         self.logger.info("="*60)
         
+        stats = {
+            'new': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'changed': 0,
+            'price_increases': 0,
+            'price_decreases': 0,
+            'duplicates': 0,
+            'enriched': 0,
+            'errors': 0
+        }
+        run_targets = []
+        stale = []
+        
+        run_id = self.db.start_scrape_run(incremental)
         try:
-            # Scrape listings
-            listings = self.cl_scraper.scrape_listings(max_pages=max_pages)
+            known_ids = None
+            if incremental:
+                known_ids = self.db.get_all_active_external_ids()
+                self.logger.info(f"Loaded {len(known_ids)} known listing IDs")
             
-            if not listings:
-                self.logger.warning("No listings found!")
-                return
+            reports = []
+            seen_ids = set()
+            needs_details = []
+            pages = self._scrape_targets(
+                max_pages, concurrent, known_ids, known_page_cutoff, reports
+            )
+            if not stream:
+                pages = list(pages)
+            scraped = 0
+            batch = []
+            for listings in pages:
+                batch.extend(self._unseen(listings, stats, seen_ids))
+                if len(batch) >= self.batch_size:
+                    self._ingest_batch(batch, stats, needs_details)
+                    scraped += len(batch)
+                    batch = []
+            if batch:
+                self._ingest_batch(batch, stats, needs_details)
+                scraped += len(batch)
             
-            self.logger.info(f"Scraped {len(listings)} total listings")
+            self._log_target_reports(reports, max_pages)
+            run_targets = self._run_targets(reports, max_pages, incremental)
             
-            # Get currently active listings to detect removals
-            current_external_ids = {listing['external_id'] for listing in listings}
-            
-            # Process each listing
-            stats = {
-                'new': 0,
-                'updated': 0,
-                'price_increases': 0,
-                'price_decreases': 0,
-                'errors': 0
-            }
+            if scraped:
+                self.logger.info(f"Scraped {scraped} total listings")
+                
+                if enrich_details and needs_details:
+                    self._enrich_listings(needs_details, stats)
+                
+                # Listings of fully swept targets that this run didn't see are gone
+                scopes = [(t['source'], t['region']) for t in run_targets if t['swept']]
+                stale = self.db.deactivate_unseen_listings(seen_ids, scopes)
+                if stale:
+                    self.logger.info(f"Marked {len(stale)} listings as inactive")
+            else:
+                self.logger.warning("No listings found!")
             
-            for listing in listings:
-                try:
-                    self._process_listing(listing, stats)
-                except Exception as e:
-                    stats['errors'] += 1
-                    self.logger.error(f"Error processing listing {listing.get('title', 'Unknown')}: {e}")
+            # The sweep is done: later steps failing can't undo it, and
+            # finish_scrape_run never downgrades a finished run
+            self.db.finish_scrape_run(run_id, 'completed', stats, run_targets,
+                                      deactivated=len(stale))
+            self.db.refresh_stats_snapshot()
             
-            # Mark stale listings as inactive (not seen in 7 days)
-            stale = self.db.mark_stale_listings_inactive(days=7)
-            if stale:
-                self.logger.info(f"Marked {len(stale)} listings as inactive")
+            if not scraped:
+                return
             
             # Log final stats
             duration = (datetime.now() - start_time).total_seconds()
@@ -57,11 +197,19 @@ class ScraperManager:
             self.logger.info("Scrape Complete!")
             self.logger.info(f"  Duration: {duration:.1f} seconds")
             self.logger.info(f"  New listings: {stats['new']}")
-            self.logger.info(f"  Updated listings: {stats['updated']}")
+            self.logger.info(f"  Updated listings: {stats['updated']} "
+                             f"({stats['unchanged']} unchanged, not rewritten)")
+            self.logger.info(f"  Content changes: {stats['changed']}")
             self.logger.info(f"  Price increases: {stats['price_increases']}")
             self.logger.info(f"  Price decreases: {stats['price_decreases']}")
+            if stats['enriched'] > 0:
+                self.logger.info(f"  Enriched from detail pages: {stats['enriched']}")
+            if stats['duplicates'] > 0:
+                self.logger.info(f"  Cross-region duplicates skipped: {stats['duplicates']}")
             if stats['errors'] > 0:
                 self.logger.warning(f"  Errors: {stats['errors']}")
+            self._log_throttle_stats()
+            self._log_cache_stats()
             self.logger.info("="*60)
             
             self.check_alerts()
@@ -70,31 +218,350 @@ class ScraperManager:
             
         except Exception as e:
             self.logger.error(f"Scrape job failed: {e}", exc_info=True)
+            try:
+                self.db.finish_scrape_run(run_id, 'failed', stats, run_targets,
+                                          deactivated=len(stale))
+            except Exception:
+                self.logger.error("Could not record the failed scrape run", exc_info=True)
             raise
     
+    def _run_targets(self, reports, max_pages, incremental):
+        """scrape_run_targets rows for a run's target reports
+        
+        A target only counts as swept on a full run that fetched all of its
+        pages without errors, found listings and reached the end of the
+        results (the last page was short or empty). A failing or broken
+        scraper never deactivates its region, and neither does a region with
+        more results than `max_pages` covers.
+        """
+        return [
+            {
+                'source': report['source'],
+                'region': report['region'],
+                'pages': report['pages'],
+                'listings': report['listings'],
+                'swept': (not incremental and report['error'] is None
+                          and report['pages'] == max_pages
+                          and report['page_errors'] == 0
+                          and report['reached_end']
+                          and report['listings'] > 0),
+                'error': str(report['error']) if report['error'] is not None else None,
+            }
+            for report in reports
+        ]
+    
+    def _scrape_targets(self, max_pages, concurrent, known_ids, cutoff_pages, reports):
+        """Scrape every target on the worker pools, yielding pages as they arrive.
+        
+        Workers hand pages to this generator through a bounded queue, so a
+        database stage that falls behind pauses the scrapers instead of
+        letting parsed pages pile up in memory. One report per target is
+        appended to `reports` once all targets are done.
+        """
+        batches = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        
+        def put(item):
+            # Give up once the consumer has gone away so workers can exit
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def scrape(target):
+            report = {
+                'target': target_name(target),
+                'source': target['source'],
+                'region': target.get('region'),
+                'pages': 0,
+                'listings': 0,
+                'page_errors': 0,
+                'cut_off': False,
+                'reached_end': False,
+                'seconds': 0.0,
+                'error': None,
+            }
+            report['started'] = started = time.monotonic()
+            scraper = pages = None
+            try:
+                scraper = self._build_scraper(target)
+                pages = scraper.iter_pages(max_pages=max_pages, concurrent=concurrent)
+                if known_ids is not None:
+                    pages = self._cut_off_known(pages, known_ids, cutoff_pages, report)
+                for listings in pages:
+                    report['pages'] += 1
+                    report['listings'] += len(listings)
+                    report['reached_end'] = (scraper.page_size is not None
+                                             and len(listings) < scraper.page_size)
+                    # Deactivation is scoped by the region a listing was found in
+                    for listing in listings:
+                        listing['region'] = target.get('region')
+                    if not put(listings):
+                        break
+            except Exception as e:
+                report['error'] = e
+                self.logger.error(f"{report['target']} failed: {e}", exc_info=True)
+            finally:
+                if pages is not None:
+                    pages.close()
+                if scraper is not None:
+                    report['page_errors'] = scraper.page_errors
+                report['finished'] = time.monotonic()
+                report['seconds'] = report['finished'] - started
+            return report
+        
+        def coordinate():
+            by_source = {}
+            for target in self.targets:
+                by_source.setdefault(target['source'], []).append(target)
+            
+            # One pool per source, all running at once
+            pools = [
+                ThreadPoolExecutor(max_workers=self.workers,
+                                   thread_name_prefix=f'scrape-{source}')
+                for source in by_source
+            ]
+            try:
+                futures = [
+                    pool.submit(scrape, target)
+                    for pool, targets in zip(pools, by_source.values())
+                    for target in targets
+                ]
+                reports.extend(future.result() for future in futures)
+            finally:
+                for pool in pools:
+                    pool.shutdown(wait=True)
+                put(_END_OF_PAGES)
+        
+        coordinator = threading.Thread(target=coordinate, name='scrape-coordinator', daemon=True)
+        coordinator.start()
+        try:
+            while True:
+                listings = batches.get()
+                if listings is _END_OF_PAGES:
+                    break
+                yield listings
+        finally:
+            stop.set()
+            coordinator.join()
+    
+    def _cut_off_known(self, pages, known_ids, cutoff_pages, report):
+        """Pass pages through until `cutoff_pages` in a row hold only known IDs"""
+        known_streak = 0
+        try:
+            for listings in pages:
+                yield listings
+                
+                if listings and all(l['external_id'] in known_ids for l in listings):
+                    known_streak += 1
+                    if known_streak >= cutoff_pages:
+                        report['cut_off'] = True
+                        return
+                else:
+                    known_streak = 0
+        finally:
+            # Stop the scraper (and cancel any prefetched pages) right away
+            pages.close()
+    
+    def _unseen(self, listings, stats, seen_ids):
+        """Listings whose external_id hasn't come up yet this run"""
+        unseen = []
+        for listing in listings:
+            external_id = listing.get('external_id')
+            if external_id in seen_ids:
+                stats['duplicates'] += 1
+                continue
+            seen_ids.add(external_id)
+            unseen.append(listing)
+        return unseen
+    
+    def _ingest_batch(self, batch, stats, needs_details):
+        """Upsert a batch of listings in one transaction and log what changed.
+        
+        New and re-priced listings are appended to `needs_details` (with
+        their database id). If the bulk upsert fails the batch is retried
+        row by row, so one bad listing only costs itself.
+        """
+        try:
+            result = self.db.bulk_upsert_listings(batch)
+        except Exception as e:
+            self.logger.error(f"Bulk upsert of {len(batch)} listings failed, "
+                              f"retrying row by row: {e}")
+            self._ingest_rows(batch, stats, needs_details)
+            return
+        
+        for key in ('new', 'updated', 'unchanged', 'changed', 'price_increases',
+                    'price_decreases'):
+            stats[key] += result[key]
+        
+        by_external_id = {listing['external_id']: listing for listing in batch}
+        for row in result['rows']:
+            listing = by_external_id[row['external_id']]
+            current_price, last_price = row['price'], row['old_price']
+            if row['inserted']:
+                price_str = f"${current_price:,.2f}" if current_price is not None else "N/A"
+                self.logger.info(f"NEW: {listing['title']} - {price_str}")
+            elif last_price and current_price and last_price != current_price:
+                price_diff = float(current_price) - float(last_price)
+                percent_change = (price_diff / float(last_price)) * 100
+                direction = "PRICE UP" if price_diff > 0 else "PRICE DOWN"
+                sign = "+" if price_diff > 0 else ""
+                self.logger.info(
+                    f"{direction}: {listing['title']} - "
+                    f"${float(last_price):,.2f} → ${float(current_price):,.2f} "
+                    f"({sign}${price_diff:,.2f}, {sign}{percent_change:.1f}%)"
+                )
+            else:
+                if row['content_changed']:
+                    self.logger.info(f"CHANGED: {listing['title']}")
+                continue
+            needs_details.append(dict(listing, id=row['id']))
+    
+    def _ingest_rows(self, batch, stats, needs_details):
+        """Upsert `batch` one listing at a time, in one pipelined transaction
+        
+        Each listing gets its own savepoint, so a bad row is skipped without
+        losing the rest; the batch is committed once at the end.
+        """
+        with self.db.transaction(pipeline=True):
+            for listing in batch:
+                listing_id = self._process_listing_safely(listing, stats)
+                if listing_id is not None:
+                    needs_details.append(dict(listing, id=listing_id))
+    
+    def _log_target_reports(self, reports, max_pages):
+        """Log per-source totals, then how long each target took and which failed"""
+        failed = [r for r in reports if r['error'] is not None]
+        self.logger.info(
+            f"Scraped {len(reports) - len(failed)}/{len(reports)} targets"
+        )
+        
+        by_source = {}
+        for report in reports:
+            by_source.setdefault(report['source'], []).append(report)
+        for source, source_reports in by_source.items():
+            pages = sum(r['pages'] for r in source_reports)
+            page_errors = sum(r['page_errors'] for r in source_reports)
+            attempted = pages + page_errors
+            seconds = (max(r['finished'] for r in source_reports)
+                       - min(r['started'] for r in source_reports))
+            source_failed = sum(1 for r in source_reports if r['error'] is not None)
+            self.logger.info(
+                f"  [{source}] {sum(r['listings'] for r in source_reports)} listings "
+                f"from {pages} pages across {len(source_reports)} targets "
+                f"in {seconds:.1f}s, page error rate "
+                f"{page_errors / attempted if attempted else 0:.0%}, "
+                f"{source_failed} targets failed"
+            )
+        
+        for report in reports:
+            line = (
+                f"  {report['target']}: {report['listings']} listings from "
+                f"{report['pages']}/{max_pages} pages in {report['seconds']:.1f}s"
+            )
+            if report['cut_off']:
+                line += ", stopped at already-known listings"
+            elif report['pages'] and not report['reached_end']:
+                line += ", more results past the last page"
+            if report['error'] is not None:
+                self.logger.warning(f"{line}, FAILED: {report['error']}")
+            elif report['page_errors']:
+                self.logger.warning(f"{line}, {report['page_errors']} page errors")
+            else:
+                self.logger.info(line)
+    
+    def _process_listing_safely(self, listing, stats):
+        """Process one listing, counting (not raising) any error
+        
+        The listing's writes share one transaction, or a savepoint when
+        called inside a bigger one, so a failure leaves no partial rows.
+        """
+        try:
+            with self.db.transaction():
+                return self._process_listing(listing, stats)
+        except Exception as e:
+            stats['errors'] += 1
+            self.logger.error(f"Error processing listing {listing.get('title', 'Unknown')}: {e}")
+    
+    def _enrich_listings(self, listings, stats):
+        """Fetch detail pages for `listings` and store what they add"""
+        self.logger.info(f"Fetching details for {len(listings)} new or re-priced listings")
+        for listing, details in self.enricher.enrich(listings):
+            try:
+                self.db.update_listing_details(listing['id'], details)
+                stats['enriched'] += 1
+            except Exception as e:
+                stats['errors'] += 1
+                self.logger.error(f"Error storing details for {listing['external_id']}: {e}")
+        
+        detail_stats = self.enricher.stats()
+        self.logger.info(
+            f"  Detail pages: {detail_stats['fetched']} fetched, "
+            f"{detail_stats['cached']} from cache, {detail_stats['failed']} failed"
+        )
+    
+    def _log_throttle_stats(self):
+        """Log per-host request counts and time spent rate limited"""
+        for host, host_stats in self.rate_limiter.stats().items():
+            self.logger.info(
+                f"  {host}: {host_stats['requests']} requests, "
+                f"throttled {host_stats['throttled_seconds']:.1f}s, "
+                f"{host_stats['throttle_responses']} 429/503 responses, "
+                f"backoff {host_stats['backoff_seconds']:.1f}s, "
+                f"rate now {host_stats['current_rate']}/s"
+            )
+    
+    def _log_cache_stats(self):
+        """Log response cache hit/miss counts"""
+        cache_stats = self.cache.stats()
+        self.logger.info(
+            f"  Page cache: {cache_stats['hits']} hits "
+            f"({cache_stats['not_modified']} not modified, "
+            f"{cache_stats['unchanged']} unchanged), "
+            f"{cache_stats['misses']} misses, "
+            f"hit rate {cache_stats['hit_rate']:.0%}, "
+            f"{cache_stats['entries']} entries / "
+            f"{cache_stats['size_bytes'] / 1024:.0f} KB, "
+            f"{cache_stats['evictions']} evictions"
+        )
+    
     def _process_listing(self, listing, stats):
-        """Process a single listing and update stats"""
+        """Process a single listing and update stats
+        
+        Returns the listing's id if it is new or its price changed.
+        """
         # Insert or update listing
         result = self.db.insert_listing(listing)
         
         if not result:
+            # Already stored, active and unchanged: nothing written
+            stats['updated'] += 1
+            stats['unchanged'] += 1
             return
         
-        listing_id = result[0]['id']
-        current_price = result[0]['price']
+        row = result[0]
+        listing_id = row['id']
+        current_price = row['price']
         
         # Check if this is a new listing
-        if not self.db.has_price_history(listing_id):
+        if row['inserted']:
             # New listing
             stats['new'] += 1
-            self.db.insert_price_history(listing_id, current_price)
-            self.logger.info(f"NEW: {listing['title']} - ${current_price:,.2f}")
+            if current_price is not None:
+                self.db.insert_price_history(listing_id, current_price)
+            self.logger.info(f"NEW: {listing['title']} - ${current_price or 0:,.2f}")
+            return listing_id
         else:
-            # Existing listing - check for price change
+            # Existing listing - the upsert reports whether the price moved
             stats['updated'] += 1
-            last_price = self.db.get_last_price_from_history(listing_id)
+            if row['content_changed']:
+                stats['changed'] += 1
+            last_price = row['previous_price']
             
-            if last_price and current_price and last_price != current_price:
+            if row['price_changed'] and last_price and current_price:
                 # Price changed!
                 self.db.insert_price_history(listing_id, current_price)
                 
@@ -115,6 +582,12 @@ class ScraperManager:
                         f"${float(last_price):,.2f} → ${float(current_price):,.2f} "
                         f"(${price_diff:,.2f}, {percent_change:.1f}%)"
                     )
+                return listing_id
+            
+            if row['content_changed']:
+                # Edited title, mileage or description; the detail cache is
+                # keyed by price, so there is nothing new to fetch
+                self.logger.info(f"CHANGED: {listing['title']}")
     
     def get_stats(self):
         """Get and display database statistics"""
@@ -133,10 +606,58 @@ class ScraperManager:
         return stats
     
     def close(self):
-        """Close database connection"""
+        """Close HTTP session and database connection"""
+        if self.cassette:
+            recorded = self.cassette.save()
+            self.logger.info(f"Recorded {recorded} responses to {self.cassette.path}")
+        self.session.close()
+        self.cache.close()
+        self.enricher.close()
+        if self.parse_pool:
+            self.parse_pool.close()
+        if self.scratch_cache_dir:
+            shutil.rmtree(self.scratch_cache_dir, ignore_errors=True)
         self.db.close()
         self.logger.info("Database connection closed")
 
+    def _alert_match_query(self, alert):
+        """(query, params) for active listings matching `alert` not yet recorded"""
+        query = """
+            SELECT l.*, COUNT(am.id) as already_notified
+            FROM listings l
+            LEFT JOIN alert_matches am ON l.id = am.listing_id AND am.alert_id = %s
+            WHERE l.is_active = TRUE
+        """
+        params = [alert['id']]
+        
+        # Add criteria filters
+        if alert['make']:
+            query += " AND l.make ILIKE %s"
+            params.append(f"%{alert['make']}%")
+        
+        if alert['model']:
+            query += " AND l.model ILIKE %s"
+            params.append(f"%{alert['model']}%")
+        
+        if alert['min_year']:
+            query += " AND l.year >= %s"
+            params.append(alert['min_year'])
+        
+        if alert['max_year']:
+            query += " AND l.year <= %s"
+            params.append(alert['max_year'])
+        
+        if alert['max_price']:
+            query += " AND l.price <= %s"
+            params.append(alert['max_price'])
+        
+        if alert['max_mileage']:
+            query += " AND l.mileage <= %s"
+            params.append(alert['max_mileage'])
+        
+        query += " GROUP BY l.id HAVING COUNT(am.id) = 0"  # Only new matches
+        return query, tuple(params)
+    
     def check_alerts(self):
         """Check for alert matches after scraping"""
         self.logger.info("🔔 Checking for alert matches...")
@@ -149,152 +670,119 @@ class ScraperManager:
             self.logger.info("No active alerts to check")
             return
     
-        matches_found = 0
-    
-        for alert in alerts:
-            # Build query to find matching listings
-            query = """
-                SELECT l.*, COUNT(am.id) as already_notified
-                FROM listings l
-                LEFT JOIN alert_matches am ON l.id = am.listing_id AND am.alert_id = %s
-                WHERE l.is_active = TRUE
-            """
-            params = [alert['id']]
-        
-            # Add criteria filters
-            if alert['make']:
-                query += " AND l.make ILIKE %s"
-                params.append(f"%{alert['make']}%")
-        
-            if alert['model']:
-                query += " AND l.model ILIKE %s"
-                params.append(f"%{alert['model']}%")
-        
-            if alert['min_year']:
-                query += " AND l.year >= %s"
-                params.append(alert['min_year'])
-        
-            if alert['max_year']:
-                query += " AND l.year <= %s"
-                params.append(alert['max_year'])
-        
-            if alert['max_price']:
-                query += " AND l.price <= %s"
-                params.append(alert['max_price'])
-        
-            if alert['max_mileage']:
-                query += " AND l.mileage <= %s"
-                params.append(alert['max_mileage'])
-        
-            query += " GROUP BY l.id HAVING COUNT(am.id) = 0"  # Only new matches
-        
-            matching_listings = self.db.execute_query(query, tuple(params), fetch=True)
+        # One pipelined round trip for every alert's match query
+        queries = [self._alert_match_query(alert) for alert in alerts]
+        results = self.db.fetch_many(queries)
         
+        # Record matches, one batch for all alerts
+        new_matches = [
+            (alert['id'], listing['id'])
+            for alert, matching_listings in zip(alerts, results)
+            for listing in matching_listings
+        ]
+        if new_matches:
+            match_query = """
+                INSERT INTO alert_matches (alert_id, listing_id)
+                VALUES (%s, %s)
+            """
+            self.db.execute_many(match_query, new_matches)
+        matches_found = len(new_matches)
+    
+        for alert, matching_listings in zip(alerts, results):
             if matching_listings:
                 self.logger.info(f"Found {len(matching_listings)} matches for alert {alert['id']}")
             
-                # Record matches
-                for listing in matching_listings:
-                    match_query = """
-                        INSERT INTO alert_matches (alert_id, listing_id)
-                        VALUES (%s, %s)
-                    """
-                    self.db.execute_query(match_query, (alert['id'], listing['id']))
-                    matches_found += 1
-            
                 # Send email notification
                 self._send_alert_email(alert, matching_listings)
     
         self.logger.info(f"✅ Alert check complete: {matches_found} new matches")
-
-
-
-def _send_alert_email(self, alert, listings):
-    """Send email notification for alert matches"""
-    try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        import os
-        
-        # Email configuration (you'll need to set these in .env)
-        smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        sender_email = os.getenv('SENDER_EMAIL')
-        sender_password = os.getenv('SENDER_PASSWORD')
-        
-        if not sender_email or not sender_password:
-            self.logger.warning("Email credentials not configured - skipping notification")
-            return
-        
-        # Build email content
-        subject = f"🚗 CarWatch Alert: {len(listings)} new cars match your criteria!"
-        
-        body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif;">
-            <h2 style="color: #667eea;">New Cars Found!</h2>
-            <p>We found {len(listings)} cars matching your alert:</p>
-            
-            <div style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                <strong>Your Alert Criteria:</strong><br>
-                {f"Make: {alert['make']}<br>" if alert['make'] else ""}
-                {f"Model: {alert['model']}<br>" if alert['model'] else ""}
-                {f"Year: {alert['min_year']}-{alert['max_year']}<br>" if alert['min_year'] or alert['max_year'] else ""}
-                Max Price: ${float(alert['max_price']):,.2f}<br>
-                {f"Max Mileage: {int(alert['max_mileage']):,} mi<br>" if alert['max_mileage'] else ""}
-            </div>
-            
-            <h3>Matching Cars:</h3>
-        """
-        
-        for listing in listings[:10]:  # Limit to 10 in email
-            price_str = f"${float(listing['price']):,.2f}" if listing['price'] else "N/A"
-            mileage_str = f"{int(listing['mileage']):,} mi" if listing['mileage'] else "N/A"
-            
-            body += f"""
-            <div style="border-left: 4px solid #667eea; padding: 15px; margin: 15px 0; background: white;">
-                <h4 style="margin: 0 0 10px 0;">{listing['title']}</h4>
-                <p style="margin: 5px 0;">
-                    💰 <strong>{price_str}</strong> | 
-                    🛣️ {mileage_str} | 
-                    📍 {listing['location'] or 'Location N/A'}
+    
+    def _send_alert_email(self, alert, listings):
+        """Send email notification for alert matches"""
+        try:
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            import os
+    
+            # Email configuration (you'll need to set these in .env)
+            smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+            smtp_port = int(os.getenv('SMTP_PORT', '587'))
+            sender_email = os.getenv('SENDER_EMAIL')
+            sender_password = os.getenv('SENDER_PASSWORD')
+    
+            if not sender_email or not sender_password:
+                self.logger.warning("Email credentials not configured - skipping notification")
+                return
+    
+            # Build email content
+            subject = f"🚗 CarWatch Alert: {len(listings)} new cars match your criteria!"
+    
+            body = f"""
+            <html>
+            <body style="font-family: Arial, sans-serif;">
+                <h2 style="color: #667eea;">New Cars Found!</h2>
+                <p>We found {len(listings)} cars matching your alert:</p>
+    
+                <div style="background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <strong>Your Alert Criteria:</strong><br>
+                    {f"Make: {alert['make']}<br>" if alert['make'] else ""}
+                    {f"Model: {alert['model']}<br>" if alert['model'] else ""}
+                    {f"Year: {alert['min_year']}-{alert['max_year']}<br>" if alert['min_year'] or alert['max_year'] else ""}
+                    Max Price: ${float(alert['max_price']):,.2f}<br>
+                    {f"Max Mileage: {int(alert['max_mileage']):,} mi<br>" if alert['max_mileage'] else ""}
+                </div>
+    
+                <h3>Matching Cars:</h3>
+            """
+    
+            for listing in listings[:10]:  # Limit to 10 in email
+                price_str = f"${float(listing['price']):,.2f}" if listing['price'] else "N/A"
+                mileage_str = f"{int(listing['mileage']):,} mi" if listing['mileage'] else "N/A"
+    
+                body += f"""
+                <div style="border-left: 4px solid #667eea; padding: 15px; margin: 15px 0; background: white;">
+                    <h4 style="margin: 0 0 10px 0;">{listing['title']}</h4>
+                    <p style="margin: 5px 0;">
+                        💰 <strong>{price_str}</strong> | 
+                        🛣️ {mileage_str} | 
+                        📍 {listing['location'] or 'Location N/A'}
+                    </p>
+                    <a href="{listing['url']}" style="color: #667eea; text-decoration: none;">View Listing →</a>
+                </div>
+                """
+    
+            if len(listings) > 10:
+                body += f"<p><em>...and {len(listings) - 10} more!</em></p>"
+    
+            body += """
+                <hr style="margin: 30px 0;">
+                <p style="color: #666; font-size: 0.9rem;">
+                    You're receiving this because you created a price alert on CarWatch.<br>
+                    To manage your alerts, visit <a href="http://127.0.0.1:5000/alerts">CarWatch Alerts</a>
                 </p>
-                <a href="{listing['url']}" style="color: #667eea; text-decoration: none;">View Listing →</a>
-            </div>
+            </body>
+            </html>
             """
-        
-        if len(listings) > 10:
-            body += f"<p><em>...and {len(listings) - 10} more!</em></p>"
-        
-        body += """
-            <hr style="margin: 30px 0;">
-            <p style="color: #666; font-size: 0.9rem;">
-                You're receiving this because you created a price alert on CarWatch.<br>
-                To manage your alerts, visit <a href="http://127.0.0.1:5000/alerts">CarWatch Alerts</a>
-            </p>
-        </body>
-        </html>
-        """
-        
-        # Create message
-        message = MIMEMultipart('alternative')
-        message['Subject'] = subject
-        message['From'] = sender_email
-        message['To'] = alert['email']
-        
-        message.attach(MIMEText(body, 'html'))
-        
-        # Send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(message)
-        
-        self.logger.info(f"📧 Email sent to {alert['email']}")
-        
-    except Exception as e:
-        self.logger.error(f"Failed to send email: {e}")
+    
+            # Create message
+            message = MIMEMultipart('alternative')
+            message['Subject'] = subject
+            message['From'] = sender_email
+            message['To'] = alert['email']
+    
+            message.attach(MIMEText(body, 'html'))
+    
+            # Send email
+            with smtplib.SMTP(smtp_server, smtp_port) as server:
+                server.starttls()
+                server.login(sender_email, sender_password)
+                server.send_message(message)
+    
+            self.logger.info(f"📧 Email sent to {alert['email']}")
+    
+        except Exception as e:
+            self.logger.error(f"Failed to send email: {e}")
 
 if __name__ == "__main__":
     manager = ScraperManager()
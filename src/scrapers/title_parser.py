@@ -0,0 +1,300 @@
+"""Year / make / model extraction from free-text listing titles.
+
+Makes and their aliases are compiled once into a single trie-factored,
+word-boundary regex, so "ram" no longer matches inside "program" and a
+title is scanned once instead of once per make. Every make's model lexicon
+is compiled the same way. Multi-word and punctuated models such as "Grand Cherokee", "F-150" or
+"CR-V" come out whole, and spelling variants like "f150", "f 150" or "crv"
+resolve to the same model. When the make is missing but the
+model is unique to one make ("2014 Tacoma TRD"), the make is inferred.
+A make alias that is also a model ("Range Rover") gives both.
+"""
+import re
+
+YEAR_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\b')
+
+# Canonical make -> aliases as they appear in titles (lowercase)
+MAKE_ALIASES = {
+    'Acura': ['acura'],
+    'Audi': ['audi'],
+    'BMW': ['bmw', 'beemer'],
+    'Buick': ['buick'],
+    'Cadillac': ['cadillac', 'caddy'],
+    'Chevrolet': ['chevrolet', 'chevy', 'chev'],
+    'Chrysler': ['chrysler'],
+    'Dodge': ['dodge'],
+    'Ford': ['ford'],
+    'GMC': ['gmc'],
+    'Honda': ['honda'],
+    'Hyundai': ['hyundai'],
+    'Infiniti': ['infiniti'],
+    'Jeep': ['jeep'],
+    'Kia': ['kia'],
+    'Land Rover': ['land rover', 'landrover', 'range rover'],
+    'Lexus': ['lexus'],
+    'Lincoln': ['lincoln'],
+    'Mazda': ['mazda'],
+    'Mercedes-Benz': ['mercedes-benz', 'mercedes benz', 'mercedes', 'benz'],
+    'Mitsubishi': ['mitsubishi'],
+    'Nissan': ['nissan'],
+    'Porsche': ['porsche'],
+    'Ram': ['ram'],
+    'Subaru': ['subaru'],
+    'Tesla': ['tesla'],
+    'Toyota': ['toyota'],
+    'Volkswagen': ['volkswagen', 'vw'],
+    'Volvo': ['volvo'],
+}
+
+# Canonical make -> canonical model names. "-" and " " inside a model also
+# match when written with the other separator or none at all.
+MODEL_LEXICON = {
+    'Acura': ['ILX', 'TLX', 'TL', 'TSX', 'RDX', 'MDX', 'RSX', 'Integra', 'NSX'],
+    'Audi': ['A3', 'A4', 'A5', 'A6', 'A8', 'Q3', 'Q5', 'Q7', 'S4', 'TT', 'Allroad'],
+    'BMW': ['128i', '328i', '335i', '528i', '535i', 'M3', 'M5', 'X1', 'X3', 'X5', 'Z4'],
+    'Buick': ['Enclave', 'Encore', 'LaCrosse', 'Regal', 'LeSabre', 'Century'],
+    'Cadillac': ['Escalade', 'CTS', 'ATS', 'SRX', 'XT5', 'DeVille'],
+    'Chevrolet': ['Silverado 1500', 'Silverado 2500', 'Silverado', 'Malibu',
+                  'Impala', 'Tahoe', 'Suburban', 'Equinox', 'Traverse', 'Cruze',
+                  'Colorado', 'Camaro', 'Corvette', 'Trailblazer', 'Avalanche',
+                  'Blazer', 'S-10', 'Sonic', 'Spark', 'Volt', 'Bolt', 'Express'],
+    'Chrysler': ['Town & Country', '200', '300', 'Pacifica', 'PT Cruiser', 'Sebring'],
+    'Dodge': ['Ram 1500', 'Ram 2500', 'Ram 3500', 'Ram', 'Grand Caravan', 'Caravan',
+              'Durango', 'Charger', 'Challenger', 'Dakota', 'Journey', 'Neon', 'Avenger'],
+    'Ford': ['F-150', 'F-250', 'F-350', 'Ranger', 'Explorer', 'Expedition',
+             'Escape', 'Edge', 'Focus', 'Fusion', 'Mustang', 'Taurus', 'Bronco',
+             'Excursion', 'Flex', 'Fiesta', 'Transit', 'E-350', 'Econoline',
+             'Crown Victoria', 'Maverick'],
+    'GMC': ['Sierra 1500', 'Sierra 2500', 'Sierra', 'Yukon XL', 'Yukon', 'Acadia',
+            'Terrain', 'Canyon', 'Envoy', 'Savana'],
+    'Honda': ['Civic', 'Accord', 'CR-V', 'HR-V', 'Pilot', 'Odyssey', 'Fit',
+              'Ridgeline', 'Element', 'Passport', 'Insight', 'Prelude', 'S2000'],
+    'Hyundai': ['Elantra', 'Sonata', 'Santa Fe', 'Tucson', 'Accent', 'Palisade',
+                'Kona', 'Veloster', 'Genesis'],
+    'Infiniti': ['G35', 'G37', 'Q50', 'QX60', 'QX80', 'FX35', 'QX56'],
+    'Jeep': ['Grand Cherokee', 'Cherokee', 'Wrangler Unlimited', 'Wrangler',
+             'Liberty', 'Compass', 'Patriot', 'Renegade', 'Gladiator', 'Commander'],
+    'Kia': ['Optima', 'Sorento', 'Sportage', 'Soul', 'Forte', 'Rio', 'Telluride',
+            'Sedona', 'Stinger'],
+    'Land Rover': ['Range Rover Sport', 'Range Rover', 'Discovery', 'LR4', 'LR3',
+                   'Defender', 'Evoque'],
+    'Lexus': ['RX 350', 'RX', 'ES 350', 'ES', 'IS 250', 'IS', 'GX 470', 'GX',
+              'LX 570', 'LX', 'NX', 'GS'],
+    'Lincoln': ['Navigator', 'MKZ', 'MKX', 'Town Car', 'Aviator', 'Continental'],
+    'Mazda': ['Mazda3', 'Mazda6', 'CX-3', 'CX-30', 'CX-5', 'CX-9', 'MX-5', 'Miata',
+              'Tribute', 'RX-8'],
+    'Mercedes-Benz': ['C300', 'C250', 'E350', 'E320', 'ML350', 'GL450', 'GLC',
+                      'GLE', 'S550', 'Sprinter', 'CLA', 'C-Class', 'E-Class'],
+    'Mitsubishi': ['Outlander', 'Lancer', 'Eclipse', 'Galant', 'Montero', 'Mirage'],
+    'Nissan': ['Altima', 'Sentra', 'Maxima', 'Rogue', 'Murano', 'Pathfinder',
+               'Frontier', 'Titan', 'Xterra', 'Versa', 'Leaf', '350Z', 'Armada', 'Quest'],
+    'Porsche': ['911', 'Cayenne', 'Macan', 'Boxster', 'Cayman', 'Panamera'],
+    'Ram': ['1500', '2500', '3500', 'ProMaster'],
+    'Subaru': ['Outback', 'Forester', 'Impreza', 'Crosstrek', 'Legacy', 'WRX',
+               'Ascent', 'BRZ', 'Baja'],
+    'Tesla': ['Model 3', 'Model S', 'Model X', 'Model Y', 'Cybertruck'],
+    'Toyota': ['Camry', 'Corolla', 'Tacoma', 'Tundra', '4Runner', 'RAV4',
+               'Highlander', 'Sienna', 'Prius', 'Sequoia', 'Avalon', 'Land Cruiser',
+               'FJ Cruiser', 'Yaris', 'Matrix', 'Venza', 'Celica', 'Supra'],
+    'Volkswagen': ['Jetta', 'Passat', 'Golf', 'GTI', 'Tiguan', 'Atlas', 'Beetle',
+                   'Touareg', 'Rabbit', 'Vanagon'],
+    'Volvo': ['XC90', 'XC60', 'XC70', 'S60', 'S80', 'V70', 'V60', '240'],
+}
+
+# Model names that are also everyday words, so seeing one in a title with no
+# make ("new spark plugs", "fits a bike") says nothing about the make
+_COMMON_WORD_MODELS = {
+    'acadia', 'ascent', 'atlas', 'avenger', 'aviator', 'baja', 'beetle', 'bolt',
+    'bronco', 'canyon', 'century', 'challenger', 'charger', 'colorado',
+    'commander', 'compass', 'continental', 'defender', 'discovery', 'eclipse',
+    'edge', 'element', 'envoy', 'escape', 'excursion', 'expedition', 'explorer',
+    'express', 'fit', 'flex', 'focus', 'fusion', 'genesis', 'gladiator',
+    'insight', 'journey', 'leaf', 'legacy', 'liberty', 'matrix', 'maverick',
+    'mirage', 'passport', 'patriot', 'pilot', 'quest', 'rabbit', 'ranger',
+    'regal', 'renegade', 'sierra', 'sonic', 'soul', 'spark', 'terrain', 'titan',
+    'transit', 'volt',
+}
+
+# Models that are also short English words ("car is clean"). They only count
+# right after the make, optionally with a year between ("Lexus IS 250",
+# "lexus 2008 es 350").
+_AFTER_MAKE_MODELS = {'is', 'es'}
+
+_AFTER_MAKE_GAP = re.compile(r'[-\s]*(?:(?:19|20)\d{2}[-\s]*)?')
+
+
+_SEPARATOR = object()
+
+
+def _normalize(text):
+    """Lexicon key: lowercase with '-' and whitespace removed"""
+    return re.sub(r'[-\s]+', '', text.lower())
+
+
+def _spellings(name):
+    """Every way a name can be written with '-', ' ' or nothing between parts"""
+    parts = re.split(r'[-\s]+', name.lower())
+    spellings = [parts[0]]
+    for part in parts[1:]:
+        spellings = [s + sep + part for s in spellings for sep in ('-', ' ', '')]
+    return spellings
+
+
+def _spelling_table(names, value_for):
+    """Map each spelling of each name straight to its value (no re.sub per match)"""
+    table = {}
+    for name in names:
+        for spelling in _spellings(name):
+            table[spelling] = value_for(name)
+    return table
+
+
+def _lookup(table, matched):
+    value = table.get(matched)
+    if value is None:
+        # Tabs or other unusual whitespace between words
+        value = table.get(' '.join(re.split(r'[-\s]+', matched)))
+    return value
+
+
+def _units(name):
+    """Characters of a name, with each '-' / ' ' run collapsed to one separator"""
+    units = []
+    for char in name.lower():
+        if char in ' -':
+            if units and units[-1] is _SEPARATOR:
+                continue
+            units.append(_SEPARATOR)
+        else:
+            units.append(char)
+    return units
+
+
+def _trie_pattern(names):
+    """Compile names into one regex whose alternation is factored as a trie.
+
+    Shared prefixes are tested once ("ch(?:ev(?:rolet|y)?|rysler)"), longer
+    names are tried before their prefixes, and a separator in a name matches
+    any run of '-' and whitespace, or nothing, the same runs _lookup
+    normalises. Matches are whole words of a lowercased title.
+    """
+    trie = {}
+    for name in names:
+        node = trie
+        for unit in _units(name):
+            node = node.setdefault(unit, {})
+        node[''] = True
+
+    def build(node):
+        branches = []
+        for unit, child in node.items():
+            if unit == '':
+                continue
+            head = r'[-\s]*' if unit is _SEPARATOR else re.escape(unit)
+            branches.append(head + build(child))
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return re.compile(r'\b(?:' + build(trie) + r')\b')
+
+
+def _build():
+    alias_to_make = {}
+    for make, aliases in MAKE_ALIASES.items():
+        alias_to_make.update(_spelling_table(aliases, lambda alias: make))
+
+    make_models = {}
+    model_patterns = {}
+    models_seen = {}
+    for make, models in MODEL_LEXICON.items():
+        make_models[make] = _spelling_table(models, lambda model: model)
+        model_patterns[make] = _trie_pattern(models)
+        for model in models:
+            models_seen.setdefault(_normalize(model), []).append((make, model))
+
+    # Models that belong to exactly one make let us infer a missing make
+    unique = [
+        owners[0] for key, owners in models_seen.items()
+        if len(owners) == 1 and not key.isdigit() and key not in _COMMON_WORD_MODELS
+    ]
+    owner = {model: (make, model) for make, model in unique}
+    unique_models = _spelling_table(owner, owner.get)
+    unique_pattern = _trie_pattern(model for make, model in unique)
+
+    make_pattern = _trie_pattern(
+        alias for aliases in MAKE_ALIASES.values() for alias in aliases
+    )
+
+    # Aliases that are also the start of one of their make's models ("range
+    # rover"), where the model search has to begin at the alias itself
+    model_aliases = {}
+    for make, aliases in MAKE_ALIASES.items():
+        overlapping = [alias for alias in aliases if model_patterns[make].match(alias)]
+        if overlapping:
+            model_aliases[make] = _spelling_table(overlapping, lambda alias: True)
+    return (make_pattern, alias_to_make, model_aliases, model_patterns,
+            make_models, unique_pattern, unique_models)
+
+
+(MAKE_PATTERN, _ALIAS_TO_MAKE, _MODEL_ALIASES, _MODEL_PATTERNS, _MAKE_MODELS,
+ _UNIQUE_MODEL_PATTERN, _UNIQUE_MODELS) = _build()
+
+_NEXT_WORD = re.compile(r'\s+(\w+)')
+
+
+def _search_model(make, title_lower, start, make_end):
+    """First model of `make` in the title from `start`, skipping word-like
+    models that don't follow the make"""
+    pattern = _MODEL_PATTERNS[make]
+    model_match = pattern.search(title_lower, start)
+    while model_match and model_match.group(0) in _AFTER_MAKE_MODELS:
+        gap = _AFTER_MAKE_GAP.match(title_lower, make_end)
+        if gap.end() == model_match.start():
+            break
+        model_match = pattern.search(title_lower, model_match.end())
+    return model_match
+
+
+def parse_title(title):
+    """Extract (year, make, model) from a title like "2018 Honda Civic LX"
+
+    Any of the three may be None when it can't be found.
+    """
+    year = None
+    make = None
+    model = None
+
+    if not title:
+        return year, make, model
+
+    year_match = YEAR_PATTERN.search(title)
+    if year_match:
+        year = int(year_match.group(1))
+
+    title_lower = title.lower()
+    make_match = MAKE_PATTERN.search(title_lower)
+    if make_match:
+        make = _lookup(_ALIAS_TO_MAKE, make_match.group(0))
+        end = make_match.end()
+        start = end
+        if make in _MODEL_ALIASES and _lookup(_MODEL_ALIASES[make], make_match.group(0)):
+            start = make_match.start()
+
+        model_match = _search_model(make, title_lower, start, end)
+        if model_match:
+            model = _lookup(_MAKE_MODELS[make], model_match.group(0))
+        else:
+            # Unknown model: fall back to the word right after the make
+            next_word = _NEXT_WORD.match(title_lower, end)
+            if next_word:
+                model = next_word.group(1).title()
+    else:
+        model_match = _UNIQUE_MODEL_PATTERN.search(title_lower)
+        if model_match:
+            make, model = _lookup(_UNIQUE_MODELS, model_match.group(0))
+
+    return year, make, model
@@ -1,5 +1,9 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
 from src.database.db import Database
+from src.database.listing_search import (
+    parse_filters, fetch_page, count_listings, price_history_params, include_archived,
+    LISTING_DETAIL_QUERY, PRICE_HISTORY_QUERY, ARCHIVED_LISTING_QUERY
+)
 from datetime import datetime
 import os
 
@@ -12,12 +16,17 @@ else:
     app.config['DEBUG'] = True
 
 def get_db():
-    """Get database connection"""
-    return Database()
+    """Get this request's database connection, checked out of the pool on first use"""
+    if 'db' not in g:
+        g.db = Database()
+    return g.db
 
-def get_db():
-    """Get database connection"""
-    return Database()
+@app.teardown_appcontext
+def close_db(exception):
+    """Return the request's connection to the pool, even if the view raised"""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
 
 @app.route('/')
 def index():
@@ -34,93 +43,27 @@ def get_listings():
         db = get_db()
         
         # Get filter parameters
-        search = request.args.get('search', '').strip()
-        make = request.args.get('make', '').strip()
-        model = request.args.get('model', '').strip()
-        min_year = request.args.get('min_year', type=int)
-        max_year = request.args.get('max_year', type=int)
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        max_mileage = request.args.get('max_mileage', type=int)
+        filters = parse_filters(request.args)
         sort_by = request.args.get('sort_by', 'updated_at')
         sort_order = request.args.get('sort_order', 'DESC')
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        # Build WHERE clause
-        where_clause = "WHERE is_active = TRUE"
-        params = []
-        
-        # Add filters
-        if search:
-            where_clause += " AND (title ILIKE %s OR make ILIKE %s OR model ILIKE %s)"
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern, search_pattern, search_pattern])
-        
-        if make:
-            where_clause += " AND make ILIKE %s"
-            params.append(f"%{make}%")
-        
-        if model:
-            where_clause += " AND model ILIKE %s"
-            params.append(f"%{model}%")
-        
-        if min_year:
-            where_clause += " AND year >= %s"
-            params.append(min_year)
-        
-        if max_year:
-            where_clause += " AND year <= %s"
-            params.append(max_year)
-        
-        if min_price:
-            where_clause += " AND price >= %s"
-            params.append(min_price)
-        
-        if max_price:
-            where_clause += " AND price <= %s"
-            params.append(max_price)
-        
-        if max_mileage:
-            where_clause += " AND mileage <= %s"
-            params.append(max_mileage)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        cursor = request.args.get('cursor')
+        count_mode = request.args.get('count', 'estimate')
         
-        # Get total count first
-        count_query = f"SELECT COUNT(*) as count FROM listings {where_clause}"
-        total_count = db.execute_query(count_query, tuple(params), fetch=True)[0]['count']
-        
-        print(f"📈 Total count: {total_count}")
-        
-        # Build main query with sorting and pagination
-        valid_sort_fields = ['price', 'year', 'mileage', 'updated_at', 'first_seen']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'updated_at'
-        
-        if sort_order.upper() not in ['ASC', 'DESC']:
-            sort_order = 'DESC'
-        
-        query = f"""
-            SELECT 
-                id, external_id, source, url, title, price, year, 
-                make, model, mileage, location, first_seen, last_seen, is_active
-            FROM listings
-            {where_clause}
-            ORDER BY {sort_by} {sort_order}
-            LIMIT %s OFFSET %s
-        """
-        
-        # Add pagination params
-        offset = (page - 1) * per_page
-        query_params = params + [per_page, offset]
-        
-        print(f"📊 Executing query with {len(query_params)} parameters")
-        
-        # Execute query
-        listings = db.execute_query(query, tuple(query_params), fetch=True)
+        try:
+            listings, next_cursor = fetch_page(
+                db, filters, sort_by, sort_order, per_page, page=page, cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         print(f"✅ Found {len(listings)} listings")
         
-        db.close()
+        # Estimated unless small; cached exact counts are reused
+        total_count, total_is_estimate = count_listings(db, filters, count_mode)
+        
+        print(f"📈 Total count: {total_count} (estimate: {total_is_estimate})")
         
         # Convert datetime objects to strings for JSON serialization
         for listing in listings:
@@ -128,13 +71,19 @@ def get_listings():
                 listing['first_seen'] = listing['first_seen'].isoformat()
             if listing.get('last_seen'):
                 listing['last_seen'] = listing['last_seen'].isoformat()
+            if listing.get('updated_at'):
+                listing['updated_at'] = listing['updated_at'].isoformat()
+            if listing.get('price_changed_at'):
+                listing['price_changed_at'] = listing['price_changed_at'].isoformat()
         
         return jsonify({
             'listings': listings,
             'total': total_count,
-            'page': page,
+            'total_is_estimate': total_is_estimate,
+            'page': None if cursor else page,
             'per_page': per_page,
-            'total_pages': (total_count + per_page - 1) // per_page
+            'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -145,29 +94,39 @@ def get_listings():
 
 @app.route('/api/listing/<int:listing_id>')
 def get_listing_detail(listing_id):
-    """Get detailed information about a specific listing"""
+    """Get detailed information about a specific listing
+    
+    With include_archived=1 a listing that has been moved to the archive
+    is served from there, price history included.
+    """
     db = get_db()
     
     # Get listing info
-    listing_query = "SELECT * FROM listings WHERE id = %s"
-    listing = db.execute_query(listing_query, (listing_id,), fetch=True)
+    listing = db.execute_query(LISTING_DETAIL_QUERY, (listing_id,), fetch=True)
     
-    if not listing:
-        db.close()
+    if listing:
+        listing = listing[0]
+        listing['last_seen'] = listing.pop('last_swept_seen')
+        
+        # Get price history
+        price_history = db.execute_query(
+            PRICE_HISTORY_QUERY, price_history_params(listing_id), fetch=True
+        )
+    elif include_archived(request.args):
+        listing = db.execute_query(ARCHIVED_LISTING_QUERY, (listing_id,), fetch=True)
+        if not listing:
+            return jsonify({'error': 'Listing not found'}), 404
+        
+        # Stored as JSON, so recorded_at is already a string
+        listing = listing[0]
+        price_history = listing.pop('price_history')
+        listing.pop('changes')
+        listing.pop('alert_matches')
+        listing['archived'] = True
+    else:
         return jsonify({'error': 'Listing not found'}), 404
     
-    listing = listing[0]
-    
-    # Get price history
-    price_history_query = """
-        SELECT price, recorded_at 
-        FROM price_history 
-        WHERE listing_id = %s 
-        ORDER BY recorded_at ASC
-    """
-    price_history = db.execute_query(price_history_query, (listing_id,), fetch=True)
-    
-    db.close()
+    listing.pop('search_vector', None)
     
     # Convert datetime objects
     if listing.get('first_seen'):
@@ -178,9 +137,15 @@ def get_listing_detail(listing_id):
         listing['created_at'] = listing['created_at'].isoformat()
     if listing.get('updated_at'):
         listing['updated_at'] = listing['updated_at'].isoformat()
+    if listing.get('price_changed_at'):
+        listing['price_changed_at'] = listing['price_changed_at'].isoformat()
+    if listing.get('deactivated_at'):
+        listing['deactivated_at'] = listing['deactivated_at'].isoformat()
+    if listing.get('archived_at'):
+        listing['archived_at'] = listing['archived_at'].isoformat()
     
     for record in price_history:
-        if record.get('recorded_at'):
+        if isinstance(record.get('recorded_at'), datetime):
             record['recorded_at'] = record['recorded_at'].isoformat()
     
     return jsonify({
@@ -190,38 +155,25 @@ def get_listing_detail(listing_id):
 
 @app.route('/api/stats')
 def get_stats():
-    """Get database statistics"""
+    """Get database statistics from the snapshot taken after the last scrape"""
     db = get_db()
     stats = db.get_stats()
+    stats['snapshot_at'] = stats['snapshot_at'].isoformat()
+    return jsonify(stats)
+
+@app.route('/api/price-drops')
+def get_price_drops():
+    """Active listings whose price dropped recently, newest drop first"""
+    days = request.args.get('days', 7, type=int)
+    limit = min(request.args.get('limit', 20, type=int), 100)
     
-    # Get makes distribution
-    makes_query = """
-        SELECT make, COUNT(*) as count 
-        FROM listings 
-        WHERE is_active = TRUE AND make IS NOT NULL
-        GROUP BY make 
-        ORDER BY count DESC 
-        LIMIT 10
-    """
-    top_makes = db.execute_query(makes_query, fetch=True)
-    stats['top_makes'] = top_makes
-    
-    # Get price statistics
-    price_stats_query = """
-        SELECT 
-            MIN(price) as min_price,
-            MAX(price) as max_price,
-            AVG(price) as avg_price,
-            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price) as median_price
-        FROM listings
-        WHERE is_active = TRUE AND price IS NOT NULL
-    """
-    price_stats = db.execute_query(price_stats_query, fetch=True)[0]
-    stats.update(price_stats)
+    db = get_db()
+    drops = db.get_recent_price_drops(days=days, limit=limit)
     
-    db.close()
+    for drop in drops:
+        drop['price_changed_at'] = drop['price_changed_at'].isoformat()
     
-    return jsonify(stats)
+    return jsonify({'price_drops': drops, 'days': days})
 
 @app.route('/listing/<int:listing_id>')
 def listing_detail(listing_id):
@@ -275,10 +227,8 @@ def manage_alerts():
         
         try:
             result = db.execute_query(query, alert_data, fetch=True)
-            db.close()
             return jsonify({'id': result[0]['id'], 'message': 'Alert created'}), 201
         except Exception as e:
-            db.close()
             return jsonify({'error': str(e)}), 500
     
     else:
@@ -299,7 +249,6 @@ def manage_alerts():
             if alert.get('created_at'):
                 alert['created_at'] = alert['created_at'].isoformat()
         
-        db.close()
         return jsonify({'alerts': alerts})
 
 @app.route('/api/alerts/<int:alert_id>', methods=['PATCH', 'DELETE'])
@@ -314,14 +263,12 @@ def update_alert(alert_id):
         
         query = "UPDATE alerts SET is_active = %s WHERE id = %s"
         db.execute_query(query, (is_active, alert_id))
-        db.close()
         return jsonify({'message': 'Alert updated'})
     
     elif request.method == 'DELETE':
         # Delete alert
         query = "DELETE FROM alerts WHERE id = %s"
         db.execute_query(query, (alert_id,))
-        db.close()
         return jsonify({'message': 'Alert deleted'})
 
 if __name__ == '__main__':
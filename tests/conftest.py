@@ -0,0 +1,62 @@
+"""Shared fixtures.
+
+Tests that need Postgres take the `db` fixture: a Database on its own
+connection with schema.sql loaded into a scratch schema, dropped again
+afterwards. They connect the way the app does (DATABASE_URL, or the DB_*
+settings from .env) and are skipped when that database can't be reached.
+"""
+import os
+
+import pytest
+
+SCHEMA = 'carwatch_test'
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'src', 'database', 'schema.sql')
+
+
+def schema_sql(conn):
+    with open(SCHEMA_SQL) as f:
+        sql = f.read()
+    available = conn.execute(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    ).fetchone()
+    if not available:
+        # The trigram indexes only serve substring search, which these
+        # tests don't plan-check
+        sql = '\n'.join(line for line in sql.splitlines()
+                        if 'pg_trgm' not in line and 'gin_trgm_ops' not in line)
+    return sql
+
+
+@pytest.fixture(scope='session')
+def database_unreachable():
+    """Why the configured database can't be used, or None if it can"""
+    import psycopg
+    from src.database.db import get_conninfo
+
+    try:
+        psycopg.connect(get_conninfo(), connect_timeout=3).close()
+    except psycopg.Error as e:
+        return str(e).strip().splitlines()[0]
+    return None
+
+
+@pytest.fixture
+def db(database_unreachable):
+    from src.database.db import Database
+
+    if database_unreachable:
+        pytest.skip(f'No database to test against: {database_unreachable}')
+    database = Database(pooled=False)
+    database.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    database.conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    database.conn.execute(f"SET search_path TO {SCHEMA}, public")
+    database.conn.execute(schema_sql(database.conn))
+    database.conn.commit()
+    try:
+        yield database
+    finally:
+        database.conn.rollback()
+        database.conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        database.conn.commit()
+        database.close()
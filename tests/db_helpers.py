@@ -0,0 +1,16 @@
+"""Listing and query helpers for the Postgres tests."""
+
+
+def make_listing(external_id, **fields):
+    listing = {
+        'external_id': external_id, 'source': 'craigslist', 'region': 'provo',
+        'url': f'https://provo.craigslist.org/cto/d/{external_id}.html',
+        'title': '2015 Honda Civic LX', 'price': 12000, 'year': 2015, 'make': 'Honda',
+        'model': 'Civic', 'mileage': 90000, 'location': 'Provo', 'description': None,
+    }
+    listing.update(fields)
+    return listing
+
+
+def scalar(db, query, params=None):
+    return list(db.execute_query(query, params, fetch=True)[0].values())[0]
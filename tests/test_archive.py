@@ -0,0 +1,53 @@
+"""Archiving long-inactive listings and restoring them, on a real Postgres."""
+from werkzeug.datastructures import MultiDict
+
+from src.database.listing_search import fetch_page, parse_filters
+from tests.db_helpers import make_listing, scalar
+
+
+def archive_unseen(db, days_inactive=100):
+    """Deactivate the provo listings, backdate them and archive any past 90 days"""
+    db.deactivate_unseen_listings(set(), [('craigslist', 'provo')])
+    db.execute_query("UPDATE listings SET deactivated_at = NOW() - %s * interval '1 day' "
+                     "WHERE NOT is_active", (days_inactive,))
+    return db.archive_inactive_listings(90)
+
+
+def test_archived_listing_is_restored_when_it_reappears(db):
+    db.ensure_price_history_partitions()
+    db.bulk_upsert_listings([make_listing('cl_1', price=12000)])
+    db.bulk_upsert_listings([make_listing('cl_1', price=11000)])
+    listing_id = scalar(db, "SELECT id FROM listings")
+    assert archive_unseen(db) == 1
+    assert scalar(db, "SELECT COUNT(*) FROM listings") == 0
+    archived = db.execute_query("SELECT * FROM listings_archive", fetch=True)[0]
+    assert archived['id'] == listing_id
+    assert [point['price'] for point in archived['price_history']] == [11000]
+    assert [change['changes'] for change in archived['changes']] == [
+        {'price': [12000, 11000]},
+    ]
+
+    result = db.bulk_upsert_listings([make_listing('cl_1', price=11000)])
+    assert (result['new'], result['updated']) == (0, 1)
+    assert scalar(db, "SELECT id FROM listings WHERE is_active") == listing_id
+    assert scalar(db, "SELECT COUNT(*) FROM listings_archive") == 0
+    assert scalar(db, "SELECT COUNT(*) FROM price_history_daily") == 1
+    assert scalar(db, "SELECT COUNT(*) FROM listing_changes") == 1
+
+
+def test_recently_deactivated_listings_stay_hot(db):
+    db.bulk_upsert_listings([make_listing('cl_1')])
+    assert archive_unseen(db, days_inactive=30) == 0
+    assert scalar(db, "SELECT COUNT(*) FROM listings") == 1
+
+
+def test_archived_listings_are_searched_only_on_request(db):
+    db.bulk_upsert_listings([make_listing('cl_1'), make_listing('cl_2', region='ogden')])
+    assert archive_unseen(db) == 1
+
+    rows, _ = fetch_page(db, parse_filters(MultiDict({'include_inactive': '1'})))
+    assert [(r['external_id'], r.get('archived')) for r in rows] == [('cl_2', None)]
+    rows, _ = fetch_page(db, parse_filters(MultiDict({'include_archived': '1'})), 'price')
+    assert sorted((r['external_id'], r['archived']) for r in rows) == [
+        ('cl_1', True), ('cl_2', False),
+    ]
@@ -0,0 +1,43 @@
+"""Bulk upsert of scraped listings, on a real Postgres."""
+from decimal import Decimal
+
+import pytest
+
+from tests.db_helpers import make_listing, scalar
+
+
+def test_bulk_upsert_counts_and_skips_unchanged(db):
+    listings = [make_listing(f'cl_{i}', price=10000 + i) for i in range(3)]
+    result = db.bulk_upsert_listings(listings)
+    assert (result['new'], result['updated'], len(result['rows'])) == (3, 0, 3)
+
+    result = db.bulk_upsert_listings(listings)
+    assert (result['new'], result['updated'], result['unchanged']) == (0, 3, 3)
+    assert result['rows'] == []
+
+    listings[0]['price'] += 500
+    listings[1]['price'] -= 500
+    result = db.bulk_upsert_listings(listings)
+    assert (result['price_increases'], result['price_decreases']) == (1, 1)
+    assert result['unchanged'] == 1
+    assert scalar(db, "SELECT COUNT(*) FROM price_history") == 5
+    repriced = db.execute_query(
+        "SELECT price, previous_price FROM listings WHERE external_id = 'cl_0'", fetch=True
+    )[0]
+    assert (repriced['price'], repriced['previous_price']) == (Decimal('10500'), Decimal('10000'))
+
+
+def test_bulk_upsert_last_copy_in_batch_wins(db):
+    result = db.bulk_upsert_listings([make_listing('cl_1', price=100),
+                                      make_listing('cl_1', price=200)])
+    assert (result['new'], result['updated']) == (1, 0)
+    assert scalar(db, "SELECT price FROM listings") == Decimal('200')
+
+
+def test_bulk_upsert_joins_the_callers_transaction(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.bulk_upsert_listings([make_listing('a')])
+            db.bulk_upsert_listings([make_listing('b')])
+            raise RuntimeError
+    assert scalar(db, "SELECT COUNT(*) FROM listings") == 0
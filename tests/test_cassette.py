@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+
+import pytest
+import requests
+
+from benchmarks.bench_run_scrape import MemoryDatabase
+from benchmarks.fixtures import synthetic_cassette
+from benchmarks.stand_in_server import StandInServer
+from src.scrapers.cassette import Cassette, replay_through, url_key
+from src.scrapers.scraper_manager import ScraperManager
+
+PAGE = 'https://provo.craigslist.org/search/cta?s=0'
+
+
+def test_url_key_ignores_query_order():
+    assert url_key(PAGE + '&min_price=500') == url_key(
+        'https://provo.craigslist.org/search/cta?min_price=500&s=0'
+    )
+    assert url_key('https://cars.ksl.com') == '/cars.ksl.com/'
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'cassette.json.gz')
+    cassette = Cassette(path)
+    cassette.add(PAGE, '<html>page</html>')
+    cassette.add('https://provo.craigslist.org/cto/d/1.html', 'gone', status=404)
+
+    assert cassette.save() == 2
+    loaded = Cassette.load(path)
+    assert loaded.interactions == cassette.interactions
+
+
+def test_unknown_version_is_rejected(tmp_path):
+    path = str(tmp_path / 'cassette.json.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'version': 99, 'interactions': []}, f)
+    with pytest.raises(ValueError, match='version'):
+        Cassette.load(path)
+
+
+def test_render_serves_only_recorded_successes():
+    cassette = Cassette()
+    cassette.add(PAGE, 'results')
+    cassette.add('https://provo.craigslist.org/cto/d/1.html', 'gone', status=404)
+
+    assert cassette.render('/provo.craigslist.org/search/cta', {'s': ['0']}) == 'results'
+    assert cassette.render('/provo.craigslist.org/search/cta', {'s': ['120']}) is None
+    assert cassette.render('/provo.craigslist.org/cto/d/1.html', {}) is None
+
+
+def test_record_then_replay(tmp_path):
+    source = synthetic_cassette(('provo',), pages=1, details=False)
+    path = str(tmp_path / 'recorded.json.gz')
+
+    with StandInServer(source.render) as server:
+        session = replay_through(requests.Session(), server.base_url)
+        recorder = Cassette(path)
+        recorder.attach(session)
+
+        response = session.get(PAGE)
+        assert response.url == PAGE
+        # A 304 has no body to replay and is not recorded over the page
+        session.get(PAGE, headers={'If-None-Match': response.headers['ETag']})
+        recorder.save()
+
+    recorded = Cassette.load(path)
+    assert list(recorded.interactions.values()) == [{
+        'url': PAGE, 'status': 200, 'content_type': 'text/html; charset=utf-8',
+        'body': source.render('/provo.craigslist.org/search/cta', {'s': ['0']}),
+    }]
+
+    with StandInServer(recorded.render) as server:
+        session = replay_through(requests.Session(), server.base_url)
+        assert session.get(PAGE).text == response.text
+        assert session.get(PAGE.replace('s=0', 's=120')).status_code == 404
+
+
+def test_manager_records_into_an_empty_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SCRAPE_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('SCRAPE_RECORD_CASSETTE', str(tmp_path / 'recorded.json.gz'))
+    manager = ScraperManager(targets=[{'source': 'craigslist', 'region': 'provo'}],
+                             db=MemoryDatabase())
+    scratch = os.path.dirname(manager.cache.path)
+
+    assert scratch != str(tmp_path / 'cache')
+    manager.close()
+    assert not os.path.exists(scratch)
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+import pytest
+
+from src.database.db import (
+    CONTENT_FIELDS, LISTING_COLUMNS, UPSERT_ON_CONFLICT, content_hash, listing_values,
+    upsert_query
+)
+from tests.db_helpers import make_listing, scalar
+
+LISTING = {
+    'external_id': 'cl_1', 'source': 'craigslist', 'region': 'provo',
+    'url': 'https://provo.craigslist.org/cto/d/1.html', 'title': '2015 Honda Civic LX',
+    'price': 12000, 'year': 2015, 'make': 'Honda', 'model': 'Civic', 'mileage': 90000,
+    'location': 'Provo', 'description': 'Runs great',
+}
+
+
+def test_content_hash_ignores_whitespace():
+    spaced = dict(LISTING, title='  2015  Honda\tCivic LX ', description='Runs\n great')
+    assert content_hash(spaced) == content_hash(LISTING)
+
+
+def test_content_hash_compares_prices_to_the_cent():
+    for price in (12000, 12000.0, Decimal('12000.00')):
+        assert content_hash(dict(LISTING, price=price)) == content_hash(LISTING)
+    assert content_hash(dict(LISTING, price=12000.01)) != content_hash(LISTING)
+
+
+def test_content_hash_treats_blank_text_as_missing():
+    assert content_hash(dict(LISTING, description='   ')) == \
+        content_hash(dict(LISTING, description=None))
+
+
+@pytest.mark.parametrize('field', CONTENT_FIELDS)
+def test_every_content_field_changes_the_hash(field):
+    changed = dict(LISTING, **{field: 1 if field in ('year', 'mileage') else 'other'})
+    assert content_hash(changed) != content_hash(LISTING)
+
+
+@pytest.mark.parametrize('field', ['external_id', 'source', 'region'])
+def test_identity_fields_are_not_content(field):
+    assert content_hash(dict(LISTING, **{field: 'other'})) == content_hash(LISTING)
+
+
+def test_listing_values_cover_the_copied_columns():
+    values = listing_values(LISTING)
+    assert list(values) == LISTING_COLUMNS
+    assert values['content_hash'] == content_hash(LISTING)
+
+
+def test_upsert_query_shape():
+    query = upsert_query("SELECT * FROM staging")
+    assert query.lstrip().startswith("WITH incoming AS (SELECT * FROM staging)")
+    for cte in ('previous AS', 'upserted AS', 'changes AS', 'written AS'):
+        assert cte in query
+    assert 'ON CONFLICT (external_id) DO UPDATE' in query
+    assert 'INSERT INTO listing_changes' in query
+
+
+def test_change_log_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv('LISTING_CHANGE_LOG', '0')
+    query = upsert_query("SELECT * FROM staging")
+    assert 'listing_changes' not in query
+    assert 'written AS' in query
+
+
+def test_unchanged_active_listings_are_not_rewritten():
+    where = UPSERT_ON_CONFLICT.split('WHERE', 1)[1]
+    assert 'listings.content_hash IS DISTINCT FROM EXCLUDED.content_hash' in where
+    assert 'OR NOT listings.is_active' in where
+
+
+def test_content_change_is_logged_and_whitespace_is_not(db):
+    assert db.insert_listing(make_listing('cl_1'))[0]['inserted']
+    assert db.insert_listing(make_listing('cl_1', title='2015  Honda Civic  LX')) == []
+
+    [row] = db.insert_listing(make_listing('cl_1', description='New tires'))
+    assert row['content_changed'] and not row['price_changed']
+    changes = scalar(db, "SELECT changes FROM listing_changes")
+    assert changes == {'description': [None, 'New tires']}
+
+
+def test_unchanged_listing_row_is_left_alone(db):
+    db.bulk_upsert_listings([make_listing('cl_1')])
+    before = scalar(db, "SELECT xmin::text FROM listings")
+    db.bulk_upsert_listings([make_listing('cl_1', description='  ')])
+    assert scalar(db, "SELECT xmin::text FROM listings") == before
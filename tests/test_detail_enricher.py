@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fixtures import craigslist_detail
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.detail_enricher import DetailEnricher
+from tests.db_helpers import make_listing, scalar
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+
+class FakeLimiter:
+    """Serves detail pages by URL and tracks how many are in flight"""
+
+    def __init__(self, pages, delay=0.0):
+        self.pages = pages
+        self.delay = delay
+        self.urls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, session=None, **kwargs):
+        with self._lock:
+            self.urls.append(url)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return self.pages.get(url, FakeResponse('', status_code=404))
+
+
+def listing(external_id, price=12000, source='craigslist'):
+    return {'external_id': external_id, 'source': source, 'price': price,
+            'url': f'https://provo.craigslist.org/cto/d/{external_id}.html'}
+
+
+def echo_parser(html):
+    return {'description': html, 'mileage': None, 'vin': None, 'attributes': {}}
+
+
+@pytest.fixture
+def make_enricher(tmp_path):
+    enrichers = []
+
+    def make_enricher(limiter, parsers=None, max_workers=4):
+        enricher = DetailEnricher(parsers or {'craigslist': echo_parser}, limiter,
+                                  session=None, directory=str(tmp_path),
+                                  max_workers=max_workers)
+        enrichers.append(enricher)
+        return enricher
+
+    yield make_enricher
+    for enricher in enrichers:
+        enricher.close()
+
+
+def pages_for(*listings):
+    return {l['url']: FakeResponse(f"details of {l['external_id']}") for l in listings}
+
+
+def test_detail_page_is_parsed_into_details(make_enricher):
+    item = listing('cl_7')
+    limiter = FakeLimiter({item['url']: FakeResponse(craigslist_detail(7))})
+    enricher = make_enricher(limiter, {'craigslist': CraigslistScraper().parse_detail})
+
+    [(enriched, details)] = list(enricher.enrich([item]))
+
+    assert enriched is item
+    assert details['mileage'] > 0
+    assert len(details['vin']) == 17
+    assert 'QR Code Link' not in details['description']
+
+
+def test_details_are_cached_until_the_price_moves(make_enricher):
+    item = listing('cl_1')
+    limiter = FakeLimiter(pages_for(item))
+    enricher = make_enricher(limiter)
+
+    first = list(enricher.enrich([item]))
+    again = list(enricher.enrich([dict(item)]))
+    repriced = list(enricher.enrich([dict(item, price=11000)]))
+
+    assert first[0][1] == again[0][1] == repriced[0][1]
+    assert len(limiter.urls) == 2
+    assert enricher.stats() == {'cached': 1, 'fetched': 2, 'failed': 0}
+
+
+def test_failed_pages_are_counted_and_not_cached(make_enricher):
+    good, missing = listing('cl_1'), listing('cl_2')
+    limiter = FakeLimiter(pages_for(good))
+    enricher = make_enricher(limiter)
+
+    assert [l['external_id'] for l, _ in enricher.enrich([good, missing])] == ['cl_1']
+    list(enricher.enrich([missing]))
+
+    assert limiter.urls.count(missing['url']) == 2
+    assert enricher.stats()['failed'] == 2
+
+
+def test_sources_without_a_parser_are_skipped(make_enricher):
+    limiter = FakeLimiter({})
+    enricher = make_enricher(limiter)
+
+    assert list(enricher.enrich([listing('ksl_1', source='ksl')])) == []
+    assert limiter.urls == []
+
+
+def test_fetches_stay_within_max_workers(make_enricher):
+    items = [listing(f'cl_{i}') for i in range(8)]
+    limiter = FakeLimiter(pages_for(*items), delay=0.05)
+    enricher = make_enricher(limiter, max_workers=2)
+
+    assert len(list(enricher.enrich(items))) == 8
+    assert limiter.peak == 2
+
+
+def test_detail_page_description_survives_results_page(db):
+    [row] = db.insert_listing(make_listing('cl_1', description='snippet'))
+    db.update_listing_details(row['id'], {'description': 'Full description'})
+    db.insert_listing(make_listing('cl_1', description='other snippet', price=11000))
+    assert scalar(db, "SELECT description FROM listings") == 'Full description'
@@ -0,0 +1,66 @@
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.fixtures import CL_PER_PAGE, craigslist_page, ksl_page
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.html_parsers import DEFAULT_PARSER, PARSER_BACKENDS, get_parser_backend
+from src.scrapers.ksl_scraper import KSLScraper
+
+SNIPPET = """
+<html><body>
+  <div class="card" data-id="7">
+    <a class="title" href="/cto/d/7.html"> 2015 Honda <b>Civic</b> </a>
+    <script>var ignored = 1;</script>
+    <span class="price">$12,000</span>
+  </div>
+  <div class="card" data-id="8"><a class="title">Tacoma</a></div>
+</body></html>
+"""
+
+
+def backend(name):
+    try:
+        return get_parser_backend(name)
+    except ImportError as e:
+        pytest.skip(str(e))
+
+
+def parse_pages(scraper, pages):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [scraper._parse_page(html) for html in pages]
+
+
+@pytest.mark.parametrize('name', PARSER_BACKENDS)
+def test_node_operations(name):
+    root = backend(name).parse(SNIPPET)
+
+    cards = root.select('div.card')
+    assert [card.get('data-id') for card in cards] == ['7', '8']
+    assert cards[0].select_one('a.title').get('href') == '/cto/d/7.html'
+    assert cards[1].select_one('a.title').get('href', 'none') == 'none'
+    assert cards[1].select_one('span.price') is None
+
+    assert cards[0].select_one('a.title').text() == '2015 HondaCivic'
+    assert cards[0].text() == '2015 HondaCivic$12,000'
+    assert [s.strip() for s in cards[0].select_one('a.title').strings()] == [
+        '2015 Honda', 'Civic', ''
+    ]
+
+
+@pytest.mark.parametrize('name', PARSER_BACKENDS)
+@pytest.mark.parametrize('scraper_cls, pages', [
+    (CraigslistScraper, [craigslist_page(p * CL_PER_PAGE) for p in range(2)]),
+    (KSLScraper, [ksl_page(p + 1) for p in range(2)]),
+])
+def test_backends_parse_the_same_listings(name, scraper_cls, pages):
+    backend(name)
+    expected = parse_pages(scraper_cls(parser=DEFAULT_PARSER), pages)
+    assert all(expected)
+    assert parse_pages(scraper_cls(parser=name), pages) == expected
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match='html.parser'):
+        get_parser_backend('regex')
@@ -0,0 +1,129 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from src.database import listing_search
+from src.database.listing_search import (
+    count_listings, decode_cursor, encode_cursor, fetch_page, keyset_segments, page_query,
+    parse_filters
+)
+from tests.db_helpers import make_listing
+
+
+@pytest.mark.parametrize('sort_by, value, expected', [
+    ('updated_at', datetime(2026, 1, 2, 3, 4, 5), '2026-01-02T03:04:05'),
+    ('price', Decimal('12500.00'), '12500.00'),
+    ('mileage', 90000, 90000),
+    ('price', None, None),
+])
+def test_cursor_round_trip(sort_by, value, expected):
+    cursor = encode_cursor(sort_by, 'DESC', value, 42)
+    assert decode_cursor(cursor, sort_by, 'DESC') == (expected, 42)
+
+
+def test_cursor_for_another_sort_order_is_rejected():
+    cursor = encode_cursor('price', 'ASC', '100.00', 1)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'price', 'DESC')
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'year', 'ASC')
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', '', 'WzEsMl0'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'price', 'ASC')
+
+
+def test_keyset_desc_after_value_stays_in_value_block():
+    # NULLs sort first in DESC order, so once past them only values remain
+    assert keyset_segments({}, 'price', 'DESC', '100', 7) == [
+        ('(price, id) < (%s::numeric, %s)', ['100', 7]),
+    ]
+
+
+def test_keyset_desc_after_null_finishes_null_block_then_values():
+    assert keyset_segments({}, 'price', 'DESC', None, 7) == [
+        ('price IS NULL AND id < %s', [7]),
+        ('price IS NOT NULL', []),
+    ]
+
+
+def test_keyset_asc_after_value_tops_up_from_null_block():
+    assert keyset_segments({}, 'year', 'ASC', 2010, 7) == [
+        ('(year, id) > (%s::integer, %s)', [2010, 7]),
+        ('year IS NULL', []),
+    ]
+
+
+def test_keyset_asc_after_null_stays_in_null_block():
+    assert keyset_segments({}, 'year', 'ASC', None, 7) == [
+        ('year IS NULL AND id > %s', [7]),
+    ]
+
+
+def test_keyset_relevance_compares_rank():
+    filters = {'search': 'wrx', 'search_mode': 'fulltext'}
+    [(condition, params)] = keyset_segments(filters, 'relevance', 'DESC', 0.5, 7)
+    assert condition.startswith('(ts_rank(search_vector')
+    assert params == ['wrx', 0.5, 7]
+
+
+def test_parse_filters_skips_empty_values():
+    filters = parse_filters(MultiDict({'search': '  ', 'make': 'Honda', 'min_year': '2010',
+                                       'max_price': ''}))
+    assert filters == {'make': 'Honda', 'min_year': 2010}
+
+
+def test_include_archived_implies_include_inactive():
+    filters = parse_filters(MultiDict({'include_archived': '1'}))
+    assert filters == {'include_archived': True, 'include_inactive': True}
+
+
+def test_archive_is_only_read_on_request():
+    query, _ = page_query(parse_filters(MultiDict({'include_inactive': '1'})))
+    assert 'listings_archive' not in query
+    query, _ = page_query(parse_filters(MultiDict({'include_archived': '1'})))
+    assert 'listings_archive' in query
+    assert 'archived' in query.split('FROM')[0]
+
+
+def test_active_filter_is_the_default():
+    query, params = page_query({'make': 'subaru'}, 'price', 'ASC')
+    assert 'is_active = TRUE' in query
+    assert 'ORDER BY price ASC, id ASC' in query
+    assert params == ['%subaru%']
+
+
+@pytest.mark.parametrize('sort_order', ['ASC', 'DESC'])
+def test_keyset_pages_cross_the_null_block(db, sort_order):
+    prices = [300, None, 100, None, 200, 100, None]
+    db.bulk_upsert_listings([make_listing(f'cl_{i}', price=price)
+                             for i, price in enumerate(prices)])
+    expected = [row['id'] for row in db.execute_query(
+        f"SELECT id FROM listings ORDER BY price {sort_order}, id {sort_order}", fetch=True
+    )]
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = fetch_page(db, {}, 'price', sort_order, per_page=2, cursor=cursor)
+        seen += [row['id'] for row in rows]
+        if not cursor:
+            break
+    assert seen == expected
+
+
+def test_small_results_are_counted_exactly(db, monkeypatch):
+    monkeypatch.setattr(listing_search, '_count_cache', {})
+    db.bulk_upsert_listings([make_listing(f'cl_{i}', make='Honda' if i % 2 else 'Ford')
+                             for i in range(5)])
+
+    assert count_listings(db, parse_filters(MultiDict({'make': 'honda'}))) == (2, False)
+    assert count_listings(db, {}, mode='none') == (None, False)
+
+    monkeypatch.setattr(listing_search, 'EXACT_COUNT_BELOW', 0)
+    monkeypatch.setattr(listing_search, '_count_cache', {})
+    total, is_estimate = count_listings(db, {})
+    assert is_estimate and total == listing_search.estimate_count(db, {})
@@ -0,0 +1,52 @@
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.fixtures import CL_PER_PAGE, craigslist_page, ksl_page
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.ksl_scraper import KSLScraper
+from src.scrapers.parse_pool import ParsePool
+
+
+@pytest.fixture(scope='module')
+def pool():
+    # Spawning workers is slow, so the tests share one pool
+    pool = ParsePool(workers=2)
+    yield pool
+    pool.close()
+
+
+def parse_here(scraper, html):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scraper._parse_page(html)
+
+
+@pytest.mark.parametrize('scraper, html', [
+    (CraigslistScraper(city='provo'), craigslist_page(0, city='provo')),
+    (KSLScraper(), ksl_page(1)),
+])
+def test_worker_parses_like_the_scraper(pool, scraper, html):
+    expected = parse_here(scraper, html)
+    assert expected
+    assert pool.parse(scraper, html) == expected
+
+
+def test_scraper_options_reach_the_worker(pool):
+    # Relative links resolve against the scraper's own city
+    html = craigslist_page(0, city='ogden').replace('https://ogden.craigslist.org', '')
+    ogden = pool.parse(CraigslistScraper(city='ogden'), html)
+    provo = pool.parse(CraigslistScraper(city='provo'), html)
+    assert ogden[0]['url'].startswith('https://ogden.craigslist.org/')
+    assert provo[0]['url'].startswith('https://provo.craigslist.org/')
+
+
+def test_pages_from_many_threads(pool):
+    scraper = CraigslistScraper(city='provo', parse_pool=pool)
+    pages = [craigslist_page(p * CL_PER_PAGE, city='provo') for p in range(6)]
+
+    with ThreadPoolExecutor(max_workers=3) as threads:
+        parsed = list(threads.map(scraper._parse_html, pages))
+
+    assert parsed == [parse_here(scraper, html) for html in pages]
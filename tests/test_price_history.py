@@ -0,0 +1,59 @@
+"""Partitioned price_history, daily rollups and retention, on a real Postgres."""
+from datetime import date
+from decimal import Decimal
+
+from src.database.db import add_months, partition_name
+from src.database.listing_search import price_history_params, PRICE_HISTORY_QUERY
+from tests.db_helpers import make_listing, scalar
+
+
+def test_partitions_take_over_rows_from_the_default(db):
+    [row] = db.insert_listing(make_listing('cl_1'))
+    db.insert_price_history(row['id'], 12000)
+    assert scalar(db, "SELECT COUNT(*) FROM price_history_default") == 1
+
+    created = db.ensure_price_history_partitions(months_ahead=1)
+    current = partition_name(date.today().replace(day=1))
+    assert current in created
+    assert scalar(db, "SELECT COUNT(*) FROM price_history_default") == 0
+    assert scalar(db, f"SELECT COUNT(*) FROM {current}") == 1
+    assert db.ensure_price_history_partitions(months_ahead=1) == []
+
+
+def test_rollup_keeps_the_days_range_and_closing_price(db):
+    db.ensure_price_history_partitions()
+    [row] = db.insert_listing(make_listing('cl_1'))
+    for price in (12000, 11000, 11500):
+        db.insert_price_history(row['id'], price)
+    db.rollup_price_history()
+    daily = db.execute_query("SELECT * FROM price_history_daily", fetch=True)
+    assert [(d['min_price'], d['max_price'], d['last_price'], d['samples']) for d in daily] == [
+        (Decimal('11000'), Decimal('12000'), Decimal('11500'), 3),
+    ]
+    history = db.execute_query(PRICE_HISTORY_QUERY, price_history_params(row['id']), fetch=True)
+    assert [h['price'] for h in history] == [Decimal('12000'), Decimal('11000'), Decimal('11500')]
+
+
+def test_expired_history_is_rolled_up_then_dropped(db):
+    db.ensure_price_history_partitions()
+    [row] = db.insert_listing(make_listing('cl_1'))
+    this_month = date.today().replace(day=1)
+    old_month = add_months(this_month, -4)
+    db.execute_query(f"""
+        CREATE TABLE {partition_name(old_month)} PARTITION OF price_history
+        FOR VALUES FROM ('{old_month}') TO ('{add_months(old_month, 1)}')
+    """)
+    history = [(add_months(this_month, -4), 13000), (add_months(this_month, -4), 12500),
+               (add_months(this_month, -6), 14000), (this_month, 12000)]
+    db.execute_many("INSERT INTO price_history (listing_id, price, recorded_at) "
+                    "VALUES (%s, %s, %s)", [(row['id'], price, day) for day, price in history])
+    db.rebuild_stats_snapshot()
+    db.rollup_price_history()
+
+    assert db.drop_expired_price_history(2) == [partition_name(old_month)]
+    assert scalar(db, "SELECT COUNT(*) FROM price_history") == 1
+    assert scalar(db, "SELECT COUNT(*) FROM price_history_daily") == 3
+    assert db.get_stats()['price_records'] == 1
+    history = db.execute_query(PRICE_HISTORY_QUERY, price_history_params(row['id']), fetch=True)
+    assert [h['price'] for h in history] == [Decimal('14000'), Decimal('12500'),
+                                             Decimal('12000')]
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.scrapers import rate_limiter
+from src.scrapers.rate_limiter import RateLimiter, _parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+
+def test_throttle_halves_the_rate_and_success_steps_it_back():
+    limiter = RateLimiter(rate=1.0, min_rate=0.3, max_rate=1.2, recovery_step=0.1)
+
+    limiter.record_response('example.org', 429, retry_after='0')
+    assert limiter.stats()['example.org']['current_rate'] == 0.5
+    limiter.record_response('example.org', 503, retry_after='0')
+    limiter.record_response('example.org', 503, retry_after='0')
+    assert limiter.stats()['example.org']['current_rate'] == 0.3
+
+    for _ in range(20):
+        limiter.record_response('example.org', 200)
+    assert limiter.stats()['example.org']['current_rate'] == 1.2
+
+
+def test_backoff_doubles_per_failure_and_is_capped(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, 'uniform', lambda low, high: 1.0)
+    limiter = RateLimiter(base_backoff=2.0, max_backoff=10.0)
+
+    delays = []
+    for _ in range(4):
+        before = limiter.stats().get('example.org', {}).get('backoff_seconds', 0)
+        limiter.record_response('example.org', 429)
+        delays.append(limiter.stats()['example.org']['backoff_seconds'] - before)
+    assert delays == [2.0, 4.0, 8.0, 10.0]
+
+    # A healthy response resets the exponent
+    limiter.record_response('example.org', 200)
+    limiter.record_response('example.org', 429)
+    assert limiter.stats()['example.org']['backoff_seconds'] == 26.0
+
+
+def test_retry_after_overrides_the_backoff():
+    limiter = RateLimiter(base_backoff=60.0)
+    limiter.record_response('example.org', 429, retry_after='3')
+    assert limiter.stats()['example.org']['backoff_seconds'] == 3.0
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None), ('', None), ('7', 7.0), ('-4', 0.0), ('soon', None),
+])
+def test_parse_retry_after(value, expected):
+    assert _parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < _parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+
+def test_get_retries_throttled_responses_then_gives_up():
+    limiter = RateLimiter(rate=100.0, burst=1, max_rate=100.0)
+    session = FakeSession([FakeResponse(429, '0'), FakeResponse(503, '0'), FakeResponse(429, '0')])
+
+    response = limiter.get('https://example.org/a', session=session, max_retries=2)
+    assert response.status_code == 429
+    assert len(session.urls) == 3
+    assert limiter.stats()['example.org']['throttle_responses'] == 3
+
+
+def test_get_stops_at_the_first_healthy_response():
+    limiter = RateLimiter(rate=100.0, burst=1, max_rate=100.0)
+    session = FakeSession([FakeResponse(429, '0'), FakeResponse(200), FakeResponse(200)])
+
+    assert limiter.get('https://example.org/a', session=session).status_code == 200
+    assert len(session.urls) == 2
+    assert limiter.stats()['example.org']['requests'] == 2
+
+
+def test_hosts_have_separate_budgets():
+    limiter = RateLimiter()
+    limiter.record_response('slow.example.org', 429, retry_after='0')
+    limiter.acquire('fast.example.org')
+    stats = limiter.stats()
+    assert stats['fast.example.org']['current_rate'] == 0.5
+    assert stats['slow.example.org']['current_rate'] == 0.25
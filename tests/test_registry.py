@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from src.scrapers import registry
+from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.craigslist_scraper import CraigslistScraper
+from src.scrapers.ksl_scraper import KSLScraper
+from src.scrapers.regions import DEFAULT_TARGETS, load_targets, target_name
+from src.scrapers.registry import available_sources, get_scraper_class, register_scraper
+
+EXAMPLE_TARGETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'scrape_targets.example.json')
+
+
+def write_targets(tmp_path, targets):
+    path = tmp_path / 'targets.json'
+    path.write_text(json.dumps(targets))
+    return str(path)
+
+
+def test_builtin_sources_are_registered():
+    assert get_scraper_class('craigslist') is CraigslistScraper
+    assert get_scraper_class('ksl') is KSLScraper
+    assert {'craigslist', 'ksl'} <= set(available_sources())
+
+
+def test_unknown_source_is_rejected():
+    with pytest.raises(ValueError, match='craigslist'):
+        get_scraper_class('autotrader')
+
+
+def test_register_scraper(monkeypatch):
+    monkeypatch.setattr(registry, '_SCRAPERS', dict(registry._SCRAPERS))
+
+    @register_scraper
+    class ExampleScraper(BaseScraper):
+        source = 'example'
+
+    assert get_scraper_class('example') is ExampleScraper
+    with pytest.raises(ValueError, match='Nameless'):
+        register_scraper(type('NamelessScraper', (BaseScraper,), {'source': None}))
+
+
+def test_scrapers_are_built_from_targets():
+    scraper = get_scraper_class('craigslist').from_target(
+        {'source': 'craigslist', 'region': 'provo'}
+    )
+    assert scraper.city == 'provo'
+    assert isinstance(get_scraper_class('ksl').from_target({'source': 'ksl', 'region': None}),
+                      KSLScraper)
+
+
+def test_default_targets_cover_every_source(monkeypatch):
+    monkeypatch.delenv('SCRAPE_TARGETS_FILE', raising=False)
+    assert load_targets() == DEFAULT_TARGETS
+    assert {t['source'] for t in load_targets()} == set(available_sources())
+
+
+def test_targets_file_skips_disabled_entries(tmp_path, monkeypatch):
+    path = write_targets(tmp_path, [
+        {'source': 'craigslist', 'region': 'provo'},
+        {'source': 'craigslist', 'region': 'ogden', 'enabled': False},
+        {'source': 'ksl'},
+    ])
+    monkeypatch.setenv('SCRAPE_TARGETS_FILE', path)
+    assert load_targets() == [
+        {'source': 'craigslist', 'region': 'provo'},
+        {'source': 'ksl', 'region': None},
+    ]
+
+
+@pytest.mark.parametrize('target, message', [
+    ({'source': 'autotrader'}, 'Unknown scrape source'),
+    ({'source': 'craigslist'}, 'without a region'),
+])
+def test_bad_targets_name_the_file(tmp_path, target, message):
+    path = write_targets(tmp_path, [target])
+    with pytest.raises(ValueError, match=message) as error:
+        load_targets(path)
+    assert path in str(error.value)
+
+
+def test_example_targets_file_loads():
+    assert load_targets(EXAMPLE_TARGETS)
+
+
+def test_target_name():
+    assert target_name({'source': 'craigslist', 'region': 'provo'}) == 'craigslist/provo'
+    assert target_name({'source': 'ksl', 'region': None}) == 'ksl'
@@ -0,0 +1,116 @@
+import pytest
+
+from src.scrapers.response_cache import ResponseCache
+
+URL = 'https://provo.craigslist.org/search/cta?s=0'
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+        self.headers = headers or {}
+
+
+class CountingParser:
+    def __init__(self):
+        self.pages = []
+
+    def __call__(self, html):
+        self.pages.append(html)
+        return [{'title': html}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def fetch(cache, response, parse, url=URL):
+    entry = cache.lookup(url)
+    return cache.resolve(url, response, parse, entry), cache.conditional_headers(entry)
+
+
+def test_first_fetch_is_unconditional_and_parsed(cache):
+    parse = CountingParser()
+    listings, headers = fetch(cache, FakeResponse(200, 'page one', {'ETag': '"v1"'}), parse)
+    assert headers == {}
+    assert listings == [{'title': 'page one'}]
+    assert parse.pages == ['page one']
+
+
+def test_not_modified_returns_the_cached_listings(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one', {
+        'ETag': '"v1"', 'Last-Modified': 'Tue, 13 Oct 2026 10:00:00 GMT',
+    }), parse)
+
+    listings, headers = fetch(cache, FakeResponse(304), parse)
+    assert headers == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Tue, 13 Oct 2026 10:00:00 GMT',
+    }
+    assert listings == [{'title': 'page one'}]
+    assert parse.pages == ['page one']
+    assert cache.stats()['not_modified'] == 1
+
+
+def test_identical_body_skips_the_parse(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one'), parse)
+    listings, _ = fetch(cache, FakeResponse(200, 'page one'), parse)
+    assert listings == [{'title': 'page one'}]
+    assert parse.pages == ['page one']
+    assert cache.stats()['unchanged'] == 1
+
+
+def test_changed_body_is_parsed_and_stored(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one', {'ETag': '"v1"'}), parse)
+    listings, _ = fetch(cache, FakeResponse(200, 'page two', {'ETag': '"v2"'}), parse)
+    assert listings == [{'title': 'page two'}]
+    assert parse.pages == ['page one', 'page two']
+    assert cache.lookup(URL)['etag'] == '"v2"'
+
+
+def test_not_modified_refreshes_the_validators(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one', {'ETag': '"v1"'}), parse)
+    fetch(cache, FakeResponse(304, headers={'ETag': '"v1b"'}), parse)
+    assert cache.lookup(URL)['etag'] == '"v1b"'
+
+
+def test_not_modified_after_eviction_uses_the_looked_up_entry(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one', {'ETag': '"v1"'}), parse)
+    entry = cache.lookup(URL)
+    cache._conn.execute("DELETE FROM responses")
+
+    assert cache.resolve(URL, FakeResponse(304), parse, entry) == [{'title': 'page one'}]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # Room for one compressed page but not two
+    cache = ResponseCache(str(tmp_path), max_bytes=30)
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'first page'), parse, url=URL + '&a')
+    fetch(cache, FakeResponse(200, 'second page'), parse, url=URL + '&b')
+
+    assert cache.lookup(URL + '&a') is None
+    assert cache.lookup(URL + '&b') is not None
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+
+def test_hit_rate(cache):
+    parse = CountingParser()
+    fetch(cache, FakeResponse(200, 'page one', {'ETag': '"v1"'}), parse)
+    fetch(cache, FakeResponse(304), parse)
+    fetch(cache, FakeResponse(200, 'page one'), parse)
+    fetch(cache, FakeResponse(200, 'page two'), parse)
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 2, 1)
+    assert stats['hit_rate'] == 0.5
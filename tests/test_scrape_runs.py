@@ -0,0 +1,43 @@
+"""Scrape run bookkeeping and stale-listing deactivation, on a real Postgres."""
+from tests.db_helpers import make_listing, scalar
+
+
+def test_deactivate_only_unseen_listings_of_swept_scopes(db):
+    db.bulk_upsert_listings([make_listing('a'), make_listing('b'),
+                             make_listing('c', region='ogden')])
+    stale = db.deactivate_unseen_listings({'a'}, [('craigslist', 'provo')])
+    assert len(stale) == 1
+    rows = db.execute_query(
+        "SELECT external_id, is_active, deactivated_at IS NOT NULL AS stamped "
+        "FROM listings ORDER BY external_id", fetch=True
+    )
+    assert [(r['external_id'], r['is_active'], r['stamped']) for r in rows] == [
+        ('a', True, False), ('b', False, True), ('c', True, False),
+    ]
+
+    result = db.bulk_upsert_listings([make_listing('b')])
+    assert (result['new'], result['unchanged']) == (0, 0)
+    reactivated = db.execute_query(
+        "SELECT is_active, deactivated_at FROM listings WHERE external_id = 'b'", fetch=True
+    )[0]
+    assert reactivated == {'is_active': True, 'deactivated_at': None}
+
+
+def test_nothing_is_deactivated_without_a_swept_scope(db):
+    db.bulk_upsert_listings([make_listing('a')])
+    assert db.deactivate_unseen_listings(set(), []) == []
+    assert scalar(db, "SELECT is_active FROM listings") is True
+
+
+def test_finished_run_is_never_downgraded(db):
+    run_id = db.start_scrape_run()
+    targets = [{'source': 'craigslist', 'region': 'provo', 'pages': 3, 'listings': 250,
+                'swept': True, 'error': None}]
+    assert db.finish_scrape_run(run_id, 'completed', {'new': 2, 'updated': 5}, targets,
+                                deactivated=1)
+    assert not db.finish_scrape_run(run_id, 'failed', {}, targets)
+
+    run = db.execute_query("SELECT * FROM scrape_runs", fetch=True)[0]
+    assert (run['status'], run['listings_seen'], run['new_listings'],
+            run['deactivated_listings']) == ('completed', 7, 2, 1)
+    assert scalar(db, "SELECT COUNT(*) FROM scrape_run_targets WHERE swept") == 1
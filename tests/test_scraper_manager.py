@@ -0,0 +1,214 @@
+"""ScraperManager.run_scrape against stand-in scrapers and an in-memory database."""
+import threading
+import time
+
+import pytest
+
+from benchmarks.bench_run_scrape import MemoryDatabase
+from src.scrapers.scraper_manager import ScraperManager
+
+TARGET = {'source': 'craigslist', 'region': 'provo'}
+
+
+class FakeScraper:
+    """Yields canned pages the way BaseScraper.iter_pages does"""
+
+    page_size = 3
+
+    def __init__(self, pages, before_page=None):
+        self.pages = pages
+        self.before_page = before_page
+        self.page_errors = 0
+        self.fetched = 0
+
+    def iter_pages(self, max_pages=2, concurrent=False):
+        for listings in self.pages[:max_pages]:
+            if self.before_page:
+                self.before_page()
+            self.fetched += 1
+            yield [dict(listing) for listing in listings]
+
+
+class BlockingDatabase(MemoryDatabase):
+    """Holds every bulk upsert until `release` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def bulk_upsert_listings(self, listings):
+        self.release.wait(timeout=10)
+        return super().bulk_upsert_listings(listings)
+
+
+class RecordingDatabase(MemoryDatabase):
+    """Remembers which scopes a run asked to deactivate"""
+
+    def __init__(self):
+        super().__init__()
+        self.deactivated_scopes = []
+
+    def deactivate_unseen_listings(self, seen_ids, scopes):
+        self.deactivated_scopes.extend(scopes)
+        return []
+
+
+def listing(external_id, price=10000):
+    return {'external_id': external_id, 'title': f'2015 Honda Civic {external_id}',
+            'price': price}
+
+
+def result_pages(count, per_page=3, prefix='cl'):
+    return [[listing(f'{prefix}_{page}_{i}') for i in range(per_page)]
+            for page in range(count)]
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    # The manager's logger and caches write under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SCRAPE_CACHE_DIR', str(tmp_path / 'cache'))
+    managers = []
+
+    def make_manager(scraper, db=None, **kwargs):
+        manager = ScraperManager(targets=[dict(TARGET)], db=db or MemoryDatabase(),
+                                 **kwargs)
+        manager._build_scraper = lambda target: scraper
+        managers.append(manager)
+        return manager
+
+    yield make_manager
+    for manager in managers:
+        manager.close()
+
+
+def test_pages_reach_the_database_while_scraping(make_manager):
+    db = MemoryDatabase()
+    stored = []
+    scraper = FakeScraper(result_pages(6), before_page=lambda: stored.append(len(db.listings)))
+    manager = make_manager(scraper, db=db, queue_size=1, batch_size=1)
+
+    manager.run_scrape(max_pages=6, enrich_details=False)
+
+    # Page 3 only fits in the queue once page 1 has been written
+    assert stored[3] >= 3
+    assert len(db.listings) == 18
+
+
+def test_buffered_run_writes_after_scraping_with_the_same_stats(make_manager):
+    streamed_db, buffered_db = MemoryDatabase(), MemoryDatabase()
+    stored = []
+    pages = result_pages(4) + [[listing('cl_0_0')]]
+    streamed = make_manager(FakeScraper(pages), db=streamed_db, batch_size=2)
+    buffered = make_manager(
+        FakeScraper(pages, before_page=lambda: stored.append(len(buffered_db.listings))),
+        db=buffered_db, batch_size=2
+    )
+
+    streamed_stats = streamed.run_scrape(max_pages=5, enrich_details=False)
+    buffered_stats = buffered.run_scrape(max_pages=5, stream=False, enrich_details=False)
+
+    assert stored == [0] * 5
+    assert buffered_stats == streamed_stats
+    assert streamed_stats['new'] == 12
+    assert streamed_stats['duplicates'] == 1
+
+
+def test_slow_database_holds_back_the_scrapers(make_manager):
+    db = BlockingDatabase()
+    scraper = FakeScraper(result_pages(10))
+    manager = make_manager(scraper, db=db, queue_size=1, batch_size=1)
+
+    run = threading.Thread(target=manager.run_scrape,
+                           kwargs={'max_pages': 10, 'enrich_details': False})
+    run.start()
+    time.sleep(0.5)
+    try:
+        # One page being written, one queued, one waiting to be queued
+        assert scraper.fetched <= 3
+    finally:
+        db.release.set()
+        run.join(timeout=10)
+
+    assert scraper.fetched == 10
+    assert len(db.listings) == 30
+
+
+def known_database(external_ids):
+    db = MemoryDatabase()
+    for external_id in external_ids:
+        db.insert_listing(listing(external_id))
+    return db
+
+
+@pytest.mark.parametrize('cutoff, fetched', [(1, 2), (2, 3)])
+def test_incremental_run_stops_after_known_pages(make_manager, cutoff, fetched):
+    known = result_pages(3, prefix='old')
+    pages = ([known[0][:1] + [listing('new_0'), listing('new_1')]]
+             + known[1:] + [[listing('new_2')]])
+    db = known_database(l['external_id'] for page in known for l in page)
+    scraper = FakeScraper(pages)
+    manager = make_manager(scraper, db=db)
+
+    stats = manager.run_scrape(max_pages=4, incremental=True, known_page_cutoff=cutoff,
+                               enrich_details=False)
+
+    assert scraper.fetched == fetched
+    assert stats['new'] == 2
+    assert 'new_2' not in db.listings
+
+
+def test_a_page_with_a_new_listing_resets_the_known_streak(make_manager):
+    known = result_pages(3, prefix='old')
+    pages = [known[0], known[1][:2] + [listing('new_0')], known[2], [listing('new_1')]]
+    db = known_database(l['external_id'] for page in known for l in page)
+    scraper = FakeScraper(pages)
+    manager = make_manager(scraper, db=db)
+
+    manager.run_scrape(max_pages=4, incremental=True, known_page_cutoff=2,
+                       enrich_details=False)
+
+    assert scraper.fetched == 4
+    assert 'new_1' in db.listings
+
+
+def test_full_run_reads_past_known_pages(make_manager):
+    known = result_pages(3, prefix='old')
+    db = known_database(l['external_id'] for page in known for l in page)
+    scraper = FakeScraper(known + [[listing('new_0')]])
+    manager = make_manager(scraper, db=db)
+
+    stats = manager.run_scrape(max_pages=4, enrich_details=False)
+
+    assert scraper.fetched == 4
+    assert stats['new'] == 1
+
+
+@pytest.mark.parametrize('pages, kwargs, swept', [
+    ([3, 3, 1], {}, True),
+    ([3, 3, 0], {}, True),
+    ([3, 3, 3], {}, False),
+    ([3, 1], {}, False),
+    ([3, 3, 1], {'incremental': True, 'known_page_cutoff': 5}, False),
+], ids=['short last page', 'empty last page', 'more pages left', 'stopped before max_pages',
+        'incremental'])
+def test_only_swept_targets_deactivate_unseen_listings(make_manager, pages, kwargs, swept):
+    db = RecordingDatabase()
+    scraper = FakeScraper([[listing(f'cl_{page}_{i}') for i in range(count)]
+                           for page, count in enumerate(pages)])
+    manager = make_manager(scraper, db=db)
+
+    manager.run_scrape(max_pages=3, enrich_details=False, **kwargs)
+
+    assert db.deactivated_scopes == ([('craigslist', 'provo')] if swept else [])
+
+
+def test_page_errors_keep_a_target_from_being_swept(make_manager):
+    db = RecordingDatabase()
+    scraper = FakeScraper(result_pages(2) + [[listing('cl_last')]])
+    scraper.page_errors = 1
+    manager = make_manager(scraper, db=db)
+
+    manager.run_scrape(max_pages=3, enrich_details=False)
+
+    assert db.deactivated_scopes == []
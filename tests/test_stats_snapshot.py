@@ -0,0 +1,73 @@
+"""The stats snapshot counters against a full recount, on a real Postgres."""
+import pytest
+
+from tests.db_helpers import make_listing, scalar
+
+
+def snapshot(db):
+    db.refresh_stats_snapshot()
+    stats = db.get_stats()
+    del stats['snapshot_at']
+    makes = db.execute_query(
+        "SELECT make, listings FROM stats_make_counts WHERE listings <> 0 ORDER BY make",
+        fetch=True
+    )
+    return stats, makes
+
+
+def test_counters_follow_every_write(db):
+    db.ensure_price_history_partitions()
+    makes = ['Honda', 'Toyota', 'Ford', None]
+    listings = [
+        make_listing(f'cl_{i}', price=None if i == 7 else 3000 + 4000 * i,
+                     make=makes[i % len(makes)], region='provo' if i % 2 else 'ogden')
+        for i in range(12)
+    ]
+    db.bulk_upsert_listings(listings)
+
+    listings[1]['price'] -= 1000
+    listings[2]['make'] = 'Subaru'
+    listings[3]['title'] = '2015 Honda Civic LX, new tires'
+    db.bulk_upsert_listings(listings)
+
+    [row] = db.insert_listing(make_listing('cl_single', price=25000, make='Ford'))
+    db.insert_price_history(row['id'], 25000)
+
+    seen = {listing['external_id'] for listing in listings[:3]}
+    db.deactivate_unseen_listings(seen, [('craigslist', 'provo')])
+    db.bulk_upsert_listings([listings[5]])
+
+    db.execute_query("UPDATE listings SET deactivated_at = NOW() - interval '100 days' "
+                     "WHERE NOT is_active")
+    assert db.archive_inactive_listings(90) > 1
+    db.bulk_upsert_listings([dict(listings[9], price=41000)])
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.bulk_upsert_listings([make_listing('cl_rolled_back', price=1)])
+            raise RuntimeError
+
+    incremental = snapshot(db)
+    db.rebuild_stats_snapshot()
+    assert snapshot(db) == incremental
+
+    stats = incremental[0]
+    assert stats['archived_listings'] == scalar(db, "SELECT COUNT(*) FROM listings_archive")
+    assert stats['price_records'] == scalar(db, "SELECT COUNT(*) FROM price_history")
+    assert stats['median_price'] == scalar(db, """
+        SELECT PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price)::DECIMAL(10,2)
+        FROM listings WHERE is_active
+    """)
+
+
+@pytest.mark.parametrize('count', [1, 2, 5, 6])
+def test_median_across_bucket_edges(db, count):
+    # Prices straddle the 5000 and 10000 bucket edges
+    prices = [4000, 5000, 9999, 10000, 15000, 60000][:count]
+    db.bulk_upsert_listings([make_listing(f'cl_{i}', price=price)
+                             for i, price in enumerate(prices)])
+    db.refresh_stats_snapshot()
+    assert db.get_stats()['median_price'] == scalar(db, """
+        SELECT PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price)::DECIMAL(10,2)
+        FROM listings WHERE is_active
+    """)
@@ -0,0 +1,42 @@
+import pytest
+
+from src.scrapers.title_parser import parse_title
+
+
+@pytest.mark.parametrize('title, expected', [
+    ('2015 Jeep Grand Cherokee Laredo', (2015, 'Jeep', 'Grand Cherokee')),
+    ('2015 Jeep Grand  Cherokee Laredo', (2015, 'Jeep', 'Grand Cherokee')),
+    ('2012 Ford F - 150 XLT', (2012, 'Ford', 'F-150')),
+    ('2012 ford f150', (2012, 'Ford', 'F-150')),
+    ('2014 Toyota 4Runner SR5', (2014, 'Toyota', '4Runner')),
+])
+def test_model_lexicon_separators(title, expected):
+    assert parse_title(title) == expected
+
+
+def test_make_inferred_from_unique_model():
+    assert parse_title('2010 Tacoma 4x4')[1:] == ('Toyota', 'Tacoma')
+
+
+def test_non_vehicle_titles_get_no_make():
+    assert parse_title('computer program 2019')[1] is None
+
+
+@pytest.mark.parametrize('title, expected', [
+    ('2010 Range Rover Sport HSE', (2010, 'Land Rover', 'Range Rover Sport')),
+    ('2008 Range Rover', (2008, 'Land Rover', 'Range Rover')),
+    ('2012 Land Rover Range Rover Sport', (2012, 'Land Rover', 'Range Rover Sport')),
+])
+def test_make_alias_that_is_also_a_model(title, expected):
+    assert parse_title(title) == expected
+
+
+@pytest.mark.parametrize('title, expected', [
+    ('2008 Lexus IS 250', (2008, 'Lexus', 'IS 250')),
+    ('lexus 2008 es 350', (2008, 'Lexus', 'ES 350')),
+    ('2009 Lexus is AWD', (2009, 'Lexus', 'IS')),
+    ('2008 Lexus, car is clean', (2008, 'Lexus', None)),
+    ('2011 Lexus GX 470 - this is a must see', (2011, 'Lexus', 'GX 470')),
+])
+def test_word_models_only_right_after_the_make(title, expected):
+    assert parse_title(title) == expected